@@ -0,0 +1,112 @@
+"""
+OSS 缩略图页面加载基准。
+在本地启动一个模拟 OSS 图片处理接口的 HTTP 服务（可设置每个请求的延迟），
+测量一页缩略图在不同并发数下的加载时间，并与改动前“每张缩略图新建一次 urlopen 连接、串行获取”的方式对比。
+
+用法：python benchmarks/bench_oss_thumbnails.py --page-size 24 --latency-ms 40 --concurrency 1,2,4,8,16
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from urllib.request import urlopen
+
+from corpus import synthetic_image
+from stub_oss import StubOSSServer
+
+from PIL import Image
+from cloud_services.aliyun_oss import AliyunOSS
+from thumbnail_worker import ThumbnailWorker
+
+
+class InlineDispatcher:
+    """没有 Tk 时直接在工作线程里执行回调"""
+
+    def call_soon(self, callback, *args):
+        callback(*args)
+
+
+def page_urls(base_url, page_size):
+    # 每轮使用不同的 URL，避免命中本地缩略图缓存
+    run_id = uuid.uuid4().hex
+    return [f"{base_url}/wallpapers/{run_id}_{index}.jpg?x-oss-process=image/resize,w_100" for index in range(page_size)]
+
+
+def bench_legacy(base_url, page_size):
+    """改动前的方式：串行，每张缩略图新建连接"""
+    start = time.perf_counter()
+    for url in page_urls(base_url, page_size):
+        with urlopen(url) as response:
+            img = Image.open(io.BytesIO(response.read()))
+            img.thumbnail((100, 100))
+    return {"total_ms": (time.perf_counter() - start) * 1000}
+
+
+def bench_pooled(base_url, page_size, concurrency):
+    oss = AliyunOSS("benchmark", "benchmark", base_url, "benchmark")
+    worker = ThumbnailWorker(InlineDispatcher(), oss.load_thumbnail_image, max_workers=concurrency)
+    urls = page_urls(base_url, page_size)
+    done = threading.Event()
+    arrivals = []
+    lock = threading.Lock()
+
+    def on_ready(url, image):
+        with lock:
+            arrivals.append(time.perf_counter())
+            if len(arrivals) == len(urls):
+                done.set()
+
+    start = time.perf_counter()
+    worker.submit(urls, on_ready)
+    done.wait(timeout=120)
+    result = {
+        "total_ms": (max(arrivals) - start) * 1000 if arrivals else None,
+        "first_ms": (min(arrivals) - start) * 1000 if arrivals else None,
+        "loaded": len(arrivals),
+        "client_connections": oss.thumbnail_fetcher.connections_opened,
+    }
+    worker.shutdown()
+    oss.thumbnail_fetcher.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OSS thumbnail page-load benchmark")
+    parser.add_argument("--page-size", type=int, default=24)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    buffer = io.BytesIO()
+    synthetic_image(100, 75).save(buffer, "JPEG")
+    server = StubOSSServer(args.latency_ms, buffer.getvalue())
+    os.chdir(tempfile.mkdtemp(prefix="wallpapercube_bench_"))  # 缩略图存储写到临时目录
+
+    results = {"page_size": args.page_size, "latency_ms": args.latency_ms, "runs": []}
+    try:
+        server.reset_counters()
+        legacy = [bench_legacy(server.base_url, args.page_size)["total_ms"] for _ in range(args.rounds)]
+        results["runs"].append({"mode": "legacy", "concurrency": 1, "total_ms": min(legacy),
+                                "server_connections": server.connections})
+        print(f"  legacy   c=1   {min(legacy):8.1f} ms  connections: {server.connections}")
+
+        for concurrency in [int(value) for value in args.concurrency.split(",")]:
+            server.reset_counters()
+            runs = [bench_pooled(server.base_url, args.page_size, concurrency) for _ in range(args.rounds)]
+            best = min(runs, key=lambda run: run["total_ms"] or float("inf"))
+            best.update({"mode": "pooled", "concurrency": concurrency, "server_connections": server.connections})
+            results["runs"].append(best)
+            print(f"  pooled   c={concurrency:<3} {best['total_ms']:8.1f} ms  first: {best['first_ms']:6.1f} ms"
+                  f"  connections: {server.connections}")
+    finally:
+        server.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
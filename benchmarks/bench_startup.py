@@ -0,0 +1,164 @@
+"""
+启动基准：从启动进程到主窗口出现（<Map>）、第一页真实数据加载完成、第一页缩略图全部就绪的耗时。
+每次启动都是独立子进程，与双击启动一样执行 main.main()；第一次在空的工作目录中（冷启动，没有快照），
+之后复用同一目录（热启动，带上次退出时保存的第一页快照和缩略图缓存）。
+同时记录导入 main 的耗时和被延迟到 OSS Tab 的 oss2 导入耗时。
+
+需要显示器（Linux 下可用 xvfb-run）；没有显示器时只报告导入耗时。
+用法：python benchmarks/bench_startup.py --images 500 --runs 5 --target-ms 300
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from corpus import generate_corpus, SOURCE_DIR
+
+REPO_ROOT = os.path.dirname(SOURCE_DIR)
+SPAWN_TIME_ENV = "BENCH_STARTUP_SPAWN_TIME"
+WAIT_TIMEOUT = 30
+
+
+def run_child(result_file):
+    """子进程：启动应用，窗口就绪后记录各阶段时间并关闭"""
+    spawned = float(os.environ[SPAWN_TIME_ENV])
+    result = {}
+
+    def elapsed_ms():
+        return (time.time() - spawned) * 1000
+
+    start = time.perf_counter()
+    import tkinter
+    import main
+    import ui_components
+    from instrumentation import Instrumentation
+    result["import_ms"] = (time.perf_counter() - start) * 1000
+    result["interpreter_ms"] = elapsed_ms() - result["import_ms"]
+
+    apps = []
+    original_init = ui_components.AppUI.__init__
+
+    def capture_init(self, root, *args, **kwargs):
+        apps.append(self)
+        root.bind("<Map>", lambda event: event.widget is root and result.setdefault("window_ms", elapsed_ms()), add="+")
+        original_init(self, root, *args, **kwargs)
+        result["app_init_ms"] = elapsed_ms()
+
+    def wait_until(root, condition):
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while not condition():
+            if time.monotonic() > deadline:
+                raise TimeoutError("startup did not finish in time")
+            root.update()
+            time.sleep(0.001)
+
+    def measure_mainloop(root, n=0):
+        app = apps[0]
+        wait_until(root, lambda: "window_ms" in result)
+        result["snapshot_items"] = sum(1 for item in app.local_grid.items if item.get("thumbnail") is not None)
+        wait_until(root, lambda: "startup.finish" in Instrumentation.shared().stats()["spans"])
+        result["first_page_ms"] = elapsed_ms()
+        # 网格只为可见的格子加载缩略图
+        grid = app.local_grid
+        wait_until(root, lambda: all(grid.items[index].get("thumbnail") is not None for index in grid._cell_by_index))
+        result["thumbnails_ms"] = elapsed_ms()
+        result["page_items"] = len(app.local_grid.items)
+        root.destroy()
+
+    ui_components.AppUI.__init__ = capture_init
+    tkinter.Tk.mainloop = measure_mainloop
+    try:
+        main.main()  # 退出时保存第一页快照，供下一次启动使用
+    except tkinter.TclError as e:
+        result["error"] = str(e)
+
+    start = time.perf_counter()
+    import cloud_services.aliyun_oss  # noqa: F401  OSS Tab 首次选中时才会导入
+    result["deferred_oss_import_ms"] = (time.perf_counter() - start) * 1000
+
+    with open(result_file, "w") as file:
+        json.dump(result, file)
+
+
+def launch(workdir, corpus):
+    """在 workdir 中启动一次应用，返回子进程的计时结果"""
+    result_file = os.path.join(workdir, "startup_result.json")
+    env = dict(os.environ)
+    env[SPAWN_TIME_ENV] = repr(time.time())
+    env["WALLPAPER_TRACE"] = "1"  # 通过 startup.finish span 判断第一页是否加载完成
+    env["WALLPAPER_BACKEND"] = "recording"  # 不修改桌面壁纸
+    env["PYTHONPATH"] = os.pathsep.join([SOURCE_DIR, REPO_ROOT, env.get("PYTHONPATH", "")])
+    if not os.path.exists(os.path.join(workdir, "config.json")):
+        with open(os.path.join(workdir, "config.json"), "w") as file:
+            json.dump({"last_folder": corpus, "language": "English", "auto_switch_enabled": 0}, file)
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", result_file], cwd=workdir,
+        env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{completed.stderr}")
+    with open(result_file) as file:
+        return json.load(file)
+
+
+def summarize(runs, key):
+    values = [run[key] for run in runs if key in run]
+    if not values:
+        return None
+    return {"median": statistics.median(values), "min": min(values), "max": max(values), "n": len(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WallpaperCube startup benchmark")
+    parser.add_argument("--images", type=int, default=500)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--runs", type=int, default=5, help="warm starts after the first cold start")
+    parser.add_argument("--target-ms", type=float, default=300, help="window-on-screen target for warm starts")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return 0
+
+    corpus = os.path.join(tempfile.gettempdir(), f"wallpapercube_corpus_{args.images}_{args.width}x{args.height}_jpg")
+    generate_corpus(corpus, args.images, args.width, args.height, ("jpg",))
+    workdir = tempfile.mkdtemp(prefix="wallpapercube_startup_")
+
+    cold = launch(workdir, corpus)
+    if "error" in cold:
+        print(f"No display ({cold['error']}); only import timings are available:")
+        print(json.dumps({key: value for key, value in cold.items() if key.endswith("_ms")}, indent=2))
+        return 0
+    warm = [launch(workdir, corpus) for _ in range(args.runs)]
+
+    keys = ("interpreter_ms", "import_ms", "window_ms", "first_page_ms", "thumbnails_ms", "deferred_oss_import_ms")
+    results = {
+        "parameters": vars(args),
+        "cold": cold,
+        "warm": {key: summarize(warm, key) for key in keys + ("snapshot_items",)},
+    }
+    print(f"{'phase':<24} {'cold':>9} {'warm median':>12}")
+    for key in keys:
+        warm_stats = results["warm"][key]
+        print(f"{key:<24} {cold.get(key, float('nan')):>9.1f} {warm_stats['median'] if warm_stats else float('nan'):>12.1f}")
+    print(f"snapshot thumbnails shown at first paint (warm): {results['warm']['snapshot_items']['median']:.0f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    window = results["warm"]["window_ms"]["median"]
+    verdict = "within" if window <= args.target_ms else "OVER"
+    print(f"\nWarm window-on-screen median {window:.1f} ms, {verdict} the {args.target_ms:.0f} ms target")
+    return 0 if window <= args.target_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
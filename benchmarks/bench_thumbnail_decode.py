@@ -0,0 +1,102 @@
+"""
+缩略图解码基准：对比原始 thumbnail 调用、强制全尺寸解码和 ImageManager.decode_thumbnail。
+每种方式、每种格式在独立子进程中运行，以便分别统计峰值内存。
+JPEG 的 decode_thumbnail 就是 Image.thumbnail（已经在解码阶段 draft），两者应当持平；
+PNG/BMP 的耗时几乎全在完整解码上，reduce 只节省解码之后的几毫秒。
+
+用法：python benchmarks/bench_thumbnail_decode.py --count 12 --width 6000 --height 4000 --formats jpg,png,bmp
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from corpus import generate_corpus, peak_rss_kb
+
+from PIL import Image
+from image_manager import ImageManager, THUMBNAIL_SIZE
+
+METHODS = ("baseline", "full", "fast")
+
+
+def thumbnail_baseline(path):
+    # 改动前的实现：直接调用 thumbnail
+    with Image.open(path) as img:
+        img.thumbnail(THUMBNAIL_SIZE)
+        return img.size
+
+
+def thumbnail_full(path):
+    # 不做任何缩小解码，完整解码后再缩放（旧版 Pillow 的行为）
+    with Image.open(path) as img:
+        img.load()
+        img.thumbnail(THUMBNAIL_SIZE, reducing_gap=None)
+        return img.size
+
+
+def thumbnail_fast(path):
+    with Image.open(path) as img:
+        return ImageManager.decode_thumbnail(img).size
+
+
+def run_method(method, paths):
+    function = {"baseline": thumbnail_baseline, "full": thumbnail_full, "fast": thumbnail_fast}[method]
+    rss_before = peak_rss_kb()
+    timings = []
+    for path in paths:
+        start = time.perf_counter()
+        function(path)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "method": method,
+        "format": os.path.splitext(paths[0])[1].lstrip("."),
+        "images": len(paths),
+        "mean_ms": statistics.mean(timings),
+        "median_ms": statistics.median(timings),
+        "peak_rss_kb": peak_rss_kb(),
+        "startup_rss_kb": rss_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thumbnail decode benchmark")
+    parser.add_argument("--count", type=int, default=12)
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--formats", default="jpg,png,bmp")
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "wallpapercube_corpus"))
+    parser.add_argument("--method", choices=METHODS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    formats = args.formats.split(",")
+
+    if args.method:
+        paths = generate_corpus(args.corpus, args.count, args.width, args.height, tuple(formats))
+        print(json.dumps(run_method(args.method, paths)))
+        return
+
+    results = []
+    for image_format in formats:
+        # 先在父进程生成语料，子进程只做解码
+        generate_corpus(args.corpus, args.count, args.width, args.height, (image_format,))
+        for method in METHODS:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--method", method,
+                 "--count", str(args.count), "--width", str(args.width), "--height", str(args.height),
+                 "--formats", image_format, "--corpus", args.corpus],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results.append(json.loads(output))
+
+    for result in results:
+        print(f"{result['format']:>4} {result['method']:>8}  {result['mean_ms']:8.1f} ms/image"
+              f"  peak RSS: {result['peak_rss_kb']} KB")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+基准测试用的合成图片语料生成工具。
+"""
+import os
+import sys
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "source")
+if SOURCE_DIR not in sys.path:
+    sys.path.insert(0, SOURCE_DIR)
+
+from PIL import Image
+
+FORMAT_EXTENSIONS = {"jpg": "JPEG", "png": "PNG", "bmp": "BMP"}
+
+
+def synthetic_image(width, height, seed=0):
+    """生成带渐变和噪声的 RGB 图片，避免纯色图片被编码器过度压缩"""
+    red = Image.linear_gradient("L").rotate(seed * 37 % 360).resize((width, height))
+    green = Image.radial_gradient("L").resize((width, height))
+    blue = Image.effect_noise((max(width // 8, 1), max(height // 8, 1)), 64).resize((width, height))
+    return Image.merge("RGB", (red, green, blue))
+
+
+def generate_corpus(folder, count, width, height, formats=("jpg",)):
+    """
+    在 folder 中生成 count 张图片（已存在的文件直接复用）。
+    :return: 图片路径列表。
+    """
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for index in range(count):
+        extension = formats[index % len(formats)]
+        path = os.path.join(folder, f"img_{width}x{height}_{index:05d}.{extension}")
+        if not os.path.exists(path):
+            synthetic_image(width, height, seed=index).save(path, FORMAT_EXTENSIONS[extension])
+        paths.append(path)
+    return paths
+
+
+def peak_rss_kb():
+    """返回当前进程的峰值常驻内存（KB），平台不支持时返回 None"""
+    # Linux 上 ru_maxrss 会继承 fork 时父进程的峰值，优先读取 exec 后重新计数的 VmHWM
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
@@ -0,0 +1,385 @@
+"""
+热点路径基准套件：文件夹列举、缩略图（冷/热缓存）、本地分页数据、OSS 列举和缩略图、自动切换。
+不需要显示器和网络：图片语料在本地合成，OSS 使用 stub_oss 中的本地替身服务，壁纸后端使用 recording。
+每个基准在独立子进程和临时工作目录中运行，缓存和共享实例互不影响；结果以 JSON 输出，便于对比。
+
+用法：
+  python benchmarks/run_benchmarks.py --images 500 --width 1920 --height 1080 --output results.json
+  python benchmarks/run_benchmarks.py --only thumbnails,auto_switch --compare results.json --threshold 0.2
+
+--compare 时各指标的中位数比基线慢超过 threshold（比例）视为回归，退出码为 1。
+需要 Tk 的部分（PhotoImage 转换、界面绘制）不在测量范围内：generate_thumbnail 以其不依赖 Tk 的
+load_thumbnail_image 代替。
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from corpus import generate_corpus, synthetic_image, SOURCE_DIR
+
+REPO_ROOT = os.path.dirname(SOURCE_DIR)
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)  # UI 模块使用 source. 前缀导入
+
+BENCHMARKS = {}
+
+
+def benchmark(function):
+    """注册基准函数：function(args) 返回 {指标名: 毫秒耗时列表}"""
+    BENCHMARKS[function.__name__.replace("bench_", "")] = function
+    return function
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def corpus_paths(args):
+    return generate_corpus(args.corpus, args.images, args.width, args.height, tuple(args.formats.split(",")))
+
+
+class StubVar:
+    """代替 Tk 变量（StringVar 等），只提供用到的接口"""
+
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+    def trace_add(self, mode, callback):
+        pass
+
+
+class StubRoot:
+    """代替 Tk 根窗口，只提供屏幕尺寸"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def winfo_screenwidth(self):
+        return self.width
+
+    def winfo_screenheight(self):
+        return self.height
+
+
+class InlineDispatcher:
+    """没有 Tk 时直接在工作线程里执行回调"""
+
+    def call_soon(self, callback, *args):
+        callback(*args)
+
+
+@benchmark
+def bench_folder_listing(args):
+    """ImageManager.get_images_in_folder：冷索引（新数据库）和热索引（目录未变化）"""
+    from folder_index import FolderIndex
+    from image_manager import ImageManager
+
+    corpus_paths(args)
+    results = {"cold_ms": [], "warm_ms": []}
+    for round_index in range(args.rounds):
+        # 每轮换一个新的索引数据库，模拟首次打开文件夹
+        FolderIndex._shared = FolderIndex(db_path=f"folder_index_{round_index}.db")
+        results["cold_ms"].append(timed(ImageManager.get_images_in_folder, args.corpus))
+        results["warm_ms"].append(timed(ImageManager.get_images_in_folder, args.corpus))
+    return results
+
+
+@benchmark
+def bench_thumbnails(args):
+    """ImageManager.load_thumbnail_image（generate_thumbnail 去掉 Tk 转换）：冷缓存逐张生成、热缓存逐张读取"""
+    from image_manager import ImageManager
+
+    paths = corpus_paths(args)
+    cold = [timed(ImageManager.load_thumbnail_image, path) for path in paths]
+    warm = []
+    for _ in range(args.rounds):
+        warm.extend(timed(ImageManager.load_thumbnail_image, path) for path in paths)
+    return {"cold_ms_per_image": cold, "warm_ms_per_image": warm}
+
+
+@benchmark
+def bench_local_page(args):
+    """LocalImageManager.get_image_data：每个窗口的数据准备（索引已建立）"""
+    from source.UI.local_image_manager import LocalImageManager
+
+    corpus_paths(args)
+    manager = LocalImageManager(StubVar("English"), images_per_page=args.local_window)
+    manager.set_folder(args.corpus)
+    manager.get_image_data()  # 建立索引
+    pages = max(manager.get_total_pages(), 1)
+    timings = []
+    for _ in range(args.rounds):
+        for page in range(pages):
+            manager.current_page = page
+            timings.append(timed(manager.get_image_data))
+    return {"page_ms": timings}
+
+
+def _stub_server(args, objects=()):
+    from stub_oss import StubOSSServer
+
+    buffer = io.BytesIO()
+    synthetic_image(100, 56).save(buffer, "JPEG")
+    return StubOSSServer(args.latency_ms, buffer.getvalue(), objects)
+
+
+@benchmark
+def bench_oss_listing(args):
+    """AliyunOSS.list_wallpapers：按 marker 分页列举全部对象"""
+    from cloud_services.aliyun_oss import AliyunOSS
+    from stub_oss import STUB_BUCKET
+
+    server = _stub_server(args, [f"wallpapers/{index:06d}.jpg" for index in range(args.oss_objects)])
+    try:
+        oss = AliyunOSS("benchmark", "benchmark", server.base_url, STUB_BUCKET)
+        timings = []
+        for _ in range(args.rounds):
+            timings.append(timed(oss.list_wallpapers, "wallpapers/"))
+        return {"list_all_ms": timings}
+    finally:
+        server.close()
+
+
+@benchmark
+def bench_oss_thumbnails(args):
+    """
+    AliyunOSS.load_thumbnail_image（fetch_thumbnail 去掉 Tk 转换）：一页缩略图经 ThumbnailWorker 并发获取，
+    冷缓存（新 URL）和热缓存（本地缩略图存储）各测一次。
+    缩略图 URL 直接指向替身服务，不经过 bucket 子域名。
+    """
+    from cloud_services.aliyun_oss import AliyunOSS
+    from thumbnail_worker import ThumbnailWorker
+
+    server = _stub_server(args)
+    oss = AliyunOSS("benchmark", "benchmark", server.base_url, "benchmark")
+    worker = ThumbnailWorker(InlineDispatcher(), oss.load_thumbnail_image, max_workers=args.oss_concurrency)
+
+    def load_page(urls):
+        done = threading.Event()
+        remaining = [len(urls)]
+        lock = threading.Lock()
+
+        def on_ready(url, image):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    done.set()
+
+        start = time.perf_counter()
+        worker.submit(urls, on_ready)
+        if not done.wait(timeout=60):
+            raise RuntimeError("thumbnail page did not finish within 60s")
+        return (time.perf_counter() - start) * 1000
+
+    try:
+        results = {"cold_page_ms": [], "warm_page_ms": []}
+        for _ in range(args.rounds):
+            run_id = uuid.uuid4().hex
+            urls = [f"{server.base_url}/wallpapers/{run_id}_{index}.jpg?x-oss-process=image/resize,w_100"
+                    for index in range(args.page_size)]
+            results["cold_page_ms"].append(load_page(urls))
+            results["warm_page_ms"].append(load_page(urls))
+        return results
+    finally:
+        worker.shutdown()
+        oss.thumbnail_fetcher.close()
+        server.close()
+
+
+@benchmark
+def bench_auto_switch(args):
+    """
+    AutoSwitcher.auto_switch_wallpaper 的一次切换（recording 后端，不修改桌面）：
+    首次切换包含建立播放列表；之后每次切换前等待后台预取完成，测量常规切换耗时。
+    """
+    from auto_switcher import AutoSwitcher
+    from wallpaper_backends import RecordingBackend
+    from wallpaper_manager import WallpaperManager
+    from wallpaper_renderer import WallpaperRenderer
+
+    corpus_paths(args)
+    WallpaperManager.backend = RecordingBackend(verbose=False)
+    config = {"last_folder": args.corpus, "rotate_library": False, "skip_near_duplicates": False,
+              "playlist_mode": "sequential"}
+    root = StubRoot(*args.screen)
+    switcher = AutoSwitcher(root, config, StubVar(args.corpus), StubVar())
+    renderer = WallpaperRenderer.shared()
+
+    def wait_for_prefetch():
+        # 渲染器是单线程执行器，提交一个已渲染的任务并等待即可确保之前的预取都已完成
+        upcoming = switcher.get_upcoming_images(1)
+        if upcoming:
+            renderer.submit(upcoming[0], switcher.screen_target).result()
+
+    try:
+        first = timed(switcher.auto_switch_wallpaper)
+        ticks = []
+        for _ in range(args.switch_ticks):
+            wait_for_prefetch()
+            ticks.append(timed(switcher.auto_switch_wallpaper))
+        return {"first_tick_ms": [first], "tick_ms": ticks, "backend_calls": [len(WallpaperManager.backend.calls)]}
+    finally:
+        switcher.shutdown()
+        renderer.shutdown()
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "n": len(values),
+        "min": values[0],
+        "median": statistics.median(values),
+        "mean": statistics.mean(values),
+        "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+        "max": values[-1],
+    }
+
+
+def run_child(args):
+    """子进程：在临时工作目录中运行一个基准，结果写入 --result-file"""
+    os.chdir(tempfile.mkdtemp(prefix=f"wallpapercube_bench_{args.run}_"))
+    metrics = BENCHMARKS[args.run](args)
+    with open(args.result_file, "w") as file:
+        json.dump({name: summarize(values) for name, values in metrics.items() if values}, file)
+
+
+def child_command(args, name, result_file):
+    command = [sys.executable, os.path.abspath(__file__), "--run", name, "--result-file", result_file]
+    for option in ("images", "width", "height", "formats", "corpus", "rounds", "page_size", "local_window",
+                   "oss_objects", "oss_concurrency", "latency_ms", "switch_ticks"):
+        command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    command += ["--screen", "x".join(str(value) for value in args.screen)]
+    return command
+
+
+def environment():
+    from PIL import __version__ as pillow_version
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pillow": pillow_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """按中位数与基线比较，返回回归列表 [(基准, 指标, 基线, 当前, 比例)]"""
+    regressions = []
+    print(f"\n{'benchmark':<16} {'metric':<20} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, metrics in results["results"].items():
+        for metric, stats in metrics.items():
+            old = baseline.get("results", {}).get(name, {}).get(metric)
+            if not old or not old["median"] or metric == "backend_calls":
+                continue
+            ratio = stats["median"] / old["median"]
+            flag = "  REGRESSION" if ratio > 1 + threshold else ""
+            print(f"{name:<16} {metric:<20} {old['median']:>10.2f} {stats['median']:>10.2f} {ratio - 1:>+7.0%}{flag}")
+            if flag:
+                regressions.append((name, metric, old["median"], stats["median"], ratio))
+    return regressions
+
+
+def parse_screen(value):
+    width, height = (int(part) for part in value.lower().split("x"))
+    return width, height
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WallpaperCube hot-path benchmark suite")
+    parser.add_argument("--images", type=int, default=200, help="synthetic images in the corpus")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--formats", default="jpg,png")
+    parser.add_argument("--corpus", help="corpus folder (default: a temp folder keyed by size)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=24, help="OSS page size")
+    parser.add_argument("--local-window", type=int, default=1000, help="images per local grid window")
+    parser.add_argument("--oss-objects", type=int, default=1000)
+    parser.add_argument("--oss-concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=5, help="simulated OSS round-trip latency")
+    parser.add_argument("--switch-ticks", type=int, default=20)
+    parser.add_argument("--screen", type=parse_screen, default=(1920, 1080), help="screen size for variants")
+    parser.add_argument("--only", help="comma-separated benchmarks: " + ",".join(BENCHMARKS))
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--run", choices=BENCHMARKS, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.corpus = os.path.abspath(args.corpus or os.path.join(
+        tempfile.gettempdir(), f"wallpapercube_corpus_{args.images}_{args.width}x{args.height}_{args.formats}"
+    ).replace(",", "-"))
+
+    if args.run:
+        run_child(args)
+        return 0
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    # 语料在父进程中生成一次，子进程直接复用
+    corpus_paths(args)
+    results = {"environment": environment(), "parameters": {
+        key: value for key, value in vars(args).items() if key not in ("run", "result_file", "output", "compare", "only")
+    }, "results": {}}
+    for name in names:
+        result_file = os.path.join(tempfile.mkdtemp(prefix="wallpapercube_result_"), "result.json")
+        completed = subprocess.run(child_command(args, name, result_file), capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{name}: failed\n{completed.stderr}")
+            results["results"][name] = {"error": completed.stderr.strip().splitlines()[-1:]}
+            continue
+        with open(result_file) as file:
+            results["results"][name] = json.load(file)
+        for metric, stats in results["results"][name].items():
+            print(f"{name:<16} {metric:<20} median {stats['median']:9.2f}  p95 {stats['p95']:9.2f}  (n={stats['n']})")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults written to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+    failed = any("error" in metrics for metrics in results["results"].values())
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
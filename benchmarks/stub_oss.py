@@ -0,0 +1,97 @@
+"""
+基准测试用的本地 OSS 替身服务：列举对象（ListObjects XML）和图片处理缩略图接口。
+不需要网络和真实的 bucket，可设置每个请求的延迟来模拟网络往返。
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from xml.sax.saxutils import escape
+
+STUB_BUCKET = "benchmark"
+
+
+class StubOSSServer:
+    """
+    本地的 OSS 替身服务，支持 HTTP/1.1 keep-alive。
+    以 IP 作为 endpoint 时 oss2 使用 path-style 地址（/bucket/?prefix=...），按 ListObjects 协议分页返回 objects；
+    其他 GET 请求都返回同一张缩略图。
+    """
+
+    def __init__(self, latency_ms=0, image_bytes=b"", objects=()):
+        """
+        :param latency_ms: 每个请求的模拟延迟（毫秒）。
+        :param image_bytes: 缩略图请求返回的图片数据。
+        :param objects: 列举时返回的对象 key 列表。
+        """
+        stub = self
+        self.objects = sorted(objects)
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 头和响应体分两次写出，keep-alive 下 Nagle + 延迟 ACK 会给每个请求多加约 40ms
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                time.sleep(latency_ms / 1000)
+                url = urlsplit(self.path)
+                if url.path.rstrip("/") == f"/{STUB_BUCKET}" and "x-oss-process" not in url.query:
+                    self._send(200, "application/xml", stub.list_objects(parse_qs(url.query)))
+                else:
+                    self._send(200, "image/jpeg", image_bytes)
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("x-oss-request-id", "stub")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def list_objects(self, query):
+        """按 prefix、marker、max-keys 返回一页 ListBucketResult"""
+        prefix = query.get("prefix", [""])[0]
+        marker = query.get("marker", [""])[0]
+        max_keys = int(query.get("max-keys", ["100"])[0])
+        keys = [key for key in self.objects if key.startswith(prefix) and key > marker]
+        page, truncated = keys[:max_keys], len(keys) > max_keys
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><LastModified>2024-01-01T00:00:00.000Z</LastModified>"
+            f"<ETag>\"{index:032x}\"</ETag><Type>Normal</Type><Size>1048576</Size>"
+            f"<StorageClass>Standard</StorageClass></Contents>"
+            for index, key in enumerate(page)
+        )
+        body = (
+            f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><ListBucketResult><Name>{STUB_BUCKET}</Name>"
+            f"<Prefix>{escape(prefix)}</Prefix><Marker>{escape(marker)}</Marker><MaxKeys>{max_keys}</MaxKeys>"
+            f"<Delimiter></Delimiter><IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"
+            f"{f'<NextMarker>{escape(page[-1])}</NextMarker>' if truncated else ''}{contents}</ListBucketResult>"
+        )
+        return body.encode()
+
+    def reset_counters(self):
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,241 @@
+# image_grid.py
+import math
+import time
+from tkinter import Label
+from source.instrumentation import Instrumentation
+
+CELL_WIDTH = 120  # 每张图片约 120px
+CELL_HEIGHT = 140
+OVERSCAN_ROWS = 1  # 可见区域上下额外准备的行数，滚动时更平滑
+MAX_TEXT_LENGTH = 16
+
+
+class _GridCell:
+    """网格中可复用的一个格子（缩略图 Label + 已缓存/本地已有标记）"""
+
+    def __init__(self, canvas, placeholder_image):
+        self.index = None
+        self.label = Label(canvas, image=placeholder_image, compound="top", bg="white")
+        self.mark = Label(self.label, text="✔", fg="green", bg="white", font=("Arial", 14))
+        self.mark_kind = "cached"
+        self.window_id = canvas.create_window(0, 0, window=self.label, anchor="nw", state="hidden")
+
+
+class ImageGrid:
+    """
+    虚拟化的图片网格。
+    只为可见区域创建有限数量的格子，滚动或翻页时复用这些格子，只替换图片和文字；
+    窗口缩放时只有列数变化才重新排列（由 LayoutScheduler 合并 <Configure> 事件后调用），
+    支持直接滚动浏览上千张图片。
+    """
+
+    def __init__(self, canvas, placeholder_image, scrollbar=None, on_visible=None, instrumentation=None,
+                 photo_cache=None):
+        """
+        :param canvas: 承载网格的 Canvas。
+        :param placeholder_image: 缩略图未就绪时显示的占位图。
+        :param scrollbar: 可选的纵向滚动条。
+        :param on_visible: 可见条目变化时的回调 on_visible(items)，用于按需加载缩略图。
+        :param instrumentation: 记录布局耗时的 Instrumentation，默认不记录。
+        :param photo_cache: PhotoImageCache；条目没有缩略图时，格子显示前按 cache_key 查询。
+        """
+        self.canvas = canvas
+        self.instrumentation = instrumentation or Instrumentation()
+        self.placeholder_image = placeholder_image
+        self.scrollbar = scrollbar
+        self.on_visible = on_visible
+        self.photo_cache = photo_cache
+        self.on_click = None
+        self.items = []
+        self.columns = 0
+        self._index_by_path = {}
+        self._cells = []
+        self._cell_by_index = {}
+        self._rendered_range = None
+
+        self.canvas.configure(yscrollincrement=CELL_HEIGHT // 4)
+        if self.scrollbar is not None:
+            self.scrollbar.configure(command=self._yview)
+            self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        # 两个网格都会注册全局滚轮事件，由指针位置决定由谁处理；destroy 时只移除自己的处理函数
+        self._wheel_bindings = [
+            (sequence, self.canvas.bind_all(sequence, self._on_mousewheel, add="+"))
+            for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>")
+        ]
+
+    def destroy(self):
+        """销毁画布前调用：移除注册到 all 上的滚轮处理函数，其他网格的绑定保持不变"""
+        for sequence, funcid in self._wheel_bindings:
+            script = self.canvas.bind_all(sequence)
+            remaining = "\n".join(line for line in script.split("\n") if funcid not in line)
+            self.canvas.tk.call("bind", "all", sequence, remaining)
+            self.canvas.deletecommand(funcid)
+        self._wheel_bindings = []
+
+    def compute_columns(self):
+        """按画布宽度计算列数"""
+        canvas_width = self.canvas.winfo_width()
+        if canvas_width <= 1:  # 默认列数
+            return 5
+        return max(canvas_width // CELL_WIDTH, 1)
+
+    def set_items(self, items, on_click, keep_scroll=False):
+        """
+        替换网格中的全部条目并滚动到顶部。
+        :param items: 图片数据列表，每项包含 thumbnail、text、path，可选 is_cached。
+        :param on_click: 点击回调 on_click(item)。
+        :param keep_scroll: 保持当前滚动位置（文件夹内容变化时刷新用）。
+        """
+        self.items = list(items)
+        self.on_click = on_click
+        self._cell_by_index = {}  # 所有格子都需要重新填充
+        self._index_by_path = {item.get("path"): index for index, item in enumerate(self.items)}
+        self.columns = self.compute_columns()
+        self._update_scrollregion()
+        if not keep_scroll:
+            self.canvas.yview_moveto(0)
+        self._render(force=True)
+
+    def get_item(self, path):
+        index = self._index_by_path.get(path)
+        return None if index is None else self.items[index]
+
+    def set_thumbnail(self, path, thumbnail):
+        """更新某个条目的缩略图，可见时立即替换"""
+        self._update_item(path, thumbnail=thumbnail)
+
+    def mark_cached(self, path):
+        """为条目添加“已缓存”标记"""
+        self._update_item(path, is_cached=True)
+
+    def mark_local_duplicate(self, path, local_path):
+        """为条目添加“本地已有”标记"""
+        self._update_item(path, local_duplicate=local_path)
+
+    def _update_item(self, path, **changes):
+        index = self._index_by_path.get(path)
+        if index is None:
+            return
+        self.items[index].update(changes)
+        cell = self._cell_by_index.get(index)
+        if cell is not None:
+            self._fill_cell(cell, index)
+
+    def relayout(self):
+        """
+        窗口尺寸变化后调整布局：列数变化时重新排列格子，否则只补齐新露出的行。
+        :return: 是否重新排列了格子。
+        """
+        columns = self.compute_columns()
+        if columns == self.columns:
+            self.refresh_visible()
+            return False
+        self.columns = columns
+        self._update_scrollregion()
+        self._render(force=True)
+        return True
+
+    def refresh_visible(self):
+        """只为新露出的区域分配格子，不重新排列"""
+        self._render()
+
+    def _update_scrollregion(self):
+        rows = math.ceil(len(self.items) / self.columns) if self.items else 0
+        self.canvas.configure(scrollregion=(0, 0, self.columns * CELL_WIDTH, max(rows * CELL_HEIGHT, 1)))
+
+    def _visible_range(self):
+        top = self.canvas.canvasy(0)
+        height = self.canvas.winfo_height()
+        if height <= 1:
+            height = 600
+        first_row = max(int(top // CELL_HEIGHT) - OVERSCAN_ROWS, 0)
+        last_row = int((top + height) // CELL_HEIGHT) + OVERSCAN_ROWS
+        return first_row * self.columns, min((last_row + 1) * self.columns, len(self.items))
+
+    def _render(self, force=False):
+        start, end = self._visible_range()
+        if not force and (start, end) == self._rendered_range:
+            return
+        began = time.perf_counter()
+        cell_count = len(self._cells)
+
+        # 仍在可见范围内的格子保持不动，其余格子回收后分配给新露出的条目
+        kept = {index: cell for index, cell in self._cell_by_index.items() if start <= index < end}
+        kept_ids = {id(cell) for cell in kept.values()}
+        free_cells = [cell for cell in self._cells if id(cell) not in kept_ids]
+
+        self._cell_by_index = {}
+        for index in range(start, end):
+            cell = kept.get(index)
+            if cell is None:
+                if not free_cells:
+                    free_cells.append(self._create_cell())
+                cell = free_cells.pop()
+                self._fill_cell(cell, index)
+            self._cell_by_index[index] = cell
+            if force or index not in kept:
+                self._place_cell(cell, index)
+
+        for cell in free_cells:
+            cell.index = None
+            self.canvas.itemconfigure(cell.window_id, state="hidden")
+
+        self._rendered_range = (start, end)
+        if self.instrumentation.enabled:
+            self.instrumentation.record("grid.layout", "ui", began, time.perf_counter() - began, {
+                "cells": end - start, "created": len(self._cells) - cell_count, "force": force
+            })
+        if self.on_visible and end > start:
+            self.on_visible(self.items[start:end])
+
+    def _create_cell(self):
+        cell = _GridCell(self.canvas, self.placeholder_image)
+        cell.label.bind("<Button-1>", lambda event, c=cell: self._on_cell_click(c))
+        self._cells.append(cell)
+        return cell
+
+    def _fill_cell(self, cell, index):
+        item = self.items[index]
+        cell.index = index
+        if item.get("thumbnail") is None and self.photo_cache is not None and "cache_key" in item:
+            # 只为真正显示的格子查询内存缓存，命中率才有意义
+            item["thumbnail"] = self.photo_cache.get(item["cache_key"])
+        thumbnail = item.get("thumbnail") or self.placeholder_image
+        text = item.get("text", "")
+        if len(text) > MAX_TEXT_LENGTH:
+            text = text[:MAX_TEXT_LENGTH - 1] + "…"
+        cell.label.configure(image=thumbnail, text=text)
+        cell.label.photo = thumbnail  # 防止垃圾回收
+        kind = "cached" if item.get("is_cached", False) else "local" if item.get("local_duplicate") else None
+        if kind is None:
+            cell.mark.place_forget()
+            return
+        if kind != cell.mark_kind:
+            # ✔：已下载；≈：本地图库中已有近似重复的图片
+            cell.mark.configure(text="✔" if kind == "cached" else "≈", fg="green" if kind == "cached" else "#1e6fd9")
+            cell.mark_kind = kind
+        cell.mark.place(relx=1.0, rely=0.0, anchor="ne")  # 定位在右上角
+
+    def _place_cell(self, cell, index):
+        row, column = divmod(index, self.columns)
+        self.canvas.coords(cell.window_id, column * CELL_WIDTH + 10, row * CELL_HEIGHT + 10)
+        self.canvas.itemconfigure(cell.window_id, state="normal")
+
+    def _on_cell_click(self, cell):
+        if cell.index is not None and self.on_click:
+            self.on_click(self.items[cell.index])
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self._render()
+
+    def _on_mousewheel(self, event):
+        widget = self.canvas.winfo_containing(event.x_root, event.y_root)
+        canvas_path = str(self.canvas)
+        if widget is None or not (str(widget) == canvas_path or str(widget).startswith(canvas_path + ".")):
+            return
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.canvas.yview_scroll(-3, "units")
+        else:
+            self.canvas.yview_scroll(3, "units")
+        self._render()
@@ -0,0 +1,60 @@
+# layout_scheduler.py
+from source.instrumentation import Instrumentation
+
+
+class LayoutScheduler:
+    """
+    合并窗口尺寸变化事件。
+    一连串 <Configure> 事件在尺寸稳定 delay_ms 之后只触发一次 grid.relayout()；
+    列数由网格自己记录和比较（set_items 也会更新它），列数未变时网格只补齐新露出的行。
+    几何事件永远不会触发数据加载。
+    """
+
+    def __init__(self, widget, grid, delay_ms=80, name="", instrumentation=None):
+        """
+        :param widget: 需要监听 <Configure> 的组件。
+        :param grid: 需要重新布局的 ImageGrid，relayout() 返回是否重新排列了格子。
+        :param delay_ms: 尺寸稳定多久后再布局（毫秒）。
+        :param name: 计数器名称中使用的名字，如 layout.local.relayout。
+        :param instrumentation: 记录事件和布局次数的 Instrumentation，默认不记录。
+        """
+        self.widget = widget
+        self.grid = grid
+        self.delay_ms = delay_ms
+        self.name = name
+        self.instrumentation = instrumentation or Instrumentation()
+        self._pending = None
+        # 统计：收到的事件数、实际重新布局次数、因列数未变而跳过的次数
+        self.events = 0
+        self.relayouts = 0
+        self.skipped = 0
+        self.widget.bind("<Configure>", self.on_configure)
+
+    def on_configure(self, event=None):
+        self.events += 1
+        self.instrumentation.count(f"layout.{self.name}.configure")
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+        self._pending = self.widget.after(self.delay_ms, self.flush)
+
+    def flush(self):
+        """立即执行等待中的布局"""
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+
+        if self.grid.relayout():
+            self.relayouts += 1
+            self.instrumentation.count(f"layout.{self.name}.relayout")
+        else:
+            self.skipped += 1
+            self.instrumentation.count(f"layout.{self.name}.skipped")
+
+    def cancel(self):
+        """取消等待中的布局（销毁网格前调用）"""
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+
+    def stats(self):
+        return {"events": self.events, "relayouts": self.relayouts, "skipped": self.skipped}
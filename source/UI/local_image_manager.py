@@ -2,52 +2,90 @@
 import os
 import math
 from tkinter import Button, Label, Frame
-from source.image_manager import ImageManager
+from source.image_manager import ImageManager, THUMBNAIL_SIZE
 from source.language_manager import LanguageManager
 
+# 每“页”是一个大窗口：网格是虚拟化的，只为可见格子创建控件和加载缩略图，
+# 一次交给网格上千张图片也只是条目列表；超过窗口大小的文件夹才需要翻页
+LOCAL_WINDOW_SIZE = 1000
+
 
 class LocalImageManager:
-    def __init__(self, current_language=None, images_per_page=24):
+    def __init__(self, current_language=None, images_per_page=LOCAL_WINDOW_SIZE, criteria=None):
+        """
+        :param images_per_page: 每次交给网格的图片数量（滚动浏览的窗口大小）。
+        :param criteria: 元数据筛选和排序条件，如 {"orientation": "landscape", "min_width": 3840, "sort": "-brightness"}。
+        """
         self.images_per_page = images_per_page
+        self.criteria = criteria
         self.current_page = 0
         self.folder_path = ""
         self.current_language = current_language
+        self.page_label = None
 
     def set_folder(self, folder_path):
         """设置图片文件夹路径并重置分页"""
         self.folder_path = folder_path
         self.current_page = 0
 
+    def set_criteria(self, criteria):
+        """设置筛选和排序条件（None 表示全部图片按文件名排序）并重置分页"""
+        self.criteria = criteria or None
+        self.current_page = 0
+
+    def clamp_page(self):
+        """文件减少后当前页可能越界，退回到最后一页，返回页码是否变化"""
+        last_page = max(self.get_total_pages() - 1, 0)
+        if self.current_page > last_page:
+            self.current_page = last_page
+            return True
+        return False
+
+    def update_page_label(self):
+        if self.page_label is not None:
+            self.page_label.config(
+                text=LanguageManager.get_text(self.current_language.get(), "page", page=self.current_page + 1)
+            )
+
     def get_total_pages(self):
         """计算总页数"""
-        total_images = len(self._get_images())
+        if not self.folder_path:
+            return 0
+        total_images = ImageManager.count_images_in_folder(self.folder_path, self.criteria)
         return math.ceil(total_images / self.images_per_page)
 
     def get_current_page_images(self):
         """获取当前页的图片路径"""
-        images = self._get_images()
-        start_index = self.current_page * self.images_per_page
-        end_index = min(start_index + self.images_per_page, len(images))
-        return images[start_index:end_index]
-
-    def _get_images(self):
-        """获取文件夹中的所有图片"""
         if not self.folder_path:
             return []
-        return ImageManager.get_images_in_folder(self.folder_path)
+        start_index = self.current_page * self.images_per_page
+        if self.criteria:
+            entries = ImageManager.get_image_entries_page(
+                self.folder_path, start_index, self.images_per_page, self.criteria
+            )
+            return [path for path, _ in entries]
+        return ImageManager.get_images_page(self.folder_path, start_index, self.images_per_page)
 
     def get_image_data(self):
-        """获取当前页的图片数据（包括缩略图和路径）"""
-        images = self.get_current_page_images()
+        """
+        获取当前窗口的图片数据。
+        thumbnail 均为 None：格子显示时网格才查询内存缓存，未命中的由后台线程池异步生成。
+        """
+        if not self.folder_path:
+            return []
+        start_index = self.current_page * self.images_per_page
+        entries = ImageManager.get_image_entries_page(
+            self.folder_path, start_index, self.images_per_page, self.criteria
+        )
         image_data = []
-        for image_path in images:
-            thumbnail = ImageManager.generate_thumbnail(image_path)
-            if thumbnail:
-                image_data.append({
-                    "thumbnail": thumbnail,
-                    "text": os.path.basename(image_path),
-                    "path": image_path
-                })
+        for image_path, mtime in entries:
+            cache_key = (image_path, mtime, THUMBNAIL_SIZE)
+            image_data.append({
+                "thumbnail": None,
+                "text": os.path.basename(image_path),
+                "path": image_path,
+                "cache_key": cache_key
+            })
         return image_data
 
     def get_pagination_ui(self, parent_frame, update_callback):
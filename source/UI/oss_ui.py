@@ -1,7 +1,16 @@
 import math
 import os
+import threading
 from tkinter import Frame, Label, Canvas, Scrollbar, Button
+from PIL import ImageTk
 from source.language_manager import LanguageManager
+from source.image_manager import ImageManager, THUMBNAIL_SIZE
+from source.thumbnail_worker import ThumbnailWorker
+from source.cloud_services.oss_listing_cache import OSSListingCache
+from source.cloud_services.download_engine import DownloadEngine
+
+OSS_PREFIX = "wallpapers/"
+DEFAULT_THUMBNAIL_CONCURRENCY = 8
 
 class OSSUIHandler:
     def __init__(self, root, oss, status_var, current_language, uiInstance):
@@ -11,133 +20,289 @@ class OSSUIHandler:
         self.uiInstance = uiInstance
         self.status_var = status_var
         self.current_language = current_language
-        self.oss_canvas = None
-        self.oss_scrollable_frame = None
         self.current_page = 0
+        self.page_label = None
+        self.listing_complete = False  # 列表是否已完整列举
+        self.listing_marker = ""  # 已列举部分之后的下一页 marker
+        self.listing_refreshing = False  # 是否正在后台列举
+        self.listing_refreshed = False  # 本次运行是否已刷新过列表
+        self._page_wallpapers = {}  # 当前页 对象 key -> 壁纸信息，供后台线程读取
+        # 并发获取缩略图，HTTP 连接由 AliyunOSS 的连接池复用
+        self.thumbnail_worker = ThumbnailWorker(
+            uiInstance.dispatcher, self._load_thumbnail_image,
+            max_workers=uiInstance.oss_config.get("oss_thumbnail_concurrency", DEFAULT_THUMBNAIL_CONCURRENCY),
+        )
+        # 原图在后台分片下载，界面不会被大文件卡住
+        self.download_engine = DownloadEngine(self.oss)
+        self._download_percent = {}  # 对象 key -> 最近一次交给主线程的进度，避免频繁刷新状态栏
+        self._download_lock = threading.Lock()  # 进度回调来自多个下载线程
+        # 对象 key -> 近似重复的本地图片路径，由缩略图的感知哈希得出
+        self._local_duplicates = {}
+
+        # 先使用上次缓存的列表，后台刷新完成后再更新
+        if self.oss.enabled:
+            cached_listing = OSSListingCache.load(self._listing_cache_id())
+            if cached_listing:
+                self.oss_images = cached_listing["wallpapers"]
+                self.listing_complete = cached_listing["complete"]
+                self.listing_marker = cached_listing.get("marker", "")
+
+    def _listing_cache_id(self):
+        return f"{self.oss.bucket.endpoint}/{self.oss.bucket.bucket_name}/{OSS_PREFIX}"
 
     def get_total_pages(self):
         """计算 OSS 壁纸的总页数"""
         if not hasattr(self, 'oss_images') or not self.oss_images:
             return 1  # 如果没有加载图片，返回默认总页数为 1
 
-        total_images = len(self.oss_images)  # 假设 oss_images 包含所有壁纸数据
-        return math.ceil(total_images / self.uiInstance.images_per_page)
+        total_images = len(self.oss_images)
+        total_pages = math.ceil(total_images / self.uiInstance.images_per_page)
+        # 列表尚未列举完时允许继续翻到下一页
+        return total_pages if self.listing_complete else total_pages + 1
+
+    def _get_current_page_wallpapers(self):
+        if not self.oss_images:
+            return []
+        start_index = self.current_page * self.uiInstance.images_per_page
+        return self.oss_images[start_index:start_index + self.uiInstance.images_per_page]
+
+    def _needed_count(self):
+        # 显示当前页所需的条目数
+        return (self.current_page + 1) * self.uiInstance.images_per_page
+
+    def refresh_listing(self):
+        """在后台从头重新列举，只列举到当前页为止，之后的部分翻页时再按 marker 获取"""
+        if self.listing_refreshing:
+            return
+        self._start_listing([], "")
+
+    def _list_more_if_needed(self):
+        """翻到已列举部分之后时，从保存的 marker 继续列举下一批"""
+        if self.listing_refreshing or self.listing_complete or not self.listing_refreshed:
+            return
+        if len(self.oss_images or []) < self._needed_count():
+            self._start_listing(list(self.oss_images or []), self.listing_marker)
+
+    def _start_listing(self, wallpapers, marker):
+        self.listing_refreshing = True
+        threading.Thread(
+            target=self._listing_worker, args=(wallpapers, marker, self._needed_count()), daemon=True
+        ).start()
+
+    def _listing_worker(self, wallpapers, marker, needed):
+        dispatcher = self.uiInstance.dispatcher
+        try:
+            complete = False
+            while not complete and len(wallpapers) < needed:
+                page, next_marker, is_truncated = self.oss.list_wallpapers_page(prefix=OSS_PREFIX, marker=marker)
+                wallpapers.extend(page)
+                complete = not is_truncated
+                marker = "" if complete else next_marker
+            OSSListingCache.save(self._listing_cache_id(), wallpapers, complete, marker)
+            dispatcher.call_soon(self._on_listing_loaded, wallpapers, complete, marker)
+        except Exception as e:
+            dispatcher.call_soon(self._on_listing_failed, e)
+
+    def _on_listing_loaded(self, wallpapers, complete, marker):
+        """列举结果回到主线程：当前页内容（按 ETag 比较）有变化时才重新显示"""
+        old_page = [(w["original"], w.get("etag")) for w in self._get_current_page_wallpapers()]
+        self.oss_images = wallpapers
+        self.listing_complete = complete
+        self.listing_marker = marker
+        self.listing_refreshing = False
+        self.listing_refreshed = True
+        self.current_page = min(self.current_page, max(self.get_total_pages() - 1, 0))
+        new_page = [(w["original"], w.get("etag")) for w in self._get_current_page_wallpapers()]
+        if new_page != old_page:
+            self.display_oss_images()
+        else:
+            self._update_page_label()
+
+    def _on_listing_failed(self, error):
+        self.listing_refreshing = False
+        error_message = LanguageManager.get_text(self.current_language.get(), "oss_load_failed", error=str(error))
+        self.uiInstance.status_var.set(error_message)
+
+    def _update_page_label(self):
+        if self.page_label is not None:
+            self.page_label.config(
+                text=LanguageManager.get_text(self.current_language.get(), "page", page=self.current_page + 1)
+            )
 
     def _add_cached_mark(self, file_name):
         """为已下载的壁纸动态添加右上角“✔”标记"""
-        local_file_name = file_name.split("/")[-1]
-
-        # 遍历所有组件，寻找匹配的缩略图
-        for widget in self.oss_scrollable_frame.winfo_children():
-            if isinstance(widget, Label) and widget.cget("text") == local_file_name:
-                # 确保标记只添加到对应缩略图的右上角
-                print(f"Matched widget for file: {local_file_name}")
-
-                # 检查当前缩略图是否已有标记
-                if hasattr(widget, "cached_mark") and widget.cached_mark:
-                    print(f"Mark already exists for: {local_file_name}")
-                    return  # 如果已有标记，直接返回
-
-                # 添加“✔”标记
-                cached_label = Label(widget, text="✔", fg="green", bg="white", font=("Arial", 14))
-                cached_label.place(relx=1.0, rely=0.0, anchor="ne")  # 定位在右上角
-                widget.cached_mark = cached_label  # 保存标记引用，防止重复创建
-                print(f"Added ✔ mark for: {local_file_name}")
-                return
+        self.uiInstance.oss_grid.mark_cached(file_name)
+
+    def _local_copy_is_as_large(self, file_name, local_path):
+        """本地近似重复文件是否不小于 OSS 上的原图（文件越大通常分辨率或质量越高）"""
+        try:
+            local_size = os.path.getsize(local_path)
+        except OSError:
+            return False
+        wallpaper = self._page_wallpapers.get(file_name) or {}
+        return local_size >= wallpaper.get("size", 0)
 
     def download_and_set_wallpaper(self, file_name, event=None):
-        """下载壁纸并设置为桌面壁纸"""
+        """下载壁纸并设置为桌面壁纸；未下载过时在后台下载，完成后再设置"""
         local_path = os.path.abspath(f"downloads/{file_name.split('/')[-1]}")
 
-        try:
-            # 下载壁纸
-            if not os.path.exists(local_path):
-                self.oss.download_wallpaper(file_name, local_path)
+        if os.path.exists(local_path):
+            try:
+                os.utime(local_path)  # 刷新 mtime，供下载缓存按最近使用淘汰
+            except OSError as e:
+                print(f"Error touching cached wallpaper {local_path}: {e}")
+            self._set_downloaded_wallpaper(file_name, local_path)
+            return
+
+        # 本地图库中已有同一张壁纸（分辨率或编码不同）且不比 OSS 上的小时不再下载
+        local_duplicate = self._local_duplicates.get(file_name)
+        if local_duplicate and self.uiInstance.config.get("oss_prefer_local_duplicates", True) \
+                and self._local_copy_is_as_large(file_name, local_duplicate):
+            self.uiInstance.set_wallpaper(local_duplicate)
+            self.status_var.set(LanguageManager.get_text(
+                self.current_language.get(), "oss_using_local_copy", name=os.path.basename(local_duplicate)
+            ))
+            return
+
+        dispatcher = self.uiInstance.dispatcher
+        with self._download_lock:
+            self._download_percent[file_name] = -1
+        future = self.download_engine.download(
+            file_name, local_path,
+            on_progress=lambda done, total: self._on_download_progress(file_name, done, total),
+        )
+        future.add_done_callback(lambda f: dispatcher.call_soon(self._on_download_done, file_name, local_path, f))
+
+    def _on_download_progress(self, file_name, done, total):
+        """下载线程中调用：进度百分比变化时才交给主线程更新状态栏，这里不访问任何 Tk 对象"""
+        percent = int(done * 100 / total) if total else 100
+        with self._download_lock:
+            if percent == self._download_percent.get(file_name, percent):
+                return  # 进度未变化，或下载已结束
+            self._download_percent[file_name] = percent
+        self.uiInstance.dispatcher.call_soon(self._show_download_progress, file_name, percent)
+
+    def _show_download_progress(self, file_name, percent):
+        """主线程：在状态栏显示下载进度"""
+        with self._download_lock:
+            if file_name not in self._download_percent:
+                return  # 完成消息已先一步显示
+        self.status_var.set(LanguageManager.get_text(
+            self.current_language.get(), "oss_downloading", name=file_name.split('/')[-1], percent=percent
+        ))
+
+    def _on_download_done(self, file_name, local_path, future):
+        with self._download_lock:
+            self._download_percent.pop(file_name, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"Error downloading {file_name}: {error}")
+            self.status_var.set(
+                LanguageManager.get_text(self.current_language.get(), "oss_download_failed", error=error)
+            )
+            return
+        self.uiInstance.instrumentation.count("oss.download")
+        self._set_downloaded_wallpaper(file_name, local_path)
 
+    def _set_downloaded_wallpaper(self, file_name, local_path):
+        try:
             # 设置壁纸
             self.uiInstance.set_wallpaper(local_path)
 
             # 更新缓存标记
             self.root.after(0, self._add_cached_mark, file_name)
-
-            # 调试信息
-            print(f"Downloaded and marked: {file_name}")
-
-            # 更新状态栏
-            msgInfo = LanguageManager.get_text(self.current_language.get(), "wallpaper_set_to", wallpaper={file_name})
-
-            print(f"msgInfo msgInfo msgInfo: {msgInfo}")
-            # self.uiInstance.status_var.set(msgInfo)
-            # self.uiInstance.status_var.set(f"Wallpaper set: {local_path}")
         except Exception as e:
             self.uiInstance.status_var.set(f"Failed to download or set wallpaper: {e}")
 
     def display_oss_images(self, wallpapers=None):
-        """显示 OSS 壁纸"""
+        """显示当前页的 OSS 壁纸，只获取当前页的缩略图"""
         if not self.oss.enabled:
-            self.uiInstance.status_var.set(LanguageManager.get_text(self.current_language, "oss_not_configured"))
+            self.uiInstance.status_var.set(LanguageManager.get_text(self.current_language.get(), "oss_not_configured"))
             return
 
-        if wallpapers is None:
-            try:
-                wallpapers = self.oss.list_wallpapers(prefix="wallpapers/")
-                self.oss_images = wallpapers  # 初始化 oss_images
-                for wallpaper in wallpapers:
-                    local_file_name = wallpaper["original"].split("/")[-1]
-                    local_path = os.path.abspath(f"downloads/{local_file_name}")
-                    wallpaper["is_cached"] = os.path.exists(local_path)
-            except Exception as e:
-                error_message = LanguageManager.get_text(self.current_language, "oss_load_failed", error=str(e))
-                self.uiInstance.status_var.set(error_message)
-                return
-
-        # 准备图片数据
+        if wallpapers is not None:
+            self.oss_images = wallpapers
+        elif not self.listing_refreshed:
+            self.refresh_listing()
+        else:
+            self._list_more_if_needed()
+
+        if not self.oss_images:
+            self.uiInstance.status_var.set(LanguageManager.get_text(self.current_language.get(), "oss_loading"))
+
+        # 准备图片数据，网格显示格子时查询内存缓存，未命中的缩略图按可见区域异步获取
         image_data = []
-        for wallpaper in wallpapers:
-            thumbnail = self.oss.fetch_thumbnail(wallpaper["thumbnail"])
-            if thumbnail:
-                image_data.append({
-                    "thumbnail": thumbnail,
-                    "text": wallpaper["original"].split("/")[-1],
-                    "path": wallpaper["original"],
-                    "is_cached": wallpaper.get("is_cached", False)
-                })
+        page_wallpapers = self._get_current_page_wallpapers()
+        self._page_wallpapers = {wallpaper["original"]: wallpaper for wallpaper in page_wallpapers}
+        for wallpaper in page_wallpapers:
+            cache_key = (wallpaper["thumbnail"], wallpaper.get("etag"), THUMBNAIL_SIZE)
+            local_file_name = wallpaper["original"].split("/")[-1]
+            image_data.append({
+                "thumbnail": None,
+                "text": local_file_name,
+                "path": wallpaper["original"],
+                "is_cached": os.path.exists(os.path.abspath(f"downloads/{local_file_name}")),
+                "local_duplicate": self._local_duplicates.get(wallpaper["original"]),
+                "cache_key": cache_key
+            })
 
         # 调用 show_images
         self.uiInstance.show_images(
             images=image_data,
-            scrollable_frame=self.uiInstance.oss_scrollable_frame,
-            canvas=self.uiInstance.oss_canvas,
+            grid=self.uiInstance.oss_grid,
             on_click=lambda info: self.download_and_set_wallpaper(info["path"])
         )
+        self._update_page_label()
 
-    def select_oss_folder(self):
-        if not self.oss:
-            self.uiInstance.status_var.set(LanguageManager.get_text(self.current_language.get(), "oss_not_configured"))
+    def on_visible_items(self, items):
+        """可见条目变化时并发获取缺少的缩略图；新的请求会取消之前未完成的任务"""
+        self.thumbnail_worker.submit(
+            [info["path"] for info in items if info["thumbnail"] is None], self._on_thumbnail_ready
+        )
+
+    def _load_thumbnail_image(self, object_key):
+        # 在工作线程中执行
+        wallpaper = self._page_wallpapers.get(object_key)
+        if wallpaper is None:
+            return None
+        image = self.oss.load_thumbnail_image(wallpaper["thumbnail"], wallpaper.get("etag"))
+        if image is not None:
+            local_duplicate = ImageManager.find_local_duplicate(image)
+            if local_duplicate:
+                self._local_duplicates[object_key] = local_duplicate
+            else:
+                self._local_duplicates.pop(object_key, None)
+        return image
+
+    def _on_thumbnail_ready(self, object_key, image):
+        """缩略图到达后替换对应格子的占位图（主线程）"""
+        grid = self.uiInstance.oss_grid
+        info = grid.get_item(object_key)
+        if info is None:
             return
-        """加载 OSS 中的壁纸文件，并标记已下载的壁纸"""
-        if not self.oss.enabled:
+        with self.uiInstance.instrumentation.span("thumbnail.photo_image", "ui"):
+            thumbnail = ImageTk.PhotoImage(image)
+        self.uiInstance.photo_cache.put(info["cache_key"], thumbnail)
+        grid.set_thumbnail(object_key, thumbnail)
+        local_duplicate = self._local_duplicates.get(object_key)
+        if local_duplicate:
+            grid.mark_local_duplicate(object_key, local_duplicate)
+
+    def shutdown(self):
+        """取消缩略图任务和排队中的下载，并关闭连接池"""
+        self.thumbnail_worker.shutdown()
+        self.download_engine.shutdown()
+        if self.oss.enabled:
+            self.oss.thumbnail_fetcher.close()
+
+    def select_oss_folder(self):
+        """重新加载 OSS 中的壁纸列表"""
+        if not self.oss or not self.oss.enabled:
             self.uiInstance.status_var.set(LanguageManager.get_text(self.current_language.get(), "oss_not_configured"))
             return
-
-        try:
-            # 获取OSS壁纸列表
-            wallpapers = self.oss.list_wallpapers(prefix="wallpapers/")
-
-            # 检查本地缓存，标记哪些壁纸已下载
-            for wallpaper in wallpapers:
-                local_file_name = wallpaper["original"].split("/")[-1]  # 访问字典的 'original' 键
-                local_path = os.path.abspath(f"downloads/{local_file_name}")
-                wallpaper["is_cached"] = os.path.exists(local_path)
-
-            # 调试输出
-            print("Wallpapers loaded from OSS with cached status:", wallpapers)
-
-            # 显示OSS壁纸
-            self.display_oss_images(wallpapers)
-        except Exception as e:
-            error_message = LanguageManager.get_text(self.current_language.get(), "oss_load_failed", error=str(e))
-            self.uiInstance.status_var.set(error_message)
+        self.refresh_listing()
 
     def get_pagination_ui(self, parent_frame, update_callback):
         """生成分页按钮并返回容器"""
@@ -160,6 +325,8 @@ class OSSUIHandler:
             command=lambda: self.next_page_and_update(update_callback)
         )
 
+        self.page_label = page_label
+
         # 使用 grid 布局居中
         previous_button.grid(row=0, column=0, padx=10)
         page_label.grid(row=0, column=1, padx=0)
@@ -184,7 +351,7 @@ class OSSUIHandler:
 
     def on_canvas_resize(self, event):
         """窗口大小变化时更新布局"""
-        self.display_oss_images()
+        self.uiInstance.oss_grid.relayout()
 
     def update_ui_texts(self, current_language):
         pass
\ No newline at end of file
@@ -1,62 +1,218 @@
 import os
 import threading
+import time
 from config_manager import ConfigManager
-from image_manager import ImageManager
 from wallpaper_manager import WallpaperManager
+from wallpaper_prefetcher import WallpaperPrefetcher, DEFAULT_PREFETCH_DEPTH
+from wallpaper_renderer import WallpaperRenderer
+from switch_scheduler import SwitchScheduler, IntervalSchedule, create_schedule, MISSED_POLICIES
+from playlist import Playlist, PLAYLIST_MODES
+from image_library import ImageLibrary, LIBRARY_KEY
+from image_metadata import MetadataIndex, active_filter
+from perceptual_index import PerceptualIndex
+from instrumentation import Instrumentation
 
 class AutoSwitcher:
-    def __init__(self, root, config, folder_path_var, status_var):
+    def __init__(self, root, config, folder_path_var, status_var, dispatcher=None):
         """
         初始化自动切换功能模块。
         :param root: Tkinter 根窗口对象。
         :param config: 配置字典。
         :param folder_path_var: 保存当前文件夹路径的 StringVar 对象。
         :param status_var: 状态栏 StringVar 对象。
+        :param dispatcher: UIDispatcher 实例，切换在调度线程中执行，界面更新通过它回到主线程。
         """
         self.root = root
         self.config = config
         self.folder_path_var = folder_path_var
         self.status_var = status_var
-        self.auto_switch_task = None
+        self.dispatcher = dispatcher
+        self.scheduler = None
+        self.playlist = None
+        self._playlist_lock = threading.Lock()
+        self._filter = None  # 当前生效的 (auto_switch_filter 规则, 是否跳过近似重复)，None 表示尚未应用
+        # 调度线程不能访问 Tk 变量，文件夹路径和屏幕尺寸在主线程中同步过来
+        self.folder = folder_path_var.get()
+        self.folder_path_var.trace_add("write", self._on_folder_changed)
+        self.screen_target = WallpaperRenderer.screen_target(root, config)
+        # 在后台提前把接下来的几张壁纸渲染成屏幕尺寸，切换时直接使用
+        self.prefetcher = WallpaperPrefetcher(
+            WallpaperRenderer.shared(), config.get("prefetch_depth", DEFAULT_PREFETCH_DEPTH)
+        )
+
+    def _on_folder_changed(self, *args):
+        self.folder = self.folder_path_var.get()
+
+    def _refresh_screen_target(self):
+        self.screen_target = WallpaperRenderer.screen_target(self.root, self.config)
 
     def start_auto_switch(self, interval):
         """
         开始自动切换壁纸功能。
+        配置了 auto_switch_cron 或 auto_switch_times 时按 cron 表达式或每天的固定时刻切换，否则按间隔切换。
         :param interval: 自动切换间隔时间（秒）。
         """
         self.stop_auto_switch()  # 确保不会重复启动多个定时任务
-        self.auto_switch_task = self.root.after(interval * 1000, self.auto_switch_wallpaper)
+        self._refresh_screen_target()
+        try:
+            schedule = create_schedule(self.config, interval)
+        except ValueError as e:
+            print(f"Invalid auto-switch schedule, falling back to every {interval} seconds: {e}")
+            schedule = IntervalSchedule(interval)
+        missed_policy = self.config.get("auto_switch_missed", "skip")
+        if missed_policy not in MISSED_POLICIES:
+            missed_policy = "skip"
+        # 建立播放列表要读取整个索引，放到调度线程中进行，完成后再预取接下来的壁纸
+        self.scheduler = SwitchScheduler(
+            schedule, self.auto_switch_wallpaper, missed_policy, name="auto-switch", on_start=self._prepare
+        )
+        self.scheduler.start()
+
+    def _prepare(self):
+        """调度线程启动时建立播放列表并开始预取"""
+        self._get_playlist()
+        self._schedule_prefetch()
 
     def stop_auto_switch(self):
         """
         停止自动切换壁纸功能。
         """
-        if hasattr(self, "auto_switch_task") and self.auto_switch_task:
-            self.root.after_cancel(self.auto_switch_task)
-            self.auto_switch_task = None
+        if self.scheduler:
+            self.scheduler.stop()
+            self.scheduler = None
+
+    def _get_playlist(self):
+        """
+        返回当前播放模式对应的播放列表，来源或模式变化时重新创建（读取整个索引，只在调度线程中调用）。
+        默认只在当前文件夹中轮换，文件夹的变化由 FolderWatcher 和目录 mtime 及时反映；
+        rotate_library 为真时在整个图库（多个根文件夹和下载目录，重复图片只算一次）中轮换，
+        图库每 rescan_interval 秒才重新扫描一次。
+        """
+        mode = self.config.get("playlist_mode", "sequential")
+        if mode not in PLAYLIST_MODES:
+            mode = "sequential"
+        with self._playlist_lock:
+            folder = self.folder
+            if self.config.get("rotate_library", False):
+                index = ImageLibrary.shared()
+                # 根文件夹可能随当前文件夹变化
+                index.set_roots(ImageLibrary.roots_from_config(dict(self.config, last_folder=folder)))
+                key = LIBRARY_KEY
+            else:
+                if not folder or not os.path.isdir(folder):
+                    return None
+                index = None
+                key = os.path.normpath(os.path.abspath(folder))
+            playlist = self.playlist
+            if playlist is None or playlist.folder != key or playlist.mode != mode:
+                if playlist is not None:
+                    playlist.close()
+                playlist = Playlist(key, mode, start_after=self.config.get("current_wallpaper"), index=index)
+                self.playlist = playlist
+                self._filter = None
+            self._apply_filter(playlist)
+            return playlist
+
+    def _apply_filter(self, playlist):
+        """
+        按 auto_switch_filter 配置筛选图片（如只要横向 4K 图片、夜间只要暗色壁纸），
+        配置可以是条件字典或带 hours 时间段的规则列表，见 image_metadata.active_filter；
+        skip_near_duplicates 为真时（默认关闭），同一张图的多个版本只轮换文件最大的一个。
+        """
+        rules = self.config.get("auto_switch_filter")
+        rule = active_filter(rules, time.localtime().tm_hour) if rules else None
+        skip_duplicates = bool(self.config.get("skip_near_duplicates", False))
+        if (rule, skip_duplicates) == self._filter:
+            return
+        self._filter = (rule, skip_duplicates)
+
+        checks = []
+        if rule:
+            try:
+                MetadataIndex.validate(rule)
+            except ValueError as e:
+                print(f"Invalid auto-switch filter {rule}: {e}")
+            else:
+                # 元数据只计算一次，已有的图片直接跳过
+                metadata = MetadataIndex.shared()
+                metadata.schedule(playlist.paths())
+                checks.append(lambda paths: metadata.filter_paths(paths, rule))
+        if skip_duplicates:
+            duplicates = PerceptualIndex.shared()
+            checks.append(lambda paths: {path for path in paths if not duplicates.is_shadowed(path)})
+
+        def accept(paths):
+            # 播放列表按批抽取候选，元数据条件对整批只查询一次
+            accepted = set(paths)
+            for check in checks:
+                if not accepted:
+                    break
+                accepted = check(list(accepted))
+            return accepted
+
+        playlist.set_accept(accept if checks else None)
+
+    def get_upcoming_images(self, count):
+        """
+        返回接下来将要自动切换的图片路径，可在任意线程调用。
+        不会创建播放列表：调度线程建立好播放列表之前返回空列表。
+        :param count: 数量。
+        """
+        playlist = self.playlist
+        return playlist.peek(count) if playlist else []
+
+    def _set_status(self, text):
+        if self.dispatcher:
+            self.dispatcher.call_soon(self.status_var.set, text)
+        else:
+            self.status_var.set(text)
 
     def auto_switch_wallpaper(self):
         """
-        自动切换到下一张壁纸。
+        自动切换到下一张壁纸，由 SwitchScheduler 在调度线程中调用。
         """
-        folder = self.folder_path_var.get()
-        images = ImageManager.get_images_in_folder(folder)
+        playlist = self._get_playlist()
 
-        if images:
-            # 计算当前图片的索引并切换到下一张
-            current_image_index = (self.config.get("current_image_index", -1) + 1) % len(images)
-            self.config["current_image_index"] = current_image_index
-            ConfigManager.save_config(self.config)
+        if playlist is not None:
+            # 播放位置由播放列表持久化，文件增删只做增量更新
+            playlist.sync()
+            next_image = playlist.advance()
+            if next_image:
+                try:
+                    prepared = self.prefetcher.take(next_image, self.screen_target)
+                except Exception as e:
+                    success, error = False, str(e)
+                else:
+                    start = time.perf_counter()
+                    success, error = WallpaperManager.set_wallpaper(prepared.path)
+                    self.prefetcher.record_switch(time.perf_counter() - start)
+                    self._log_switch(prepared)
+                if success:
+                    # 高频字段只追加到状态日志，不重写整个 config.json
+                    ConfigManager.record_state(self.config, current_wallpaper=next_image)
+                    self._set_status(f"Wallpaper set: {os.path.basename(next_image)}")
+                else:
+                    self._set_status(f"Failed to set wallpaper: {error}")
 
-            next_image = images[current_image_index]
-            success, error = WallpaperManager.set_wallpaper(next_image)
+            # 切换完成后准备接下来的壁纸
+            self._schedule_prefetch()
 
-            # 更新状态栏
-            if success:
-                self.status_var.set(f"Wallpaper set: {os.path.basename(next_image)}")
-            else:
-                self.status_var.set(f"Failed to set wallpaper: {error}")
+        # 屏幕分辨率可能已变化，下一次切换前在主线程更新
+        if self.dispatcher:
+            self.dispatcher.call_soon(self._refresh_screen_target)
+
+    def _schedule_prefetch(self):
+        self.prefetcher.schedule(self.get_upcoming_images(self.prefetcher.depth), self.screen_target)
+
+    def _log_switch(self, prepared):
+        # 渲染和设置壁纸的耗时分别由 WallpaperRenderer、WallpaperManager 记录，这里只统计预取是否命中
+        Instrumentation.shared().count("prefetch.hit" if prepared.from_prefetch else "prefetch.miss")
 
-        # 继续下一次切换
-        interval = self.config.get("auto_switch_interval", 5)
-        self.auto_switch_task = self.root.after(interval * 1000, self.auto_switch_wallpaper)
+    def shutdown(self):
+        """停止自动切换并取消预取任务"""
+        self.stop_auto_switch()
+        self.prefetcher.cancel()
+        with self._playlist_lock:
+            if self.playlist is not None:
+                self.playlist.close()
+                self.playlist = None
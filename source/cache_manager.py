@@ -0,0 +1,138 @@
+import os
+import threading
+
+from cloud_services.oss_config import OSS_WALLPAPER_DIR, PARTIAL_DOWNLOAD_SUFFIX
+from image_manager import ImageManager
+from instrumentation import Instrumentation
+from thumbnail_store import ThumbnailStore
+from wallpaper_renderer import WallpaperRenderer
+
+DEFAULT_THUMBNAIL_CACHE_MB = 200
+DEFAULT_DOWNLOAD_CACHE_MB = 2048
+DEFAULT_RENDERED_CACHE_MB = 512
+DEFAULT_CACHE_CHECK_INTERVAL = 600  # 秒
+
+
+class CacheManager:
+    """
+    缩略图存储、OSS 下载目录和屏幕尺寸壁纸变体的容量管理。
+    在后台线程中定期按最近最少使用（LRU）淘汰，当前壁纸和即将自动切换的壁纸不会被淘汰。
+    """
+
+    def __init__(self, config, dispatcher=None, status_var=None, protected_paths=None):
+        """
+        :param config: 配置字典，读取 thumbnail_cache_limit_mb、download_cache_limit_mb、rendered_cache_limit_mb、
+            cache_check_interval。
+        :param dispatcher: UIDispatcher 实例，用于在主线程更新状态栏。
+        :param status_var: 状态栏 StringVar 对象。
+        :param protected_paths: 返回受保护图片路径列表的函数。
+        """
+        self.config = config
+        self.dispatcher = dispatcher
+        self.status_var = status_var
+        self.protected_paths = protected_paths or (lambda: [])
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动后台淘汰线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-manager", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台淘汰线程"""
+        self._stop_event.set()
+
+    def _run(self):
+        WallpaperRenderer.remove_legacy_files()
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error evicting caches: {e}")
+            self._stop_event.wait(self.config.get("cache_check_interval", DEFAULT_CACHE_CHECK_INTERVAL))
+
+    def run_once(self):
+        """执行一次淘汰并返回统计信息"""
+        protected = {os.path.abspath(path) for path in self.protected_paths() if path}
+
+        protected_keys = set()
+        for path in protected:
+            try:
+                protected_keys.add(ImageManager.thumbnail_key(path))
+            except OSError:
+                pass
+
+        store = ThumbnailStore.shared()
+        thumbnail_limit = self.config.get("thumbnail_cache_limit_mb", DEFAULT_THUMBNAIL_CACHE_MB) * 1024 * 1024
+        thumbnails_evicted, thumbnails_freed = store.evict_lru(thumbnail_limit, protected_keys)
+        thumbnail_count, thumbnail_bytes, _ = store.stats()
+
+        download_limit = self.config.get("download_cache_limit_mb", DEFAULT_DOWNLOAD_CACHE_MB) * 1024 * 1024
+        downloads_evicted, downloads_freed, download_bytes = self._evict_downloads(download_limit, protected)
+
+        rendered_limit = self.config.get("rendered_cache_limit_mb", DEFAULT_RENDERED_CACHE_MB) * 1024 * 1024
+        rendered_evicted, rendered_freed, rendered_bytes = WallpaperRenderer.shared().prune(rendered_limit, protected)
+
+        stats = {
+            "thumbnail_count": thumbnail_count,
+            "thumbnail_bytes": thumbnail_bytes,
+            "thumbnails_evicted": thumbnails_evicted,
+            "thumbnails_freed": thumbnails_freed,
+            "download_bytes": download_bytes,
+            "downloads_evicted": downloads_evicted,
+            "downloads_freed": downloads_freed,
+            "rendered_bytes": rendered_bytes,
+            "rendered_evicted": rendered_evicted,
+            "rendered_freed": rendered_freed,
+        }
+        instrumentation = Instrumentation.shared()
+        instrumentation.count("cache.thumbnails_evicted", thumbnails_evicted)
+        instrumentation.count("cache.downloads_evicted", downloads_evicted)
+        instrumentation.count("cache.rendered_evicted", rendered_evicted)
+        if (thumbnails_evicted or downloads_evicted or rendered_evicted) and self.dispatcher and self.status_var:
+            message = (
+                f"Cache: thumbnails {thumbnail_bytes / 1048576:.1f}/{thumbnail_limit / 1048576:.0f} MB"
+                f" (evicted {thumbnails_evicted}), downloads {download_bytes / 1048576:.1f}/{download_limit / 1048576:.0f} MB"
+                f" (evicted {downloads_evicted}), rendered {rendered_bytes / 1048576:.1f}/{rendered_limit / 1048576:.0f} MB"
+                f" (evicted {rendered_evicted})"
+            )
+            self.dispatcher.call_soon(self.status_var.set, message)
+        return stats
+
+    @staticmethod
+    def _evict_downloads(limit_bytes, protected):
+        """
+        按 mtime 淘汰下载目录中的文件（使用已下载壁纸时会刷新 mtime）。
+        :return: (淘汰数量, 释放字节数, 剩余字节数)。
+        """
+        if not os.path.isdir(OSS_WALLPAPER_DIR):
+            return 0, 0, 0
+
+        files = []
+        with os.scandir(OSS_WALLPAPER_DIR) as entries:
+            for entry in entries:
+                # 下载中的 .part 文件由断点续传管理，不参与淘汰
+                if entry.is_file() and not entry.name.endswith(PARTIAL_DOWNLOAD_SUFFIX) and ".tmp-" not in entry.name:
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, os.path.abspath(entry.path)))
+
+        total_bytes = sum(size for _, size, _ in files)
+        evicted = 0
+        freed = 0
+        for _, size, path in sorted(files):
+            if total_bytes - freed <= limit_bytes:
+                break
+            if path in protected:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Error removing cached download {path}: {e}")
+                continue
+            evicted += 1
+            freed += size
+        return evicted, freed, total_bytes - freed
@@ -0,0 +1,333 @@
+"""
+WallpaperCube 命令行工具，不启动界面。
+
+warm：预先生成缩略图、按屏幕尺寸渲染的壁纸变体和图片元数据，适合在新机器上夜间批量预热缓存。
+解码和缩放在进程池中使用全部 CPU 核心，缩略图和元数据由主进程统一写入存储；
+已经生成过的内容会跳过，中断后重新运行即可从断点继续。
+
+用法（在程序运行目录下执行，与界面共用同一份缓存）：
+  python source/cli.py warm                       # 预热配置中的图库（library_folders 和下载目录）
+  python source/cli.py warm D:/Wallpapers --jobs 8 --screen 2560x1440
+  python source/cli.py warm --oss-prefix wallpapers/ --download
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from PIL import Image
+
+from config_manager import ConfigManager
+from image_library import ImageLibrary
+from image_manager import ImageManager
+from image_metadata import MetadataIndex, extract_metadata
+from perceptual_index import PerceptualIndex, dhash
+from thumbnail_store import ThumbnailStore
+from wallpaper_renderer import WallpaperRenderer, FIT_MODES, DEFAULT_FIT_MODE
+
+PROGRESS_INTERVAL = 1.0  # 秒
+IN_FLIGHT_PER_JOB = 4  # 每个进程排队的任务数，文件再多内存占用也不变
+METADATA_BATCH = 64
+
+_renderers = {}  # 子进程内复用的渲染器
+
+
+def _warm_image(path, tasks, target, rendered_dir, force):
+    """
+    在子进程中执行：渲染变体直接写入文件（原子替换），缩略图和元数据作为结果返回给主进程写入。
+    """
+    result = {"path": path}
+    try:
+        if "thumbnails" in tasks:
+            with Image.open(path) as img:
+                thumbnail = ImageManager.decode_thumbnail(img)
+            result["thumbnail"] = ThumbnailStore.encode(thumbnail)
+            result["dhash"] = dhash(thumbnail)
+        if "metadata" in tasks:
+            stat = os.stat(path)
+            result["metadata"] = (stat.st_size, stat.st_mtime, extract_metadata(path))
+        if "variants" in tasks:
+            renderer = _renderers.setdefault(rendered_dir, WallpaperRenderer(rendered_dir))
+            if force:
+                try:
+                    os.remove(renderer.variant_path(path, target))
+                except OSError:
+                    pass
+            renderer.render(path, target)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+class Progress:
+    """在 stderr 上显示进度、速度和预计剩余时间"""
+
+    def __init__(self, label, total, quiet=False):
+        self.label = label
+        self.total = total
+        self.quiet = quiet
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.start = time.monotonic()
+        self._last_print = 0.0
+
+    def update(self, done=0, skipped=0, failed=0):
+        self.done += done
+        self.skipped += skipped
+        self.failed += failed
+        now = time.monotonic()
+        if now - self._last_print >= PROGRESS_INTERVAL:
+            self._last_print = now
+            self._print(end="\r")
+
+    def _print(self, end):
+        if self.quiet:
+            return
+        finished = self.done + self.skipped + self.failed
+        elapsed = max(time.monotonic() - self.start, 1e-6)
+        rate = self.done / elapsed
+        remaining = self.total - finished
+        eta = f"{int(remaining / rate // 60)}m{int(remaining / rate % 60):02d}s" if rate and remaining else "-"
+        sys.stderr.write(
+            f"{self.label}: {finished}/{self.total} ({self.skipped} already warm, {self.failed} failed)"
+            f" {rate:.1f}/s ETA {eta}   {end}"
+        )
+        sys.stderr.flush()
+
+    def finish(self):
+        self._print(end="\n")
+        if not self.quiet:
+            elapsed = time.monotonic() - self.start
+            print(f"{self.label}: {self.done} processed, {self.skipped} skipped, {self.failed} failed in {elapsed:.1f}s")
+
+
+def parse_screen(value):
+    """解析 WxH 形式的屏幕尺寸"""
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid screen size: {value} (expected WIDTHxHEIGHT)")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"invalid screen size: {value}")
+    return width, height
+
+
+def detect_screen():
+    """尝试通过 Tk 获取屏幕尺寸，没有图形环境时返回 None"""
+    try:
+        import tkinter
+        WallpaperRenderer.enable_dpi_awareness()
+        root = tkinter.Tk()
+    except Exception:
+        return None
+    try:
+        root.withdraw()
+        return root.winfo_screenwidth(), root.winfo_screenheight()
+    finally:
+        root.destroy()
+
+
+def _plan(path, args, target, store, metadata, renderer):
+    """返回 (需要执行的任务, 缩略图 key)；resume 时跳过已经生成的内容"""
+    tasks = []
+    thumbnail_key = None
+    if args.thumbnails:
+        thumbnail_key = ImageManager.thumbnail_key(path)
+        if not args.resume or not store.contains(thumbnail_key):
+            tasks.append("thumbnails")
+    if args.variants and target:
+        if not args.resume or not os.path.exists(renderer.variant_path(path, target)):
+            tasks.append("variants")
+    if args.metadata and (not args.resume or metadata.needs_update(path)):
+        tasks.append("metadata")
+    return tasks, thumbnail_key
+
+
+def warm_local(paths, args, target):
+    """用进程池预热本地图片，返回失败数量"""
+    store = ThumbnailStore.shared()
+    metadata = MetadataIndex.shared()
+    perceptual = PerceptualIndex.shared()
+    renderer = WallpaperRenderer.shared()
+    progress = Progress("local", len(paths), args.quiet)
+    metadata_entries = []
+    pending = {}
+    remaining = iter(paths)
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        def fill():
+            while len(pending) < args.jobs * IN_FLIGHT_PER_JOB:
+                path = next(remaining, None)
+                if path is None:
+                    return
+                try:
+                    tasks, thumbnail_key = _plan(path, args, target, store, metadata, renderer)
+                except OSError as e:  # 扫描之后文件被删除
+                    print(f"Skipping {path}: {e}")
+                    progress.update(failed=1)
+                    continue
+                if not tasks:
+                    progress.update(skipped=1)
+                    continue
+                future = pool.submit(_warm_image, path, tasks, target, renderer.directory, not args.resume)
+                pending[future] = thumbnail_key
+
+        try:
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    thumbnail_key = pending.pop(future)
+                    result = future.result()
+                    path = result["path"]
+                    if "error" in result:
+                        print(f"Error warming {path}: {result['error']}")
+                        progress.update(failed=1)
+                        continue
+                    # 工作进程只负责编码，由主进程写入存储（追加时持有跨进程文件锁，界面可同时运行）
+                    if "thumbnail" in result:
+                        store.put_bytes(thumbnail_key, result["thumbnail"])
+                        perceptual.add(path, result["dhash"])
+                    if "metadata" in result:
+                        metadata_entries.append((path,) + result["metadata"])
+                        if len(metadata_entries) >= METADATA_BATCH:
+                            metadata.store(metadata_entries)
+                            metadata_entries = []
+                    progress.update(done=1)
+                fill()
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            metadata.store(metadata_entries)
+            progress.finish()
+    return progress.failed
+
+
+def warm_oss(args):
+    """
+    预热 OSS 前缀下的缩略图；--download 时同时下载原图（断点续传），返回 (下载到本地的路径, 失败数量)。
+    """
+    from cloud_services.aliyun_oss import AliyunOSS
+    from cloud_services.oss_config import OSSConfig, OSS_WALLPAPER_DIR
+
+    oss_config = OSSConfig.load_config()
+    oss = AliyunOSS(
+        oss_config["oss_access_key_id"], oss_config["oss_access_key_secret"],
+        oss_config["oss_endpoint"], oss_config["oss_bucket_name"],
+    )
+    if not oss_config.get("oss_enabled") or not oss.enabled:
+        print("OSS is not configured or disabled, skipping --oss-prefix.")
+        return [], 1
+
+    wallpapers = []
+    marker = ""
+    while True:
+        page, marker, is_truncated = oss.list_wallpapers_page(prefix=args.oss_prefix, marker=marker)
+        wallpapers.extend(page)
+        if not is_truncated:
+            break
+
+    progress = Progress("oss", len(wallpapers), args.quiet)
+    local_paths = []
+
+    def warm_one(wallpaper):
+        # 缩略图已在本地缓存时 load_thumbnail_image 不会访问网络
+        if args.thumbnails and oss.load_thumbnail_image(wallpaper["thumbnail"], wallpaper.get("etag")) is None:
+            return None, False
+        if not args.download:
+            return None, True
+        local_path = os.path.abspath(os.path.join(OSS_WALLPAPER_DIR, wallpaper["original"].split("/")[-1]))
+        if not os.path.exists(local_path):
+            try:
+                oss.download_wallpaper(wallpaper["original"], local_path)
+            except Exception as e:
+                print(f"Error downloading {wallpaper['original']}: {e}")
+                return None, False
+        return local_path, True
+
+    # 网络请求以等待为主，使用线程池即可
+    with ThreadPoolExecutor(max_workers=args.jobs * 2, thread_name_prefix="oss-warm") as pool:
+        try:
+            for local_path, ok in pool.map(warm_one, wallpapers):
+                if local_path:
+                    local_paths.append(local_path)
+                progress.update(done=1 if ok else 0, failed=0 if ok else 1)
+        finally:
+            progress.finish()
+            oss.thumbnail_fetcher.close()
+    return local_paths, progress.failed
+
+
+def command_warm(args):
+    config = ConfigManager.load_config()
+    target = None
+    if args.variants:
+        screen = args.screen or detect_screen()
+        if screen is None:
+            print("Cannot detect the screen size, skipping wallpaper variants (use --screen WIDTHxHEIGHT).")
+        else:
+            target = screen + (args.fit_mode or config.get("wallpaper_fit_mode", DEFAULT_FIT_MODE),)
+
+    failed = 0
+    paths = []
+    if args.oss_prefix is not None:
+        downloaded, failed = warm_oss(args)
+        paths.extend(downloaded)
+
+    if args.folders or args.oss_prefix is None:
+        # 先刷新图库，缩略图 key 与界面一致（重复图片共用一份）
+        library = ImageLibrary.shared()
+        library.set_roots(ImageLibrary.roots_from_config(config))
+        library.refresh(force=True)
+        roots = args.folders or library.roots
+        missing = [folder for folder in roots if not os.path.isdir(folder)]
+        for folder in missing:
+            print(f"Folder not found: {folder}")
+        paths.extend(ImageLibrary.scan(roots))
+    paths = sorted(set(paths))
+    if paths:
+        try:
+            failed += warm_local(paths, args, target)
+        finally:
+            MetadataIndex.shared().shutdown()
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="wallpapercube", description="WallpaperCube command line tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    warm = subparsers.add_parser("warm", help="pre-generate thumbnails, screen-sized variants and metadata")
+    warm.add_argument("folders", nargs="*", help="folders to warm recursively (default: the configured library)")
+    warm.add_argument("--oss-prefix", help="also warm OSS thumbnails under this prefix, e.g. wallpapers/")
+    warm.add_argument("--download", action="store_true", help="download OSS originals and warm them as local images")
+    warm.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    warm.add_argument("--screen", type=parse_screen, help="screen size for wallpaper variants, e.g. 1920x1080")
+    warm.add_argument("--fit-mode", choices=FIT_MODES, help="variant fit mode (default: wallpaper_fit_mode in config)")
+    warm.add_argument("--resume", action=argparse.BooleanOptionalAction, default=True,
+                      help="skip images that are already warm (default); --no-resume regenerates everything")
+    warm.add_argument("--no-thumbnails", dest="thumbnails", action="store_false", help="skip thumbnails")
+    warm.add_argument("--no-variants", dest="variants", action="store_false", help="skip screen-sized variants")
+    warm.add_argument("--no-metadata", dest="metadata", action="store_false", help="skip metadata extraction")
+    warm.add_argument("--quiet", "-q", action="store_true", help="only print errors")
+    warm.set_defaults(handler=command_warm)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, "jobs", 1) < 1:
+        print("--jobs must be at least 1")
+        return 2
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume.")
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,24 @@
 import hashlib
 import io
 import os
-import ssl
-from urllib.request import urlopen
 
 import oss2
 from PIL import ImageTk, Image
 
-OSS_WALLPAPER_DIR = "downloads"
+from image_manager import ImageManager
+from instrumentation import Instrumentation
+from thumbnail_store import ThumbnailStore
+from cloud_services.oss_config import OSS_WALLPAPER_DIR, PARTIAL_DOWNLOAD_SUFFIX
+from cloud_services.thumbnail_fetcher import ThumbnailFetcher
+
+LIST_PAGE_SIZE = 100
+DOWNLOAD_CHECKPOINT_DIR = os.path.join(OSS_WALLPAPER_DIR, ".checkpoints")
+# 超过该大小才分片、并发、断点续传下载（oss2 默认 100MB，几乎所有壁纸都会走单次 GET）。
+# 10MB 以下的图片单次 GET 在普通带宽下一两秒就能完成，断点文件和分片请求的额外开销比续传省下的更多；
+# 4K/8K 原图和 PNG 常在 10MB 以上，中断后重新下载的代价才明显
+DOWNLOAD_MULTIGET_THRESHOLD = 10 * 1024 * 1024
+DOWNLOAD_PART_SIZE = 4 * 1024 * 1024
+DOWNLOAD_THREADS = 4
 
 class AliyunOSS:
     def __init__(self, access_key_id, access_key_secret, endpoint, bucket_name):
@@ -18,50 +29,121 @@ class AliyunOSS:
 
         self.auth = oss2.Auth(access_key_id, access_key_secret)
         self.bucket = oss2.Bucket(self.auth, endpoint, bucket_name)
+        self.thumbnail_fetcher = ThumbnailFetcher()
         self.enabled = True  # 标记 OSS 功能已启用
 
     def list_wallpapers(self, prefix=""):
+        wallpapers = []
+        marker = ""
+        while True:
+            page, marker, is_truncated = self.list_wallpapers_page(prefix, marker)
+            wallpapers.extend(page)
+            if not is_truncated:
+                return wallpapers
+
+    def list_wallpapers_page(self, prefix="", marker="", max_keys=LIST_PAGE_SIZE):
+        """
+        按 marker 分页列举壁纸。
+        :return: (壁纸列表, 下一页 marker, 是否还有下一页)。
+        """
         if not self.enabled:
             raise ValueError("OSS functionality is disabled due to incomplete configuration.")
         wallpapers = []
         endpoint_url = self.bucket.endpoint.replace("http://", "").replace("https://", "")  # 确保只包含纯域名
-        for obj in oss2.ObjectIterator(self.bucket, prefix=prefix):
+        with Instrumentation.shared().span("oss.list", "network", prefix=prefix, marker=marker) as span:
+            result = self.bucket.list_objects(prefix=prefix, marker=marker, max_keys=max_keys)
+            span.set(objects=len(result.object_list))
+        for obj in result.object_list:
             if obj.key.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")):
                 thumbnail_url = f"https://{self.bucket.bucket_name}.{endpoint_url}/{obj.key}?x-oss-process=image/resize,w_100"
-                wallpapers.append({"original": obj.key, "thumbnail": thumbnail_url})
-        return wallpapers
+                wallpapers.append({
+                    "original": obj.key,
+                    "thumbnail": thumbnail_url,
+                    "etag": obj.etag,
+                    "last_modified": obj.last_modified,
+                    "size": obj.size,
+                })
+        return wallpapers, result.next_marker, result.is_truncated
 
-    def download_wallpaper(self, remote_file, local_path):
+    def download_wallpaper(self, remote_file, local_path, progress_callback=None):
+        """
+        下载壁纸：大文件按 Range 分片并发下载并记录断点，中断后可续传；
+        先写入 .part 文件，校验长度和 CRC64 后再原子重命名为 local_path，
+        因此 local_path 存在就代表文件完整。
+        :param progress_callback: 进度回调 progress_callback(已下载字节, 总字节)。
+        """
         if not self.enabled:
             raise ValueError("OSS functionality is disabled due to incomplete configuration.")
 
-        if not os.path.exists(OSS_WALLPAPER_DIR):
-            os.makedirs(OSS_WALLPAPER_DIR)
-        self.bucket.get_object_to_file(remote_file, local_path)
+        os.makedirs(DOWNLOAD_CHECKPOINT_DIR, exist_ok=True)
+        partial_path = local_path + PARTIAL_DOWNLOAD_SUFFIX
+        head = self.bucket.head_object(remote_file)
+
+        oss2.resumable_download(
+            self.bucket, remote_file, partial_path,
+            multiget_threshold=DOWNLOAD_MULTIGET_THRESHOLD,
+            part_size=DOWNLOAD_PART_SIZE,
+            num_threads=DOWNLOAD_THREADS,
+            progress_callback=progress_callback,
+            store=oss2.ResumableDownloadStore(root=DOWNLOAD_CHECKPOINT_DIR),
+        )
 
-    def fetch_thumbnail(self, thumbnail_url):
-        """从远程或本地获取缩略图"""
         try:
-            # 生成本地缓存路径
-            hashed_filename = hashlib.md5(thumbnail_url.encode()).hexdigest() + ".png"
-            cached_thumbnail_path = os.path.join("thumbnails", hashed_filename)
+            self._verify_download(partial_path, head)
+        except Exception:
+            os.remove(partial_path)
+            raise
+        os.replace(partial_path, local_path)
+
+    def _verify_download(self, path, head):
+        """校验下载结果的长度和 CRC64（开启 enable_crc 时 oss2 已在下载过程中校验过 CRC）"""
+        size = os.path.getsize(path)
+        if size != head.content_length:
+            raise oss2.exceptions.InconsistentError(
+                f"Downloaded size {size} does not match object size {head.content_length}", head.request_id
+            )
+        if head.server_crc is not None and not self.bucket.enable_crc:
+            crc64 = oss2.utils.Crc64()
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                    crc64.update(chunk)
+            if crc64.crc != head.server_crc:
+                raise oss2.exceptions.InconsistentError(
+                    f"CRC64 {crc64.crc} does not match object CRC64 {head.server_crc}", head.request_id
+                )
+
+    def load_thumbnail_image(self, thumbnail_url, etag=None):
+        """
+        从本地缓存或远程获取缩略图，返回 PIL Image（可在后台线程调用）。
+        :param etag: 对象的 ETag，对象被替换后缓存自然失效。
+        """
+        try:
+            # 缩略图缓存 key
+            instrumentation = Instrumentation.shared()
+            store = ThumbnailStore.shared()
+            cache_id = f"{thumbnail_url}-{etag}" if etag else thumbnail_url
+            thumbnail_key = hashlib.md5(cache_id.encode()).hexdigest()
 
             # 如果缓存存在，直接使用
-            if os.path.exists(cached_thumbnail_path):
-                return ImageTk.PhotoImage(Image.open(cached_thumbnail_path))
-
-            # 否则从远程下载
-            os.makedirs("thumbnails", exist_ok=True)
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-            with urlopen(thumbnail_url, context=ssl_context) as response:
-                img_data = response.read()
-                img = Image.open(io.BytesIO(img_data))
-                img.thumbnail((100, 100))  # 统一缩略图大小
-                img.save(cached_thumbnail_path)  # 保存到本地缓存
-                return ImageTk.PhotoImage(img)
+            cached_img = store.get(thumbnail_key)
+            if cached_img is not None:
+                instrumentation.count("oss_thumbnail.hit")
+                return cached_img
+
+            # 否则通过连接池从远程下载
+            instrumentation.count("oss_thumbnail.miss")
+            img_data = self.thumbnail_fetcher.fetch(thumbnail_url)
+            with instrumentation.span("thumbnail.decode", "thumbnail", path=thumbnail_url):
+                img = ImageManager.decode_thumbnail(Image.open(io.BytesIO(img_data)))  # 统一缩略图大小
+            store.put(thumbnail_key, img)  # 保存到本地缓存
+            return img
         except Exception as e:
             print(f"Error fetching thumbnail: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def fetch_thumbnail(self, thumbnail_url, etag=None):
+        """从远程或本地获取缩略图，返回 PhotoImage（必须在主线程调用）"""
+        img = self.load_thumbnail_image(thumbnail_url, etag)
+        if img is None:
+            return None
+        return ImageTk.PhotoImage(img)
@@ -0,0 +1,50 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONCURRENT_DOWNLOADS = 2
+
+
+class DownloadEngine:
+    """
+    后台下载 OSS 壁纸。
+    下载本身由 AliyunOSS.download_wallpaper 完成（分片并发、断点续传、校验后原子重命名），
+    这里负责把它放到后台线程、合并对同一文件的重复请求并转发进度。
+    """
+
+    def __init__(self, oss, max_concurrent_downloads=DEFAULT_CONCURRENT_DOWNLOADS):
+        """
+        :param oss: AliyunOSS 实例。
+        :param max_concurrent_downloads: 同时进行的下载数量。
+        """
+        self.oss = oss
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_downloads, thread_name_prefix="download")
+        self._lock = threading.Lock()
+        self._in_flight = {}  # 本地路径 -> Future
+
+    def download(self, remote_key, local_path, on_progress=None):
+        """
+        开始（或复用正在进行的）后台下载。
+        :param on_progress: 进度回调 on_progress(已下载字节, 总字节)，在下载线程中调用。
+        :return: Future，结果为 local_path。
+        """
+        with self._lock:
+            future = self._in_flight.get(local_path)
+            if future is not None and not future.done():
+                return future
+            future = self._executor.submit(self._download, remote_key, local_path, on_progress)
+            self._in_flight[local_path] = future
+        future.add_done_callback(lambda f: self._forget(local_path, f))
+        return future
+
+    def _download(self, remote_key, local_path, on_progress):
+        self.oss.download_wallpaper(remote_key, local_path, progress_callback=on_progress)
+        return local_path
+
+    def _forget(self, local_path, future):
+        with self._lock:
+            if self._in_flight.get(local_path) is future:
+                del self._in_flight[local_path]
+
+    def shutdown(self):
+        """不再接受新的下载；进行中的下载会留下断点信息，下次可继续"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
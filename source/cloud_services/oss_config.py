@@ -2,6 +2,8 @@ import os
 import json
 
 OSS_CONFIG_FILE = "oss_config.json"
+OSS_WALLPAPER_DIR = "downloads"
+PARTIAL_DOWNLOAD_SUFFIX = ".part"  # 下载中的文件后缀，校验通过后才重命名为正式文件名
 
 DEFAULT_OSS_CONFIG = {
     "oss_enabled": False,
@@ -0,0 +1,42 @@
+import json
+import os
+import time
+
+OSS_LISTING_CACHE_FILE = "oss_listing_cache.json"
+
+
+class OSSListingCache:
+    """
+    OSS 壁纸列表的本地缓存（含 ETag 和修改时间）。
+    启动时先显示上次的列表，再在后台刷新；列表未列举完时同时保存下一页的 marker，翻页时从这里继续。
+    """
+
+    @staticmethod
+    def _load_all():
+        if os.path.exists(OSS_LISTING_CACHE_FILE):
+            with open(OSS_LISTING_CACHE_FILE, "r", encoding="utf-8") as file:
+                try:
+                    return json.load(file)
+                except Exception as e:
+                    print(f"Error loading OSS listing cache: {e}")
+        return {}
+
+    @staticmethod
+    def load(cache_id):
+        """
+        读取缓存的列表。
+        :param cache_id: 缓存标识（存储桶 + 前缀）。
+        :return: {"wallpapers": [...], "complete": bool, "marker": 下一页 marker, "updated": 时间戳}，
+                 没有缓存时返回 None。
+        """
+        return OSSListingCache._load_all().get(cache_id)
+
+    @staticmethod
+    def save(cache_id, wallpapers, complete=True, marker=""):
+        """原子地写入列表缓存"""
+        listings = OSSListingCache._load_all()
+        listings[cache_id] = {"wallpapers": wallpapers, "complete": complete, "marker": marker, "updated": time.time()}
+        temp_path = OSS_LISTING_CACHE_FILE + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(listings, file)
+        os.replace(temp_path, OSS_LISTING_CACHE_FILE)
@@ -0,0 +1,136 @@
+import http.client
+import socket
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+
+from instrumentation import Instrumentation
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+MAX_IDLE_PER_HOST = 16
+
+
+class ThumbnailFetchError(Exception):
+    """缩略图请求返回了不可重试的错误状态"""
+
+
+class ThumbnailFetcher:
+    """
+    复用 keep-alive 连接的缩略图 HTTP(S) 客户端。
+    同一主机的空闲连接放在连接池里供各工作线程复用，SSL 上下文只创建一次；
+    请求带超时，连接错误、5xx 和 429 按指数退避重试；
+    复用的空闲连接在收到响应前就断开（服务器已关闭 keep-alive 连接）时，立即换新连接重发，不退避。
+    并发由调用方的线程池（ThumbnailWorker）决定。
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.ssl_context = ssl.create_default_context()
+        self.ssl_context.check_hostname = False
+        self.ssl_context.verify_mode = ssl.CERT_NONE
+        self._idle = {}  # (scheme, host, port) -> 空闲连接列表
+        self._lock = threading.Lock()
+        # 统计：新建连接数和请求数，用于确认连接被复用
+        self.connections_opened = 0
+        self.requests = 0
+
+    def _acquire(self, pool_key):
+        """
+        取一个连接，优先复用空闲连接。
+        :return: (连接, 是否为复用的空闲连接)。
+        """
+        with self._lock:
+            idle = self._idle.get(pool_key)
+            if idle:
+                return idle.pop(), True
+            self.connections_opened += 1
+        scheme, host, port = pool_key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self.ssl_context), False
+        return http.client.HTTPConnection(host, port, timeout=self.timeout), False
+
+    def _release(self, pool_key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(pool_key, [])
+            if len(idle) < MAX_IDLE_PER_HOST:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def fetch(self, url):
+        """
+        下载 url 的内容。
+        :return: 响应体字节。
+        :raises ThumbnailFetchError: 4xx 等不可重试的状态，或重试次数用尽。
+        """
+        parts = urlsplit(url)
+        pool_key = (parts.scheme, parts.hostname, parts.port)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+
+        instrumentation = Instrumentation.shared()
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                instrumentation.count("oss.retry")
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                connection, response, body = self._request(pool_key, target, parts.path, attempt)
+            except (http.client.HTTPException, socket.timeout, OSError) as e:
+                last_error = e
+                continue
+            with self._lock:
+                self.requests += 1
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(pool_key, connection)
+
+            if response.status == 200:
+                return body
+            if response.status == 429 or response.status >= 500:
+                last_error = ThumbnailFetchError(f"HTTP {response.status} for {url}")
+                continue
+            raise ThumbnailFetchError(f"HTTP {response.status} for {url}")
+
+        raise ThumbnailFetchError(f"Failed to fetch {url} after {self.retries + 1} attempts: {last_error}")
+
+    def _request(self, pool_key, target, path, attempt):
+        """
+        发送一次 GET 并读完响应。
+        复用的空闲连接可能已被服务器关闭，这种连接在收到任何响应之前就会失败：
+        关闭它并立即换下一个连接重发，最终会新建连接。新建连接上的失败、超时和收到响应之后的失败
+        都是真正的网络或服务器错误，抛给 fetch 按退避重试。
+        :return: (连接, 响应, 响应体)。
+        """
+        instrumentation = Instrumentation.shared()
+        while True:
+            connection, reused = self._acquire(pool_key)
+            response = None
+            try:
+                with instrumentation.span("oss.request", "network", path=path, attempt=attempt) as span:
+                    connection.request("GET", target, headers={"Connection": "keep-alive"})
+                    response = connection.getresponse()
+                    body = response.read()  # 必须读完响应，连接才能复用
+                    span.set(status=response.status, bytes=len(body))
+                return connection, response, body
+            except (http.client.HTTPException, socket.timeout, OSError) as e:
+                connection.close()
+                if not reused or response is not None or isinstance(e, socket.timeout):
+                    raise
+                instrumentation.count("oss.stale_connection")
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
@@ -1,25 +1,131 @@
-### config_manager.py
 import os
 import json
+import threading
 
 CONFIG_FILE = "config.json"
+STATE_JOURNAL_FILE = "config.journal"
 DEFAULT_FOLDER = os.path.expanduser("~/Pictures")
+SAVE_DELAY = 2.0  # 秒，合并这段时间内的多次修改
+JOURNAL_COMPACT_LINES = 500  # 日志超过该行数时写回 config.json 并清空
 
 class ConfigManager:
+    """
+    config.json 的读写。
+    完整保存先写临时文件再 os.replace，中途崩溃不会损坏原配置；
+    schedule_save 合并短时间内的多次修改；当前壁纸这类高频字段只追加到状态日志，
+    加载时回放到配置上，下一次完整保存时清空日志。
+    """
+    _lock = threading.RLock()
+    _timer = None
+    _pending_config = None
+    _journal_lines = 0
+
     @staticmethod
     def load_config():
+        config = None
         if os.path.exists(CONFIG_FILE):
             with open(CONFIG_FILE, "r") as file:
                 try:
                     config = json.load(file)
                     if not config.get("last_folder"):
                         raise ValueError("Config missing 'last_folder'")
-                    return config
                 except Exception as e:
                     print(f"Error loading config: {e}")
-        return {"last_folder": DEFAULT_FOLDER, "language": "English"}
+                    config = None
+        if config is None:
+            config = {"last_folder": DEFAULT_FOLDER, "language": "English"}
+        ConfigManager._replay_journal(config)
+        return config
 
     @staticmethod
     def save_config(config):
-        with open(CONFIG_FILE, "w") as file:
-            json.dump(config, file)
\ No newline at end of file
+        """立即原子地保存完整配置，并清空状态日志"""
+        with ConfigManager._lock:
+            ConfigManager._cancel_timer()
+            data = dict(config)
+            tmp_path = CONFIG_FILE + ".tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(data, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, CONFIG_FILE)
+            # 日志中的字段已包含在刚写入的配置里
+            if ConfigManager._journal_lines or os.path.exists(STATE_JOURNAL_FILE):
+                try:
+                    os.remove(STATE_JOURNAL_FILE)
+                except OSError:
+                    pass
+                ConfigManager._journal_lines = 0
+
+    @staticmethod
+    def schedule_save(config, delay=SAVE_DELAY):
+        """在 delay 秒后保存配置，期间的多次调用合并为一次写入"""
+        with ConfigManager._lock:
+            ConfigManager._pending_config = config
+            if ConfigManager._timer is None:
+                ConfigManager._timer = threading.Timer(delay, ConfigManager._save_pending)
+                ConfigManager._timer.daemon = True
+                ConfigManager._timer.start()
+
+    @staticmethod
+    def _save_pending():
+        with ConfigManager._lock:
+            config = ConfigManager._pending_config
+            ConfigManager._timer = None
+            ConfigManager._pending_config = None
+            if config is None:
+                return
+            try:
+                ConfigManager.save_config(config)
+            except OSError as e:
+                print(f"Error saving config: {e}")
+
+    @staticmethod
+    def _cancel_timer():
+        if ConfigManager._timer is not None:
+            ConfigManager._timer.cancel()
+            ConfigManager._timer = None
+        ConfigManager._pending_config = None
+
+    @staticmethod
+    def record_state(config, **fields):
+        """
+        更新高频状态字段（如 current_wallpaper），只向状态日志追加一行，不重写 config.json。
+        :param config: 配置字典，会同时更新。
+        :param fields: 需要记录的字段。
+        """
+        with ConfigManager._lock:
+            config.update(fields)
+            try:
+                with open(STATE_JOURNAL_FILE, "a") as journal:
+                    journal.write(json.dumps(fields) + "\n")
+            except OSError as e:
+                print(f"Error writing config journal: {e}")
+                ConfigManager.schedule_save(config)
+                return
+            ConfigManager._journal_lines += 1
+            if ConfigManager._journal_lines >= JOURNAL_COMPACT_LINES:
+                ConfigManager.schedule_save(config)
+
+    @staticmethod
+    def _replay_journal(config):
+        if not os.path.exists(STATE_JOURNAL_FILE):
+            return
+        lines = 0
+        with open(STATE_JOURNAL_FILE, "r") as journal:
+            for line in journal:
+                try:
+                    config.update(json.loads(line))
+                except ValueError:
+                    continue  # 崩溃时最后一行可能不完整
+                lines += 1
+        ConfigManager._journal_lines = lines
+
+    @staticmethod
+    def flush(config):
+        """退出前写入尚未保存的修改和状态日志"""
+        with ConfigManager._lock:
+            if ConfigManager._pending_config is not None or ConfigManager._journal_lines:
+                ConfigManager.save_config(config)
+            else:
+                ConfigManager._cancel_timer()
@@ -0,0 +1,230 @@
+import os
+import sqlite3
+import threading
+import time
+
+from instrumentation import Instrumentation
+
+FOLDER_INDEX_FILE = "folder_index.db"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+MTIME_SETTLE_SECONDS = 2
+# 每个文件夹最多记住的分页锚点数
+MAX_PAGE_ANCHORS = 4096
+
+
+class FolderIndex:
+    """
+    持久化的文件夹图片索引（SQLite）。
+    以目录 mtime 判断是否需要重新扫描，扫描时用 os.scandir 的 stat 数据做增量更新，
+    分页和计数直接从索引读取，不再每次 os.listdir。
+    分页使用 keyset（name > 上一页最后一个文件名），翻页的代价与页码无关。
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path=FOLDER_INDEX_FILE):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS folders (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                image_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS images (
+                folder TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                PRIMARY KEY (folder, name)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+        self._listeners = []
+        # 文件夹 -> {offset: 排在 offset 之前的最后一个文件名}，文件增删时清空
+        self._page_anchors = {}
+
+    @classmethod
+    def shared(cls):
+        """获取进程内共享的索引实例"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def _normalize(folder_path):
+        return os.path.normpath(os.path.abspath(folder_path))
+
+    def add_listener(self, listener):
+        """注册变化回调 listener(folder, added, removed)，在执行 refresh 的线程中调用"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    # 以下三个方法把路径转换为索引内的 key 和名称，Playlist 通过它们同时支持 FolderIndex 和 ImageLibrary
+    def key_for(self, folder_path):
+        return self._normalize(folder_path)
+
+    def name_of(self, folder, path):
+        """返回 path 在 folder 中的文件名，不属于该文件夹时返回 None"""
+        path = self._normalize(path)
+        return os.path.basename(path) if os.path.dirname(path) == folder else None
+
+    def path_of(self, folder, name):
+        return os.path.join(folder, name)
+
+    def refresh(self, folder_path):
+        """
+        按需增量刷新文件夹索引。
+        :param folder_path: 文件夹路径。
+        :return: (added, removed) 新增和删除的图片路径列表；目录未变化时均为空。
+        """
+        folder = self._normalize(folder_path)
+        dir_mtime = os.stat(folder).st_mtime
+
+        with self._lock:
+            row = self._conn.execute("SELECT mtime FROM folders WHERE path = ?", (folder,)).fetchone()
+            if row is not None and row[0] == dir_mtime:
+                Instrumentation.shared().count("folder.unchanged")
+                return [], []
+
+            # 目录有变化，用 scandir 的 stat 数据与索引做差异比较
+            start = time.perf_counter()
+            scanned = {}
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    scanned[entry.name] = (stat.st_size, stat.st_mtime)
+
+            indexed = {
+                name: (size, mtime)
+                for name, size, mtime in self._conn.execute(
+                    "SELECT name, size, mtime FROM images WHERE folder = ?", (folder,)
+                )
+            }
+
+            added = [name for name in scanned if name not in indexed]
+            removed = [name for name in indexed if name not in scanned]
+            changed = [name for name in scanned if name in indexed and scanned[name] != indexed[name]]
+
+            # 目录刚被修改时 mtime 精度（如 SMB/FAT 为 2 秒）可能掩盖随后的变化，暂不记录为已同步
+            settled_mtime = dir_mtime if time.time() - dir_mtime > MTIME_SETTLE_SECONDS else -1
+
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM images WHERE folder = ? AND name = ?",
+                    [(folder, name) for name in removed],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO images (folder, name, size, mtime) VALUES (?, ?, ?, ?)",
+                    [(folder, name) + scanned[name] for name in added + changed],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO folders (path, mtime, image_count) VALUES (?, ?, ?)",
+                    (folder, settled_mtime, len(scanned)),
+                )
+            if added or removed:
+                self._page_anchors.pop(folder, None)
+            Instrumentation.shared().record("folder.scan", "folder", start, time.perf_counter() - start, {
+                "folder": folder, "images": len(scanned), "added": len(added), "removed": len(removed)
+            })
+
+        added_paths = [os.path.join(folder, name) for name in added]
+        removed_paths = [os.path.join(folder, name) for name in removed]
+        if added_paths or removed_paths:
+            with self._lock:
+                listeners = list(self._listeners)
+            for listener in listeners:
+                try:
+                    listener(folder, added_paths, removed_paths)
+                except Exception as e:
+                    print(f"Error in folder index listener: {e}")
+        return added_paths, removed_paths
+
+    def count(self, folder_path):
+        """返回文件夹中的图片数量（O(1)）"""
+        folder = self._normalize(folder_path)
+        with self._lock:
+            row = self._conn.execute("SELECT image_count FROM folders WHERE path = ?", (folder,)).fetchone()
+        return row[0] if row else 0
+
+    def _anchor(self, folder, offset):
+        """
+        返回排在 offset 之前的最后一个文件名（offset 为 0 时为空字符串），调用方持有锁。
+        从最近的已知锚点出发定位，只有第一次跳到很远的页时才需要跳过中间的行。
+        """
+        anchors = self._page_anchors.setdefault(folder, {0: ""})
+        if offset in anchors:
+            return anchors[offset]
+        start = max(known for known in anchors if known < offset)
+        row = self._conn.execute(
+            "SELECT name FROM images WHERE folder = ? AND name > ? ORDER BY name LIMIT 1 OFFSET ?",
+            (folder, anchors[start], offset - start - 1),
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember_anchor(folder, offset, row[0])
+        return row[0]
+
+    def _remember_anchor(self, folder, offset, name):
+        anchors = self._page_anchors.setdefault(folder, {0: ""})
+        if len(anchors) >= MAX_PAGE_ANCHORS:
+            anchors.clear()
+            anchors[0] = ""
+        anchors[offset] = name
+
+    def _page_rows(self, folder, columns, offset, limit):
+        with self._lock:
+            after = self._anchor(folder, offset)
+            if after is None:
+                return []
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM images WHERE folder = ? AND name > ? ORDER BY name LIMIT ?",
+                (folder, after, limit),
+            ).fetchall()
+            if rows and limit >= 0:
+                self._remember_anchor(folder, offset + len(rows), rows[-1][0])
+        return rows
+
+    def get_page(self, folder_path, offset, limit):
+        """按文件名顺序返回 [offset, offset + limit) 范围内的图片路径，limit 为 -1 时返回到末尾"""
+        folder = self._normalize(folder_path)
+        return [os.path.join(folder, name) for (name,) in self._page_rows(folder, "name", offset, limit)]
+
+    def get_page_entries(self, folder_path, offset, limit):
+        """与 get_page 相同，但返回 (路径, mtime) 列表，避免再对每个文件 stat"""
+        folder = self._normalize(folder_path)
+        rows = self._page_rows(folder, "name, mtime", offset, limit)
+        return [(os.path.join(folder, name), mtime) for name, mtime in rows]
+
+    def get_names_after(self, folder_path, name, limit):
+        """按文件名顺序返回排在 name 之后的最多 limit 个文件名，name 为 None 时从头开始"""
+        folder = self._normalize(folder_path)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM images WHERE folder = ? AND name > ? ORDER BY name LIMIT ?",
+                (folder, name or "", limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_all(self, folder_path):
+        """返回文件夹中的全部图片路径"""
+        return self.get_page(folder_path, 0, -1)
+
@@ -0,0 +1,171 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+
+from folder_index import FolderIndex, MTIME_SETTLE_SECONDS
+from instrumentation import Instrumentation
+
+DEBOUNCE_SECONDS = 1.0  # 安静这么久后才刷新索引
+MAX_DELAY_SECONDS = 10.0  # 持续变化时最多间隔这么久刷新一次
+POLL_INTERVAL = 2.0  # 轮询模式的检查间隔
+
+# inotify 事件，只关心目录内文件的增删、改名和写入完成
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+
+class _InotifySource:
+    """Linux inotify，通过 ctypes 调用 libc，不依赖第三方库"""
+
+    def __init__(self, folder):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout):
+        """等待事件，返回期间是否有变化（事件内容不需要解析，索引刷新时统一比较）"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingSource:
+    """不支持 inotify 时按目录 mtime 轮询"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.mtime = self._mtime()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.folder).st_mtime
+        except OSError:
+            return None
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, POLL_INTERVAL))
+        mtime = self._mtime()
+        changed = mtime != self.mtime
+        self.mtime = mtime
+        return changed
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """
+    监视壁纸文件夹，把变化增量写入 FolderIndex。
+    Linux 使用 inotify，其他平台或 inotify 不可用时退回轮询。
+    一批连续的变化（如批量复制几千个文件）合并后只刷新一次索引、回调一次；
+    播放列表通过 FolderIndex 的变化回调自动更新。
+    """
+
+    def __init__(self, on_change=None, index=None, debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS):
+        """
+        :param on_change: 变化回调 on_change(folder, added, removed)，在监视线程中调用。
+        :param index: FolderIndex 实例，默认使用共享实例。
+        """
+        self.on_change = on_change
+        self.index = index or FolderIndex.shared()
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.folder = None
+        self.backend = None
+        self._stop_event = None
+        self._thread = None
+
+    @staticmethod
+    def _create_source(folder):
+        if sys.platform.startswith("linux"):
+            try:
+                return _InotifySource(folder)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable, polling {folder}: {e}")
+        return _PollingSource(folder)
+
+    def watch(self, folder):
+        """开始监视 folder，之前监视的文件夹会停止"""
+        self.stop()
+        if not folder or not os.path.isdir(folder):
+            return
+        self.folder = os.path.normpath(os.path.abspath(folder))
+        source = self._create_source(self.folder)
+        self.backend = "inotify" if isinstance(source, _InotifySource) else "polling"
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(source, self.folder, self._stop_event), name="folder-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """停止监视"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        self._stop_event = None
+        self._thread = None
+
+    def _run(self, source, folder, stop_event):
+        first_change = None
+        last_change = None
+        recheck_at = None
+        try:
+            while not stop_event.is_set():
+                if source.wait(self.debounce / 2 if first_change else 1.0):
+                    now = time.monotonic()
+                    first_change = first_change or now
+                    last_change = now
+                if stop_event.is_set():
+                    break
+
+                now = time.monotonic()
+                if first_change is not None and (
+                    now - last_change >= self.debounce or now - first_change >= self.max_delay
+                ):
+                    first_change = None
+                    # 刚修改过的目录 mtime 不可靠，稍后再确认一次
+                    recheck_at = now + MTIME_SETTLE_SECONDS + 1
+                    self._refresh(folder)
+                elif recheck_at is not None and now >= recheck_at:
+                    recheck_at = None
+                    self._refresh(folder)
+        finally:
+            source.close()
+
+    def _refresh(self, folder):
+        try:
+            added, removed = self.index.refresh(folder)
+        except OSError as e:
+            print(f"Error refreshing watched folder {folder}: {e}")
+            return
+        if (added or removed) and self.on_change:
+            instrumentation = Instrumentation.shared()
+            instrumentation.count("folder.added", len(added))
+            instrumentation.count("folder.removed", len(removed))
+            self.on_change(folder, added, removed)
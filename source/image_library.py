@@ -0,0 +1,368 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from cloud_services.oss_config import OSS_WALLPAPER_DIR
+from folder_index import IMAGE_EXTENSIONS
+from instrumentation import Instrumentation
+
+try:
+    import xxhash  # 可选依赖，比 blake2b 快得多
+except ImportError:
+    xxhash = None
+
+LIBRARY_DB = "library.db"
+LIBRARY_KEY = "library"  # 播放列表中代表整个图库的 key
+HEAD_BYTES = 64 * 1024  # 快速哈希只读取文件开头
+HASH_CHUNK = 1024 * 1024
+DEFAULT_RESCAN_INTERVAL = 300  # 秒
+WALK_WORKERS = 8
+
+
+def _new_hasher():
+    return xxhash.xxh3_128() if xxhash else hashlib.blake2b(digest_size=16)
+
+
+def quick_hash(path):
+    """文件开头 HEAD_BYTES 字节的哈希，与文件大小一起作为快速内容指纹"""
+    hasher = _new_hasher()
+    with open(path, "rb") as file:
+        hasher.update(file.read(HEAD_BYTES))
+    return hasher.hexdigest()
+
+
+def full_hash(path):
+    """整个文件的哈希，只在快速指纹相同时计算"""
+    hasher = _new_hasher()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ImageLibrary:
+    """
+    由多个根文件夹（递归）和 OSS 下载目录组成的图库。
+    并行遍历目录；用“文件大小 + 开头 64KB 的哈希”识别重复文件，指纹相同时再比较完整哈希，
+    同一内容只保留一个代表路径参与轮换，缩略图也按内容共用。
+    提供与 FolderIndex 相同的查询接口（key 固定为 LIBRARY_KEY），可直接作为 Playlist 的数据源。
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, roots=(), db_path=LIBRARY_DB, rescan_interval=DEFAULT_RESCAN_INTERVAL):
+        """
+        :param roots: 根文件夹列表。
+        :param rescan_interval: refresh 的最短间隔（秒），期间的调用直接返回。
+        """
+        self.roots = []
+        self.rescan_interval = rescan_interval
+        self._last_scan = 0.0
+        self._lock = threading.RLock()  # 保护数据库和根文件夹，只在读写时短暂持有
+        self._refresh_lock = threading.Lock()  # 同一时间只有一个线程扫描
+        self._listeners = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS library_images (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                quick_hash TEXT NOT NULL,
+                full_hash TEXT,
+                duplicate_of TEXT
+            );
+            CREATE INDEX IF NOT EXISTS library_fingerprint ON library_images (size, quick_hash);
+            """
+        )
+        self._conn.commit()
+        self.set_roots(roots)
+
+    @classmethod
+    def shared(cls):
+        """获取进程内共享的图库实例"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def roots_from_config(config, downloads_dir=OSS_WALLPAPER_DIR):
+        """配置中的 library_folders（默认为当前文件夹），library_include_downloads 为真时加上下载目录"""
+        roots = list(config.get("library_folders") or [config.get("last_folder", "")])
+        if config.get("library_include_downloads", True):
+            roots.append(downloads_dir)
+        return roots
+
+    def set_roots(self, roots):
+        """设置根文件夹，变化时下一次 refresh 立即重新扫描"""
+        roots = [os.path.normpath(os.path.abspath(root)) for root in roots if root]
+        with self._lock:
+            if roots != self.roots:
+                self.roots = roots
+                self._last_scan = 0.0
+
+    # 与 FolderIndex 一致的接口，供 Playlist 使用
+    def key_for(self, folder):
+        return LIBRARY_KEY
+
+    def name_of(self, key, path):
+        return os.path.normpath(os.path.abspath(path))
+
+    def path_of(self, key, name):
+        return name
+
+    def add_listener(self, listener):
+        """注册变化回调 listener(LIBRARY_KEY, added, removed)，只报告参与轮换的代表路径"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _unique_paths(self):
+        return {path for (path,) in self._conn.execute(
+            "SELECT path FROM library_images WHERE duplicate_of IS NULL"
+        )}
+
+    def refresh(self, key=LIBRARY_KEY, force=False):
+        """
+        按需重新扫描全部根文件夹并更新重复文件分组。
+        遍历目录和计算哈希时不持有 self._lock，content_key 等查询不会被扫描阻塞；
+        结果在最后一个事务中一次写入。
+        :param force: 忽略 rescan_interval 立即扫描。
+        :return: (added, removed) 参与轮换的代表路径的变化。
+        """
+        with self._refresh_lock:
+            with self._lock:
+                if not force and time.monotonic() - self._last_scan < self.rescan_interval:
+                    return [], []
+                self._last_scan = time.monotonic()
+                roots = list(self.roots)
+                indexed = {
+                    path: (size, mtime, fingerprint)
+                    for path, size, mtime, fingerprint in self._conn.execute(
+                        "SELECT path, size, mtime, quick_hash FROM library_images"
+                    )
+                }
+
+            with ThreadPoolExecutor(max_workers=WALK_WORKERS, thread_name_prefix="library") as pool:
+                with Instrumentation.shared().span("library.walk", "folder", roots=len(roots)) as span:
+                    scanned = self._walk(pool, roots)
+                    span.set(images=len(scanned))
+                removed = [path for path in indexed if path not in scanned]
+                changed = [path for path, stat in scanned.items() if indexed.get(path, (None, None))[:2] != stat]
+                if not removed and not changed:
+                    return [], []
+
+                fingerprints = dict(zip(changed, pool.map(self._safe_quick_hash, changed)))
+                pending = {path: scanned[path] + (fingerprints[path],) for path in changed if fingerprints[path]}
+                # 新增、修改和删除的文件所在分组都要重新选代表（删除的可能正是代表）
+                affected = {(size, fingerprint) for size, _, fingerprint in pending.values()}
+                affected.update((indexed[path][0], indexed[path][2]) for path in removed + changed if path in indexed)
+                rows = self._regroup(pool, affected, pending, set(removed))
+
+            with self._lock:
+                before = self._unique_paths()
+                with self._conn:
+                    self._conn.executemany("DELETE FROM library_images WHERE path = ?", [(path,) for path in removed])
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO library_images (path, size, mtime, quick_hash, full_hash, duplicate_of)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                after = self._unique_paths()
+                added_unique = sorted(after - before)
+                removed_unique = sorted(before - after)
+                listeners = list(self._listeners)
+
+        instrumentation = Instrumentation.shared()
+        instrumentation.count("library.added", len(added_unique))
+        instrumentation.count("library.removed", len(removed_unique))
+        if added_unique or removed_unique:
+            for listener in listeners:
+                try:
+                    listener(LIBRARY_KEY, added_unique, removed_unique)
+                except Exception as e:
+                    print(f"Error in library listener: {e}")
+        return added_unique, removed_unique
+
+    @staticmethod
+    def _safe_quick_hash(path):
+        try:
+            return quick_hash(path)
+        except OSError as e:
+            print(f"Error hashing {path}: {e}")
+            return None
+
+    @staticmethod
+    def _safe_full_hash(path):
+        try:
+            return full_hash(path)
+        except OSError as e:
+            print(f"Error hashing {path}: {e}")
+            return None
+
+    @classmethod
+    def scan(cls, roots):
+        """并行递归扫描文件夹（不写入图库），返回 {路径: (大小, mtime)}"""
+        roots = [os.path.normpath(os.path.abspath(root)) for root in roots if root]
+        with ThreadPoolExecutor(max_workers=WALK_WORKERS, thread_name_prefix="library") as pool:
+            return cls._walk(pool, roots)
+
+    @classmethod
+    def _walk(cls, pool, roots):
+        """并行遍历根文件夹，返回 {路径: (大小, mtime)}"""
+        files = {}
+        seen = set()
+        pending = set()
+        for root in roots:
+            real = os.path.realpath(root)
+            if os.path.isdir(root) and real not in seen:
+                seen.add(real)
+                pending.add(pool.submit(cls._scan_dir, root))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                dir_files, subdirs = future.result()
+                files.update(dir_files)
+                for subdir in subdirs:
+                    real = os.path.realpath(subdir)
+                    if real not in seen:  # 根文件夹相互包含时不重复扫描
+                        seen.add(real)
+                        pending.add(pool.submit(cls._scan_dir, subdir))
+        return files
+
+    @staticmethod
+    def _scan_dir(directory):
+        files = {}
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):  # 跳过隐藏目录和断点续传等临时文件
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                            stat = entry.stat()
+                            files[os.path.normpath(entry.path)] = (stat.st_size, stat.st_mtime)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Error scanning {directory}: {e}")
+        return files, subdirs
+
+    def _regroup(self, pool, fingerprints, pending, removed):
+        """
+        重新计算受影响指纹的重复分组：快速指纹相同的文件补算完整哈希，
+        完整哈希也相同的视为同一内容，路径最小的作为代表。
+        :param fingerprints: 受影响的 (大小, 快速指纹) 集合。
+        :param pending: 本次新增或修改、尚未写入的文件 {路径: (大小, mtime, 快速指纹)}。
+        :param removed: 本次删除的路径。
+        :return: 需要写入的行 [(路径, 大小, mtime, 快速指纹, 完整哈希, 代表路径)]。
+        """
+        groups = {fingerprint: {} for fingerprint in fingerprints}
+        with self._lock:
+            for size, fingerprint in fingerprints:
+                for path, mtime, digest in self._conn.execute(
+                    "SELECT path, mtime, full_hash FROM library_images WHERE size = ? AND quick_hash = ?",
+                    (size, fingerprint),
+                ):
+                    if path not in removed and path not in pending:
+                        groups[(size, fingerprint)][path] = (mtime, digest)
+        for path, (size, mtime, fingerprint) in pending.items():
+            groups[(size, fingerprint)][path] = (mtime, None)
+
+        rows = []
+        for (size, fingerprint), members in groups.items():
+            if len(members) == 1:
+                path, (mtime, _) = next(iter(members.items()))
+                rows.append((path, size, mtime, fingerprint, None, None))
+                continue
+            missing = [path for path, (_, digest) in members.items() if digest is None]
+            digests = {path: digest for path, (_, digest) in members.items()}
+            digests.update(zip(missing, pool.map(self._safe_full_hash, missing)))
+            representatives = {}
+            for path in sorted(members):
+                digest = digests[path] or path  # 读取失败的文件单独成组
+                representative = representatives.setdefault(digest, path)
+                rows.append((path, size, members[path][0], fingerprint, digests[path],
+                             None if representative == path else representative))
+        return rows
+
+    def content_key(self, path):
+        """
+        返回图片的内容 key（大小 + 哈希），重复文件的 key 相同，可用于共用缩略图；
+        不在图库中或文件已修改时返回 None。
+        """
+        path = os.path.normpath(os.path.abspath(path))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, quick_hash, full_hash FROM library_images WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        size, mtime, fingerprint, digest = row
+        try:
+            if os.path.getmtime(path) != mtime:
+                return None
+        except OSError:
+            return None
+        return f"{size}-{digest or fingerprint}"
+
+    def count(self, key=LIBRARY_KEY):
+        """返回参与轮换的图片数量（重复文件只算一次）"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM library_images WHERE duplicate_of IS NULL"
+            ).fetchone()[0]
+
+    def stats(self):
+        """返回 (图片总数, 去重后的数量)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(duplicate_of IS NULL), 0) FROM library_images"
+            ).fetchone()
+
+    def get_page_entries(self, key, offset, limit):
+        """按路径顺序返回去重后的 (路径, mtime) 列表"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT path, mtime FROM library_images WHERE duplicate_of IS NULL ORDER BY path LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+
+    def get_page(self, key, offset, limit):
+        return [path for path, _ in self.get_page_entries(key, offset, limit)]
+
+    def get_names_after(self, key, name, limit):
+        """按路径顺序返回排在 name 之后的去重路径，name 为 None 时从头开始"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM library_images WHERE duplicate_of IS NULL AND path > ? ORDER BY path LIMIT ?",
+                (name or "", limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_duplicates(self, path):
+        """返回与 path 内容相同的其他路径"""
+        path = os.path.normpath(os.path.abspath(path))
+        with self._lock:
+            row = self._conn.execute("SELECT duplicate_of FROM library_images WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                return []
+            representative = row[0] or path
+            rows = self._conn.execute(
+                "SELECT path FROM library_images WHERE (path = ? OR duplicate_of = ?) AND path != ?",
+                (representative, representative, path),
+            ).fetchall()
+        return [row[0] for row in rows]
@@ -2,38 +2,175 @@
 import os
 from PIL import Image, ImageTk
 import hashlib
+from folder_index import FolderIndex
+from instrumentation import Instrumentation
+from image_library import ImageLibrary
+from image_metadata import MetadataIndex
+from perceptual_index import PerceptualIndex
+from thumbnail_store import ThumbnailStore
 
-THUMBNAIL_DIR = "thumbnails"
+THUMBNAIL_SIZE = (100, 100)
+# 先整数倍缩小到目标尺寸的 REDUCING_GAP 倍以内，再做精确重采样
+REDUCING_GAP = 2
 
 class ImageManager:
     @staticmethod
     def get_images_in_folder(folder_path):
         try:
-            return [os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.lower().endswith((".jpg", ".jpeg", ".png", ".bmp"))]
+            index = FolderIndex.shared()
+            index.refresh(folder_path)
+            return index.get_all(folder_path)
         except Exception as e:
             print(f"Error: {e}")
             return []
 
     @staticmethod
-    def generate_thumbnail(image_path):
-        if not os.path.exists(THUMBNAIL_DIR):
-            os.makedirs(THUMBNAIL_DIR)
+    def count_images_in_folder(folder_path, criteria=None):
+        """
+        返回文件夹中的图片数量（读取索引，目录未变化时不扫描）。
+        :param criteria: 元数据筛选条件（见 MetadataIndex），只统计满足条件的图片。
+        """
+        try:
+            index = FolderIndex.shared()
+            index.refresh(folder_path)
+            if criteria:
+                metadata = MetadataIndex.shared()
+                metadata.schedule_folder(folder_path)
+                return metadata.count(folder_path, criteria)
+            return index.count(folder_path)
+        except Exception as e:
+            print(f"Error: {e}")
+            return 0
+
+    @staticmethod
+    def get_images_page(folder_path, offset, limit):
+        """返回文件夹中 [offset, offset + limit) 范围内的图片路径"""
+        try:
+            index = FolderIndex.shared()
+            index.refresh(folder_path)
+            return index.get_page(folder_path, offset, limit)
+        except Exception as e:
+            print(f"Error: {e}")
+            return []
 
+    @staticmethod
+    def get_image_entries_page(folder_path, offset, limit, criteria=None):
+        """
+        返回文件夹中 [offset, offset + limit) 范围内的 (图片路径, mtime)。
+        :param criteria: 元数据筛选和排序条件（见 MetadataIndex），尚未计算元数据的图片暂不出现。
+        """
+        try:
+            index = FolderIndex.shared()
+            index.refresh(folder_path)
+            if criteria:
+                return MetadataIndex.shared().get_page_entries(folder_path, criteria, offset, limit)
+            return index.get_page_entries(folder_path, offset, limit)
+        except Exception as e:
+            print(f"Error: {e}")
+            return []
+
+    @staticmethod
+    def thumbnail_key(image_path):
+        """
+        缩略图缓存 key：图库中已索引的图片使用内容 key，重复图片共用一份缩略图；
+        否则为路径 + mtime 的 md5，文件修改后自然失效。
+        """
+        content_key = ImageLibrary.shared().content_key(image_path)
+        if content_key is not None:
+            return hashlib.md5(content_key.encode('utf-8')).hexdigest()
         file_stat = os.stat(image_path)
         unique_id = f"{image_path}-{file_stat.st_mtime}".encode('utf-8')
-        hashed_id = hashlib.md5(unique_id).hexdigest()
-        thumbnail_path = os.path.join(THUMBNAIL_DIR, f"{hashed_id}_thumbnail.png")
+        return hashlib.md5(unique_id).hexdigest()
 
+    @staticmethod
+    def load_thumbnail_image(image_path):
+        """
+        加载（必要时生成并缓存）缩略图，返回 PIL Image。
+        不依赖 Tk，可在后台线程中调用。
+        """
         try:
-            if os.path.exists(thumbnail_path):
-                with Image.open(thumbnail_path) as cached_img:
-                    return ImageTk.PhotoImage(cached_img)
+            instrumentation = Instrumentation.shared()
+            store = ThumbnailStore.shared()
+            thumbnail_key = ImageManager.thumbnail_key(image_path)
+            cached_img = store.get(thumbnail_key)
+            if cached_img is not None:
+                instrumentation.count("thumbnail.hit")
+                if not PerceptualIndex.shared().contains(image_path):
+                    ImageManager._index_perceptual_hash(image_path, cached_img)
+                return cached_img
 
             # 如果缓存不存在，生成新缩略图
-            with Image.open(image_path) as img:
-                img.thumbnail((100, 100))
-                img.save(thumbnail_path)
-                return ImageTk.PhotoImage(img)
+            instrumentation.count("thumbnail.miss")
+            with instrumentation.span("thumbnail.decode", "thumbnail", path=image_path), Image.open(image_path) as img:
+                thumbnail = ImageManager.decode_thumbnail(img)
+                store.put(thumbnail_key, thumbnail)
+            # 顺带记录感知哈希，用于发现近似重复的图片
+            ImageManager._index_perceptual_hash(image_path, thumbnail)
+            return thumbnail
         except Exception as e:
             print(f"Error generating thumbnail for {image_path}: {e}")
             return None
+
+    @staticmethod
+    def get_cached_thumbnail(image_path):
+        """只读取已缓存的缩略图，未缓存时返回 None（不解码原图）"""
+        try:
+            return ThumbnailStore.shared().get(ImageManager.thumbnail_key(image_path))
+        except Exception as e:
+            print(f"Error reading cached thumbnail for {image_path}: {e}")
+            return None
+
+    @staticmethod
+    def _index_perceptual_hash(image_path, thumbnail):
+        try:
+            PerceptualIndex.shared().add_image(image_path, thumbnail)
+        except Exception as e:
+            print(f"Error hashing {image_path}: {e}")
+
+    @staticmethod
+    def find_local_duplicate(image):
+        """
+        查找与图片（如 OSS 缩略图）近似重复的本地图片，可在后台线程调用。
+        :return: 最相近的本地图片路径，没有时返回 None。
+        """
+        matches = PerceptualIndex.shared().find_image(image)
+        return matches[0][0] if matches else None
+
+    @staticmethod
+    def decode_thumbnail(img, size=THUMBNAIL_SIZE):
+        """
+        把已打开（尚未解码）的图片缩成缩略图。
+        JPEG 直接使用 Image.thumbnail，它已在解码阶段通过 draft 按 1/2、1/4、1/8 缩小；
+        其他格式必须完整解码，之后先用 reduce 做整数倍盒式缩小，再做最终重采样。
+        :param img: Image.open 返回的图片对象。
+        :param size: 缩略图最大尺寸。
+        :return: 新的缩略图 Image。
+        """
+        if img.format == "JPEG":
+            img.thumbnail(size)
+        else:
+            target = (size[0] * REDUCING_GAP, size[1] * REDUCING_GAP)
+            factor = min(img.width // target[0], img.height // target[1])
+            if factor > 1:
+                img = img.reduce(factor)
+            img.thumbnail(size, reducing_gap=None)
+        if img.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            img = img.convert("RGB")  # 例如 CMYK JPEG，无法直接保存为 PNG
+        return img
+
+    @staticmethod
+    def to_photo_image(image):
+        """将 PIL Image 转为 Tk 可用的 PhotoImage（必须在主线程调用）"""
+        return ImageTk.PhotoImage(image)
+
+    @staticmethod
+    def add_metadata_listener(listener):
+        """注册元数据更新回调 listener(paths)，在后台线程中调用"""
+        MetadataIndex.shared().add_listener(listener)
+
+    @staticmethod
+    def generate_thumbnail(image_path):
+        image = ImageManager.load_thumbnail_image(image_path)
+        if image is None:
+            return None
+        return ImageManager.to_photo_image(image)
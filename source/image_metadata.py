@@ -0,0 +1,379 @@
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageStat
+
+from folder_index import FolderIndex
+from image_library import ImageLibrary
+from perceptual_index import PerceptualIndex, dhash
+
+SAMPLE_SIZE = (32, 32)  # 计算颜色用的缩略尺寸
+DOMINANT_COLORS = 8  # 主色调量化的颜色数
+EXTRACT_BATCH = 64
+FILTER_CHUNK = 500  # 每条 IN 查询的图片数，低于 SQLite 的参数个数上限
+EXIF_ORIENTATION = 0x0112
+EXIF_DATETIME = 0x0132
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 0x9003
+
+# 可排序的字段，前缀 "-" 表示降序
+SORT_COLUMNS = {
+    "name": "i.name",
+    "mtime": "i.mtime",
+    "width": "m.width",
+    "height": "m.height",
+    "pixels": "m.width * m.height",
+    "aspect": "m.aspect",
+    "brightness": "m.brightness",
+    "taken": "m.taken",
+}
+ORIENTATIONS = {
+    "landscape": "m.width > m.height",
+    "portrait": "m.width < m.height",
+    "square": "m.width = m.height",
+}
+# 数值条件：条件名 -> (字段, 比较符)
+RANGE_FILTERS = {
+    "min_width": ("m.width", ">="),
+    "max_width": ("m.width", "<="),
+    "min_height": ("m.height", ">="),
+    "max_height": ("m.height", "<="),
+    "min_aspect": ("m.aspect", ">="),
+    "max_aspect": ("m.aspect", "<="),
+    "min_brightness": ("m.brightness", ">="),
+    "max_brightness": ("m.brightness", "<="),
+}
+
+
+def extract_metadata(path):
+    """
+    读取图片元数据：尺寸和 EXIF 只读文件头，颜色从极小的缩略图计算（JPEG 通过 draft 在解码时缩小）。
+    :return: dict，包含 width、height（已按 EXIF 方向旋转）、taken、brightness（0~1）、mean_color、dominant_color
+             和感知哈希 dhash。
+    """
+    with Image.open(path) as img:
+        width, height = img.size
+        exif = img.getexif()
+        if exif.get(EXIF_ORIENTATION) in (5, 6, 7, 8):  # 旋转 90 度的照片
+            width, height = height, width
+        taken = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+
+        if img.format == "JPEG":
+            img.draft("RGB", (SAMPLE_SIZE[0] * 2, SAMPLE_SIZE[1] * 2))
+        sample = img.convert("RGB")
+        sample.thumbnail(SAMPLE_SIZE)
+
+    mean = tuple(int(round(value)) for value in ImageStat.Stat(sample).mean)
+    brightness = ImageStat.Stat(sample.convert("L")).mean[0] / 255
+    quantized = sample.quantize(DOMINANT_COLORS)
+    _, index = max(quantized.getcolors())
+    palette = quantized.getpalette()
+    dominant = tuple(palette[index * 3:index * 3 + 3])
+    return {
+        "width": width,
+        "height": height,
+        "taken": str(taken) if taken else None,
+        "brightness": round(brightness, 4),
+        "mean_color": "#%02x%02x%02x" % mean,
+        "dominant_color": "#%02x%02x%02x" % dominant,
+        "dhash": dhash(sample),
+    }
+
+
+def active_filter(rules, hour):
+    """
+    从配置的筛选规则中选出当前生效的一条。
+    :param rules: 单个条件字典，或条件字典列表；条目可带 "hours": [开始, 结束)，跨午夜时开始大于结束。
+    :param hour: 当前小时（0~23）。
+    :return: 第一条时间段包含 hour（或没有时间段）的规则，去掉 hours 字段；没有时返回 None。
+    """
+    if isinstance(rules, dict):
+        rules = [rules]
+    for rule in rules or []:
+        hours = rule.get("hours")
+        if hours:
+            start, end = hours
+            inside = start <= hour < end if start <= end else (hour >= start or hour < end)
+            if not inside:
+                continue
+        return {key: value for key, value in rule.items() if key != "hours"}
+    return None
+
+
+class MetadataIndex:
+    """
+    图片元数据索引，与 FolderIndex 存在同一个 SQLite 文件中，可以直接与 images 表联合查询，
+    按尺寸、方向、亮度等筛选和排序几千张图片只需几毫秒。
+    元数据在后台线程中计算一次，文件大小或 mtime 变化后重新计算；
+    FolderIndex 和 ImageLibrary 报告的新文件会自动加入计算队列。
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, index=None, max_workers=2):
+        """
+        :param index: FolderIndex 实例，默认使用共享实例；元数据存入它的数据库文件。
+        :param max_workers: 后台提取线程数。
+        """
+        self.index = index or FolderIndex.shared()
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metadata")
+        self._conn = sqlite3.connect(self.index.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS image_metadata (
+                folder TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                aspect REAL,
+                taken TEXT,
+                brightness REAL,
+                mean_color TEXT,
+                dominant_color TEXT,
+                PRIMARY KEY (folder, name)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+        self.index.add_listener(self._on_index_changed)
+
+    @classmethod
+    def shared(cls):
+        """获取进程内共享的元数据索引，同时跟随共享的图库更新"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                ImageLibrary.shared().add_listener(cls._shared._on_index_changed)
+            return cls._shared
+
+    @staticmethod
+    def _split(path):
+        path = os.path.normpath(os.path.abspath(path))
+        return os.path.dirname(path), os.path.basename(path)
+
+    def add_listener(self, listener):
+        """注册回调 listener(paths)，一批元数据写入后在后台线程中调用"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _on_index_changed(self, folder, added, removed):
+        # 图库中重复图片换了代表时旧路径也会报告为删除，只清理确实不存在的文件
+        removed = [path for path in removed if not os.path.exists(path)]
+        if removed:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "DELETE FROM image_metadata WHERE folder = ? AND name = ?", [self._split(path) for path in removed]
+                )
+        if added:
+            self.schedule(added)
+
+    def schedule(self, paths):
+        """在后台为缺少或已过期元数据的图片计算元数据，已在队列中的图片不会重复提交"""
+        with self._lock:
+            paths = [path for path in paths if path not in self._pending]
+            self._pending.update(paths)
+        for start in range(0, len(paths), EXTRACT_BATCH):
+            self._executor.submit(self._extract_batch, paths[start:start + EXTRACT_BATCH])
+
+    def schedule_folder(self, folder):
+        """为文件夹中尚未计算元数据的图片排队"""
+        folder = os.path.normpath(os.path.abspath(folder))
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT i.name FROM images i
+                LEFT JOIN image_metadata m ON m.folder = i.folder AND m.name = i.name
+                WHERE i.folder = ? AND (m.name IS NULL OR m.size != i.size OR m.mtime != i.mtime)
+                """,
+                (folder,),
+            ).fetchall()
+        self.schedule([os.path.join(folder, name) for (name,) in rows])
+
+    def pending(self):
+        """尚未完成的图片数量"""
+        with self._lock:
+            return len(self._pending)
+
+    def _is_fresh(self, folder, name, stat):
+        row = self._conn.execute(
+            "SELECT size, mtime FROM image_metadata WHERE folder = ? AND name = ?", (folder, name)
+        ).fetchone()
+        return row is not None and row == (stat.st_size, stat.st_mtime)
+
+    def needs_update(self, path):
+        """图片是否缺少元数据或元数据已过期"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        with self._lock:
+            return not self._is_fresh(*self._split(path), stat)
+
+    def _extract_batch(self, paths):
+        entries = []
+        try:
+            for path in paths:
+                try:
+                    if not self.needs_update(path):
+                        continue
+                    stat = os.stat(path)
+                    entries.append((path, stat.st_size, stat.st_mtime, extract_metadata(path)))
+                except Exception as e:
+                    print(f"Error reading metadata of {path}: {e}")
+        finally:
+            with self._lock:
+                self._pending.difference_update(paths)
+        self.store(entries)
+
+    def store(self, entries):
+        """
+        写入已提取的元数据（也用于批量预热时由其他进程提取的结果）。
+        :param entries: [(路径, 文件大小, mtime, extract_metadata 的结果)]。
+        """
+        if not entries:
+            return
+        rows = []
+        for path, size, mtime, meta in entries:
+            PerceptualIndex.shared().add(path, meta["dhash"])
+            rows.append(self._split(path) + (
+                size, mtime, meta["width"], meta["height"],
+                meta["width"] / meta["height"] if meta["height"] else None, meta["taken"],
+                meta["brightness"], meta["mean_color"], meta["dominant_color"],
+            ))
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO image_metadata (folder, name, size, mtime, width, height, aspect,"
+                    " taken, brightness, mean_color, dominant_color) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            listeners = list(self._listeners)
+        written = [os.path.join(row[0], row[1]) for row in rows]
+        for listener in listeners:
+            try:
+                listener(written)
+            except Exception as e:
+                print(f"Error in metadata listener: {e}")
+
+    def get(self, path):
+        """返回图片的元数据字典，尚未计算时返回 None"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT width, height, aspect, taken, brightness, mean_color, dominant_color"
+                " FROM image_metadata WHERE folder = ? AND name = ?",
+                self._split(path),
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    @staticmethod
+    def _build_query(criteria):
+        """
+        把筛选条件转换为 SQL。
+        :param criteria: 条件字典，支持 orientation、min_/max_width、min_/max_height、min_/max_aspect、
+                         min_/max_brightness 和 sort（SORT_COLUMNS 中的字段，前缀 "-" 为降序）。
+        :return: (where 子句, 参数, order by 子句)。
+        """
+        clauses = []
+        params = []
+        order = "i.name"
+        for key, value in (criteria or {}).items():
+            if key == "orientation":
+                if value not in ORIENTATIONS:
+                    raise ValueError(f"Unknown orientation: {value}")
+                clauses.append(ORIENTATIONS[value])
+            elif key in RANGE_FILTERS:
+                column, operator = RANGE_FILTERS[key]
+                clauses.append(f"{column} {operator} ?")
+                params.append(value)
+            elif key == "sort":
+                column = SORT_COLUMNS.get(value.lstrip("-"))
+                if column is None:
+                    raise ValueError(f"Unknown sort key: {value}")
+                order = f"{column} {'DESC' if value.startswith('-') else 'ASC'}, i.name"
+            else:
+                raise ValueError(f"Unknown metadata filter: {key}")
+        return " AND ".join(clauses) or "1", params, order
+
+    @staticmethod
+    def validate(criteria):
+        """检查筛选条件，无效时抛出 ValueError"""
+        MetadataIndex._build_query(criteria)
+
+    def count(self, folder, criteria):
+        """返回文件夹中满足条件的图片数量（只统计已计算元数据的图片）"""
+        where, params, _ = self._build_query(criteria)
+        with self._lock:
+            return self._conn.execute(
+                f"""
+                SELECT COUNT(*) FROM images i
+                JOIN image_metadata m ON m.folder = i.folder AND m.name = i.name
+                WHERE i.folder = ? AND {where}
+                """,
+                [os.path.normpath(os.path.abspath(folder))] + params,
+            ).fetchone()[0]
+
+    def get_page_entries(self, folder, criteria, offset, limit):
+        """按条件筛选并排序文件夹中的图片，返回 [offset, offset + limit) 范围内的 (路径, mtime) 列表"""
+        folder = os.path.normpath(os.path.abspath(folder))
+        where, params, order = self._build_query(criteria)
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT i.name, i.mtime FROM images i
+                JOIN image_metadata m ON m.folder = i.folder AND m.name = i.name
+                WHERE i.folder = ? AND {where}
+                ORDER BY {order} LIMIT ? OFFSET ?
+                """,
+                [folder] + params + [limit, offset],
+            ).fetchall()
+        return [(os.path.join(folder, name), mtime) for name, mtime in rows]
+
+    def matches(self, path, criteria):
+        """图片是否满足条件（sort 被忽略）；尚未计算元数据的图片视为不满足"""
+        return path in self.filter_paths([path], criteria)
+
+    def filter_paths(self, paths, criteria):
+        """
+        批量检查条件（sort 被忽略），每个文件夹每 FILTER_CHUNK 张图片一次查询。
+        :return: 满足条件的路径集合（与传入的路径字符串相同）；尚未计算元数据的图片视为不满足。
+        """
+        criteria = {key: value for key, value in (criteria or {}).items() if key != "sort"}
+        where, params, _ = self._build_query(criteria)
+        by_folder = {}
+        for path in paths:
+            folder, name = self._split(path)
+            by_folder.setdefault(folder, {})[name] = path
+        accepted = set()
+        with self._lock:
+            for folder, names in by_folder.items():
+                names = list(names.items())
+                for start in range(0, len(names), FILTER_CHUNK):
+                    chunk = names[start:start + FILTER_CHUNK]
+                    rows = self._conn.execute(
+                        f"SELECT m.name FROM image_metadata m WHERE m.folder = ?"
+                        f" AND m.name IN ({','.join('?' * len(chunk))}) AND {where}",
+                        [folder] + [name for name, _ in chunk] + params,
+                    )
+                    accepted.update(dict(chunk)[name] for (name,) in rows)
+        return accepted
+
+    def shutdown(self):
+        """取消尚未开始的提取任务"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
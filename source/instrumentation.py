@@ -0,0 +1,194 @@
+import collections
+import json
+import os
+import threading
+import time
+
+# 环境变量优先于配置项 instrumentation_enabled，便于临时排查卡顿
+INSTRUMENTATION_ENV = "WALLPAPER_TRACE"
+DEFAULT_TRACE_FILE = "trace.json"
+# 最多保留的事件数，超过后丢弃最早的，长时间运行也不会无限增长
+DEFAULT_MAX_EVENTS = 100000
+
+
+class _NullSpan:
+    """关闭时 span() 返回的空对象，进入和退出都不做任何事"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("owner", "name", "category", "args", "start")
+
+    def __init__(self, owner, name, category, args):
+        self.owner = owner
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.owner.record(self.name, self.category, self.start, duration, self.args)
+        return False
+
+    def set(self, **args):
+        """补充只有执行后才知道的参数（如条目数、HTTP 状态）"""
+        self.args.update(args)
+
+
+class Instrumentation:
+    """
+    热点路径的轻量计时：span 记录一段代码的耗时，counter 记录缓存命中等次数。
+    汇总数据用于状态栏读数，原始事件可导出为 Chrome trace（chrome://tracing 或 Perfetto 打开）。
+    关闭时 span() 返回共享的空对象、count() 直接返回，开销只有一次属性判断。
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, enabled=False, max_events=DEFAULT_MAX_EVENTS):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._events = collections.deque(maxlen=max_events)
+        self._spans = {}  # 名称 -> [次数, 总耗时, 最大耗时, 最近一次耗时]（秒）
+        self._counters = collections.Counter()
+        self._threads = {}  # 线程 id -> 线程名
+
+    @classmethod
+    def shared(cls):
+        """获取进程内共享的实例"""
+        shared = cls._shared
+        if shared is not None:
+            return shared
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def configure(self, config):
+        """按环境变量 WALLPAPER_TRACE 或配置项 instrumentation_enabled 开关"""
+        env = os.environ.get(INSTRUMENTATION_ENV)
+        self.set_enabled(env not in ("", "0") if env is not None else config.get("instrumentation_enabled", False))
+        return self
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+
+    def span(self, name, category="app", **args):
+        """
+        计时上下文：with instrumentation.span("thumbnail.decode", "thumbnail", path=path): ...
+        :param category: Chrome trace 中的分类，用于按类别筛选。
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def record(self, name, category, start, duration, args=None):
+        """记录一段已完成的耗时，start 为 time.perf_counter() 的值（秒）"""
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                self._spans[name] = [1, duration, duration, duration]
+            else:
+                stats[0] += 1
+                stats[1] += duration
+                stats[2] = max(stats[2], duration)
+                stats[3] = duration
+            self._threads[thread.ident] = thread.name
+            self._events.append(("X", name, category, start, duration, thread.ident, args or None))
+
+    def count(self, name, value=1):
+        """累加计数器，如 thumbnail.hit / thumbnail.miss"""
+        if not self.enabled:
+            return
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._counters[name] += value
+            self._events.append(("C", name, "counter", time.perf_counter(), self._counters[name], thread_id, None))
+
+    def reset(self):
+        with self._lock:
+            self._origin = time.perf_counter()
+            self._events.clear()
+            self._spans.clear()
+            self._counters.clear()
+
+    def stats(self):
+        """
+        汇总：{"spans": {名称: {count, total_ms, mean_ms, max_ms, last_ms}}, "counters": {名称: 值}}
+        """
+        with self._lock:
+            spans = {
+                name: {
+                    "count": count,
+                    "total_ms": total * 1000,
+                    "mean_ms": total * 1000 / count,
+                    "max_ms": longest * 1000,
+                    "last_ms": last * 1000,
+                }
+                for name, (count, total, longest, last) in self._spans.items()
+            }
+            return {"spans": spans, "counters": dict(self._counters)}
+
+    def summary(self, limit=5):
+        """状态栏读数：总耗时最多的几个 span 和全部计数器"""
+        stats = self.stats()
+        spans = sorted(stats["spans"].items(), key=lambda item: item[1]["total_ms"], reverse=True)[:limit]
+        parts = [f"{name} {span['count']}×{span['mean_ms']:.1f}ms (max {span['max_ms']:.0f})" for name, span in spans]
+        counters = " ".join(f"{name}={value}" for name, value in sorted(stats["counters"].items()))
+        if counters:
+            parts.append(counters)
+        return " | ".join(parts) if parts else "no samples yet"
+
+    def export_chrome_trace(self, path=DEFAULT_TRACE_FILE):
+        """
+        写出 Chrome trace 事件格式的 JSON（span 为完整事件 ph=X，计数器为 ph=C）。
+        :return: 写出的事件数。
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            origin = self._origin
+
+        trace_events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        for phase, name, category, start, value, tid, args in events:
+            event = {"name": name, "cat": category, "ph": phase, "pid": pid, "tid": tid,
+                     "ts": round((start - origin) * 1e6, 1)}
+            if phase == "X":
+                event["dur"] = round(value * 1e6, 1)
+                if args:
+                    event["args"] = {key: str(item) if not isinstance(item, (int, float, bool)) else item
+                                     for key, item in args.items()}
+            else:
+                event["args"] = {name: value}
+            trace_events.append(event)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
+        os.replace(tmp_path, path)
+        return len(events)
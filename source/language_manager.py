@@ -25,6 +25,12 @@ class LanguageManager:
             "oss_wallpapers": "OSS Wallpapers",
             "oss_not_configured": "OSS is not configured or disabled.",
             "oss_load_failed": "Failed to load OSS images: {error}",
+            "oss_loading": "Loading OSS wallpapers...",
+            "oss_downloading": "Downloading {name}: {percent}%",
+            "oss_download_failed": "Failed to download or set wallpaper: {error}",
+            "oss_using_local_copy": "Already in your library, using local copy: {name}",
+            "trace_exported": "Trace written to {path} ({events} events)",
+            "trace_export_failed": "Failed to write trace: {error}",
         },
         "Chinese": {
             "select_folder": "选择文件夹",
@@ -51,6 +57,12 @@ class LanguageManager:
             "oss_wallpapers": "OSS 壁纸",
             "oss_not_configured": "OSS 未配置或已禁用。",
             "oss_load_failed": "加载 OSS 壁纸失败：{error}",
+            "oss_loading": "正在加载 OSS 壁纸……",
+            "oss_downloading": "正在下载 {name}：{percent}%",
+            "oss_download_failed": "下载或设置壁纸失败：{error}",
+            "oss_using_local_copy": "本地已有相同壁纸，直接使用：{name}",
+            "trace_exported": "性能记录已写入 {path}（{events} 个事件）",
+            "trace_export_failed": "写入性能记录失败：{error}",
         },
     }
 
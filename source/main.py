@@ -1,10 +1,14 @@
 ### main.py
 from tkinter import Tk, StringVar
 from config_manager import ConfigManager
+from instrumentation import Instrumentation
 from ui_components import AppUI
+from wallpaper_manager import WallpaperManager
+from wallpaper_renderer import WallpaperRenderer
 
 # Initialize main application
 def main():
+    WallpaperRenderer.enable_dpi_awareness()  # 屏幕尺寸必须是物理像素，壁纸变体才不会被系统放大
     root = Tk()
     root.title("Wallpaper Changer")
     root.geometry("800x600")  # 设置窗口初始化大小
@@ -17,10 +21,13 @@ def main():
     root.geometry(f"800x600+{x_position}+{y_position}")
 
     config = ConfigManager.load_config()
+    WallpaperManager.configure(config)
+    Instrumentation.shared().configure(config)
     current_language = StringVar(root, value=config.get("language", "English"))
 
     app_ui = AppUI(root, config, current_language)
     root.mainloop()
+    app_ui.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,192 @@
+import os
+import sqlite3
+import threading
+
+from PIL import Image
+
+PERCEPTUAL_INDEX_DB = "perceptual_index.db"
+HASH_BITS = 64
+CHUNK_BITS = 8
+CHUNKS = HASH_BITS // CHUNK_BITS
+# 两张图片的 dHash 汉明距离不超过该值即视为近似重复（同一张图的不同分辨率、压缩质量）
+DEFAULT_MAX_DISTANCE = 6
+# 纯色、渐变等几乎没有细节的图片 dHash 接近全 0 或全 1，彼此都“相同”，不参与近似重复匹配
+MIN_INFORMATIVE_BITS = 8
+
+
+def dhash(image):
+    """
+    计算 64 位差异哈希（dHash）：缩成 9x8 灰度图，逐行比较相邻像素的明暗。
+    对缩放和重新压缩不敏感，直接使用缩略图计算即可。
+    :param image: PIL Image。
+    :return: 0 ~ 2^64-1 的整数。
+    """
+    pixels = image.convert("L").resize((9, 8), Image.BILINEAR).tobytes()
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for column in range(8):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def is_informative(value):
+    """哈希中 1 的个数足够多（且不接近全 1）时才能用来判断近似重复"""
+    return MIN_INFORMATIVE_BITS <= value.bit_count() <= HASH_BITS - MIN_INFORMATIVE_BITS
+
+
+def _chunks(value):
+    return [(value >> (index * CHUNK_BITS)) & ((1 << CHUNK_BITS) - 1) for index in range(CHUNKS)]
+
+
+def _to_signed(value):
+    # SQLite 的 INTEGER 是有符号 64 位
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+class PerceptualIndex:
+    """
+    本地图片的感知哈希索引，用于发现不同分辨率或编码的同一张壁纸。
+    哈希持久化在 SQLite 中，查询使用内存中的多索引哈希：64 位哈希分成 8 段，
+    汉明距离不超过 7 的两个哈希至少有一段完全相同，只需比较这些候选，10 万张图片查询一次也只要几毫秒。
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path=PERCEPTUAL_INDEX_DB, max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        :param max_distance: 默认的近似重复阈值，必须小于 CHUNKS。
+        """
+        if not 0 <= max_distance < CHUNKS:
+            raise ValueError(f"max_distance must be between 0 and {CHUNKS - 1}")
+        self.max_distance = max_distance
+        self._lock = threading.RLock()
+        self._hashes = {}  # 路径 -> 哈希
+        self._tables = [{} for _ in range(CHUNKS)]  # 每一段：段值 -> 路径集合
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS perceptual_hashes (path TEXT PRIMARY KEY, hash INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.commit()
+        for path, value in self._conn.execute("SELECT path, hash FROM perceptual_hashes"):
+            self._insert(path, value & ((1 << HASH_BITS) - 1))
+
+    @classmethod
+    def shared(cls):
+        """获取进程内共享的索引实例"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def _normalize(path):
+        return os.path.normpath(os.path.abspath(path))
+
+    def _insert(self, path, value):
+        self._hashes[path] = value
+        if not is_informative(value):
+            return  # 仍然记录哈希，避免反复计算，但不进入查询索引
+        for table, chunk in zip(self._tables, _chunks(value)):
+            table.setdefault(chunk, set()).add(path)
+
+    def _discard(self, path):
+        value = self._hashes.pop(path, None)
+        if value is None:
+            return
+        for table, chunk in zip(self._tables, _chunks(value)):
+            bucket = table.get(chunk)
+            if bucket is not None:
+                bucket.discard(path)
+                if not bucket:
+                    del table[chunk]
+
+    def contains(self, path):
+        with self._lock:
+            return self._normalize(path) in self._hashes
+
+    def add(self, path, value):
+        """记录图片的哈希，已存在且相同时不写数据库"""
+        path = self._normalize(path)
+        with self._lock:
+            if self._hashes.get(path) == value:
+                return
+            self._discard(path)
+            self._insert(path, value)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO perceptual_hashes (path, hash) VALUES (?, ?)", (path, _to_signed(value))
+                )
+
+    def add_image(self, path, image):
+        """由缩略图或采样图计算哈希并记录，生成缩略图时顺带调用"""
+        self.add(path, dhash(image))
+
+    def remove(self, paths):
+        """删除不再存在的图片"""
+        paths = [self._normalize(path) for path in paths]
+        with self._lock:
+            for path in paths:
+                self._discard(path)
+            with self._conn:
+                self._conn.executemany("DELETE FROM perceptual_hashes WHERE path = ?", [(path,) for path in paths])
+
+    def find(self, value, max_distance=None, exclude=None):
+        """
+        查找与哈希相近的本地图片，已被删除的文件会顺带从索引移除。
+        信息量太少的哈希（纯色、渐变图片）不做匹配。
+        :return: 按距离排序的 [(路径, 距离)]。
+        """
+        if not is_informative(value):
+            return []
+        max_distance = self.max_distance if max_distance is None else min(max_distance, CHUNKS - 1)
+        with self._lock:
+            candidates = set()
+            for table, chunk in zip(self._tables, _chunks(value)):
+                candidates.update(table.get(chunk, ()))
+            candidates.discard(exclude)
+            matches = [
+                (path, distance) for path in candidates
+                for distance in [(self._hashes[path] ^ value).bit_count()]
+                if distance <= max_distance
+            ]
+        missing = [path for path, _ in matches if not os.path.exists(path)]
+        if missing:
+            self.remove(missing)
+        return sorted((match for match in matches if match[0] not in missing), key=lambda match: (match[1], match[0]))
+
+    def find_image(self, image, max_distance=None):
+        """查找与图片（如 OSS 缩略图）近似重复的本地图片"""
+        return self.find(dhash(image), max_distance)
+
+    def near_duplicates(self, path, max_distance=None):
+        """返回与本地图片近似重复的其他本地图片，没有哈希时返回空列表"""
+        path = self._normalize(path)
+        with self._lock:
+            value = self._hashes.get(path)
+        if value is None:
+            return []
+        return [match for match, _ in self.find(value, max_distance, exclude=path)]
+
+    @staticmethod
+    def _preference(path):
+        # 同一张图的多个版本中优先保留文件最大（通常分辨率或质量最高）的，大小相同时取路径最小的
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = -1
+        return -size, path
+
+    def is_shadowed(self, path):
+        """path 是否有更优的近似重复版本（轮换时跳过）"""
+        duplicates = self.near_duplicates(path)
+        if not duplicates:
+            return False
+        own = self._preference(self._normalize(path))
+        return any(self._preference(other) < own for other in duplicates)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._hashes)
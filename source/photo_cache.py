@@ -0,0 +1,46 @@
+from collections import OrderedDict
+
+from instrumentation import Instrumentation
+
+DEFAULT_PHOTO_CACHE_SIZE = 512
+
+
+class PhotoImageCache:
+    """
+    已解码 PhotoImage 的内存 LRU 缓存，key 为 (path, mtime, size)。
+    翻页和窗口缩放时直接复用，不再读取磁盘。PhotoImage 只能在主线程使用。
+    只有网格真正显示某个格子时才查询，命中、未命中和淘汰次数同时计入 Instrumentation。
+    """
+
+    def __init__(self, capacity=DEFAULT_PHOTO_CACHE_SIZE, instrumentation=None):
+        """
+        :param instrumentation: 记录命中率的 Instrumentation，默认不记录。
+        """
+        self.capacity = capacity
+        self.instrumentation = instrumentation or Instrumentation()
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """命中时返回 PhotoImage 并标记为最近使用，否则返回 None"""
+        photo = self._items.get(key)
+        if photo is None:
+            self.misses += 1
+            self.instrumentation.count("photo_cache.miss")
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        self.instrumentation.count("photo_cache.hit")
+        return photo
+
+    def put(self, key, photo):
+        self._items[key] = photo
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+            self.instrumentation.count("photo_cache.evict")
+
+    def stats(self):
+        """返回命中、未命中次数和当前条目数"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._items)}
@@ -0,0 +1,344 @@
+import collections
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from folder_index import FolderIndex
+
+PLAYLIST_DB = "playlist.db"
+PLAYLIST_MODES = ("sequential", "shuffle", "weighted")
+# 权重范围有限，加权模式的拒绝采样期望尝试次数不超过 MAX_WEIGHT / MIN_WEIGHT
+MIN_WEIGHT = 0.25
+MAX_WEIGHT = 4.0
+RECENT_HALF_LIFE_DAYS = 30  # 加权模式下新图片权重更高，半衰期 30 天
+ACCEPT_BATCH = 32  # 设置了筛选条件时每批一起检查的候选数，条件的查询按批执行
+# 每次抽取最多检查的候选数，满足条件的图片很少（或元数据尚未计算）时不必扫描整个播放列表
+MAX_ACCEPT_PROBES = 4 * ACCEPT_BATCH
+
+
+class Playlist:
+    """
+    自动切换的持久化播放列表，基于 FolderIndex（单个文件夹）或 ImageLibrary（整个图库）构建。
+    - sequential：按文件名顺序，位置记录为上一张的文件名，增删文件不会导致跳过或重复；
+    - shuffle：不放回随机，一轮播完所有图片后再重新洗牌；
+    - weighted：按权重随机（默认新图片权重更高，也可用 set_weight 指定）。
+    文件增删通过 FolderIndex 的变化回调增量更新，每次前进的开销与文件夹大小无关
+    （shuffle 每轮结束时重置一次，均摊仍为常数）。
+    """
+
+    def __init__(self, folder, mode="sequential", start_after=None, index=None, db_path=PLAYLIST_DB, rng=None):
+        """
+        :param folder: 图片文件夹；使用 ImageLibrary 时为 LIBRARY_KEY。
+        :param mode: sequential、shuffle 或 weighted。
+        :param start_after: 没有保存的播放位置时，从该图片之后开始（用于沿用当前壁纸）。
+        :param index: FolderIndex 或 ImageLibrary 实例，默认使用共享的 FolderIndex。
+        :param rng: random.Random 实例，便于复现。
+        """
+        if mode not in PLAYLIST_MODES:
+            raise ValueError(f"Unknown playlist mode: {mode}")
+        self.index = index or FolderIndex.shared()
+        self.folder = self.index.key_for(folder)
+        self.mode = mode
+        self._rng = rng or random.Random()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS playlist_state (
+                folder TEXT PRIMARY KEY,
+                mode TEXT NOT NULL,
+                current TEXT
+            );
+            CREATE TABLE IF NOT EXISTS playlist_played (
+                folder TEXT NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY (folder, name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS playlist_weights (
+                folder TEXT NOT NULL,
+                name TEXT NOT NULL,
+                weight REAL NOT NULL,
+                PRIMARY KEY (folder, name)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+        # 全部图片：列表 + 位置字典，删除时与末尾交换，增删和均匀抽取都是 O(1)
+        self._names = []
+        self._positions = {}
+        self._weights = {}
+        # shuffle 本轮尚未抽到的图片，结构同上
+        self._remaining = []
+        self._remaining_positions = {}
+        # 已抽出、尚未播放的图片（供预取）
+        self._queue = collections.deque()
+        self._cursor = None  # sequential 模式最后抽出的文件名
+        self._accept = None  # 可选的筛选条件，见 set_accept
+        self._load(start_after)
+        self.index.add_listener(self._on_index_changed)
+
+    def _load(self, start_after):
+        try:
+            self.index.refresh(self.folder)
+        except OSError as e:
+            print(f"Error indexing folder {self.folder}: {e}")
+
+        explicit_weights = dict(self._conn.execute(
+            "SELECT name, weight FROM playlist_weights WHERE folder = ?", (self.folder,)
+        ))
+        now = time.time()
+        for path, mtime in self.index.get_page_entries(self.folder, 0, -1):
+            name = self.index.name_of(self.folder, path)
+            self._add_member(name, explicit_weights.get(name, self._recency_weight(mtime, now)))
+
+        row = self._conn.execute(
+            "SELECT mode, current FROM playlist_state WHERE folder = ?", (self.folder,)
+        ).fetchone()
+        if row is None or row[0] != self.mode:
+            # 首次使用或模式改变：重新开始一轮
+            with self._conn:
+                self._conn.execute("DELETE FROM playlist_played WHERE folder = ?", (self.folder,))
+            current = row[1] if row else None
+            if current is None and start_after:
+                name = self.index.name_of(self.folder, start_after)
+                current = name if name in self._positions else None
+            self._save_state(current)
+        else:
+            current = row[1]
+        self._cursor = current
+
+        played = {name for (name,) in self._conn.execute(
+            "SELECT name FROM playlist_played WHERE folder = ?", (self.folder,)
+        )}
+        for name in self._names:
+            if name not in played:
+                self._add_remaining(name)
+
+    @staticmethod
+    def _recency_weight(mtime, now):
+        age_days = max(now - mtime, 0) / 86400
+        return min(MAX_WEIGHT, 1 + (MAX_WEIGHT - 1) * 0.5 ** (age_days / RECENT_HALF_LIFE_DAYS))
+
+    def _save_state(self, current):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO playlist_state (folder, mode, current) VALUES (?, ?, ?)",
+                (self.folder, self.mode, current),
+            )
+
+    def _add_member(self, name, weight):
+        if name in self._positions:
+            return
+        self._positions[name] = len(self._names)
+        self._names.append(name)
+        self._weights[name] = weight
+
+    def _remove_member(self, name):
+        position = self._positions.pop(name, None)
+        if position is None:
+            return
+        last = self._names.pop()
+        if last != name:
+            self._names[position] = last
+            self._positions[last] = position
+        self._weights.pop(name, None)
+
+    def _add_remaining(self, name):
+        if name in self._remaining_positions:
+            return
+        self._remaining_positions[name] = len(self._remaining)
+        self._remaining.append(name)
+
+    def _remove_remaining(self, name):
+        position = self._remaining_positions.pop(name, None)
+        if position is None:
+            return
+        last = self._remaining.pop()
+        if last != name:
+            self._remaining[position] = last
+            self._remaining_positions[last] = position
+
+    def _on_index_changed(self, folder, added, removed):
+        if folder != self.folder:
+            return
+        with self._lock:
+            now = time.time()
+            for path in removed:
+                name = self.index.name_of(self.folder, path)
+                self._remove_member(name)
+                self._remove_remaining(name)
+                if name in self._queue:
+                    self._queue.remove(name)
+            for path in added:
+                name = self.index.name_of(self.folder, path)
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    mtime = now
+                self._add_member(name, self._recency_weight(mtime, now))
+                self._add_remaining(name)
+            if self.mode == "sequential" and self._queue:
+                # 新文件可能排在已抽出的图片之前，按文件名顺序重新抽取
+                self._cursor = self._current_name()
+                self._queue.clear()
+
+    def _current_name(self):
+        row = self._conn.execute("SELECT current FROM playlist_state WHERE folder = ?", (self.folder,)).fetchone()
+        return row[0] if row else None
+
+    def _draw(self):
+        """按当前模式抽出下一张图片的文件名，没有图片时返回 None"""
+        if not self._names:
+            return None
+        last = self._queue[-1] if self._queue else self._cursor
+
+        if self.mode == "sequential":
+            names = self.index.get_names_after(self.folder, self._cursor, 1)
+            if not names:
+                names = self.index.get_names_after(self.folder, None, 1)  # 一轮结束，回到开头
+            if not names:
+                return None
+            self._cursor = names[0]
+            return names[0]
+
+        if self.mode == "shuffle":
+            if not self._remaining:
+                # 一轮结束：已抽出但未播放的图片留在队列里，其余重新进入候选
+                with self._conn:
+                    self._conn.execute("DELETE FROM playlist_played WHERE folder = ?", (self.folder,))
+                for name in self._names:
+                    if name not in self._queue:
+                        self._add_remaining(name)
+                if not self._remaining:
+                    return None
+            name = self._remaining[self._rng.randrange(len(self._remaining))]
+            if name == last and len(self._remaining) > 1:  # 新一轮不要紧接着重复上一张
+                name = self._remaining[self._rng.randrange(len(self._remaining))]
+            self._remove_remaining(name)
+            return name
+
+        # weighted：均匀抽取后按权重接受（拒绝采样），期望尝试次数为常数
+        while True:
+            name = self._names[self._rng.randrange(len(self._names))]
+            if name == last and len(self._names) > 1:
+                continue
+            if self._rng.random() * MAX_WEIGHT < self._weights.get(name, 1.0):
+                return name
+
+    def _draw_accepted(self):
+        """
+        抽出下一张满足筛选条件的图片。候选按 ACCEPT_BATCH 一批抽出，用一次 accept 调用检查，
+        取批内第一张满足条件的；其余图片：shuffle 模式下放回本轮候选，sequential 模式下从选中的图片之后继续。
+        最多检查 MAX_ACCEPT_PROBES 张（且不超过一轮），都不满足时忽略条件，每次抽取的开销与播放列表大小无关。
+        """
+        if self._accept is None:
+            return self._draw()
+        limit = min(len(self._names), MAX_ACCEPT_PROBES)
+        drawn = []
+        try:
+            while len(drawn) < limit:
+                batch = []
+                while len(batch) < ACCEPT_BATCH and len(drawn) + len(batch) < limit:
+                    name = self._draw()
+                    if name is None:
+                        break
+                    batch.append(name)
+                if not batch:
+                    return None
+                drawn.extend(batch)
+                accepted = self._accept([self.index.path_of(self.folder, name) for name in batch])
+                for name in batch:
+                    if self.index.path_of(self.folder, name) in accepted:
+                        drawn.remove(name)
+                        if self.mode == "sequential":
+                            self._cursor = name  # 批内排在它之后的图片下次重新抽取
+                        return name
+        finally:
+            if self.mode == "shuffle":
+                for name in drawn:
+                    if name in self._positions:
+                        self._add_remaining(name)
+        return self._draw()
+
+    def set_accept(self, accept):
+        """
+        设置筛选条件 accept(paths) -> 满足条件的路径集合（按批检查），None 表示不筛选。
+        已抽出但尚未播放的图片放回候选，按新条件重新抽取。
+        """
+        with self._lock:
+            self._accept = accept
+            if self.mode == "shuffle":
+                for name in self._queue:
+                    self._add_remaining(name)
+            elif self.mode == "sequential" and self._queue:
+                self._cursor = self._current_name()
+            self._queue.clear()
+
+    def paths(self):
+        """返回播放列表中全部图片的路径"""
+        with self._lock:
+            return [self.index.path_of(self.folder, name) for name in self._names]
+
+    def sync(self):
+        """按需刷新文件夹索引（目录未变化时只有一次 stat），变化通过回调增量应用"""
+        try:
+            self.index.refresh(self.folder)
+        except OSError as e:
+            print(f"Error indexing folder {self.folder}: {e}")
+
+    def peek(self, count):
+        """返回接下来将要播放的 count 张图片路径（会预先抽出，保证与之后 advance 的结果一致）"""
+        with self._lock:
+            while len(self._queue) < min(count, len(self._names)):
+                name = self._draw_accepted()
+                if name is None:
+                    break
+                self._queue.append(name)
+            return [self.index.path_of(self.folder, name) for name in list(self._queue)[:count]]
+
+    def advance(self):
+        """前进到下一张并持久化播放位置，返回图片路径，文件夹为空时返回 None"""
+        with self._lock:
+            name = self._queue.popleft() if self._queue else self._draw_accepted()
+            if name is None:
+                return None
+            if self.mode != "sequential":
+                self._cursor = name  # 用于避免紧接着重复同一张
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE playlist_state SET current = ? WHERE folder = ?", (name, self.folder)
+                )
+                if self.mode == "shuffle":
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO playlist_played (folder, name) VALUES (?, ?)", (self.folder, name)
+                    )
+            return self.index.path_of(self.folder, name)
+
+    def set_weight(self, path, weight):
+        """设置图片在加权模式下的权重（限制在 MIN_WEIGHT 到 MAX_WEIGHT 之间）"""
+        name = self.index.name_of(self.folder, path)
+        if name is None:
+            return
+        weight = min(max(weight, MIN_WEIGHT), MAX_WEIGHT)
+        with self._lock:
+            if name in self._positions:
+                self._weights[name] = weight
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO playlist_weights (folder, name, weight) VALUES (?, ?, ?)",
+                    (self.folder, name, weight),
+                )
+
+    def __len__(self):
+        return len(self._names)
+
+    def close(self):
+        """取消索引回调并关闭数据库"""
+        self.index.remove_listener(self._on_index_changed)
+        with self._lock:
+            self._conn.close()
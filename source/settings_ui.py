@@ -83,6 +83,7 @@ class SettingsUI:
         self.config["language"] = selected_language
 
         # 保存 OSS 配置
+        previous_oss_config = dict(self.oss_config)
         self.oss_config.update({
             "oss_enabled": self.oss_enabled_var.get(),
             "oss_access_key_id": self.access_key_var.get(),
@@ -95,7 +96,7 @@ class SettingsUI:
         # 保存通用配置
         self.config["auto_switch_enabled"] = self.auto_switch_var.get()
         self.config["auto_switch_interval"] = self.interval_var.get()
-        ConfigManager.save_config(self.config)
+        ConfigManager.schedule_save(self.config)  # 连续的修改合并为一次写入，退出前由 ConfigManager.flush 补写
 
         # 更新自动切换逻辑
         if self.auto_switch_var.get():
@@ -103,6 +104,10 @@ class SettingsUI:
         else:
             self.app_ui_instance.auto_switcher.stop_auto_switch()
 
+        # OSS 配置变化（如刚启用）时按新配置重建 OSS Tab
+        if self.oss_config != previous_oss_config:
+            self.app_ui_instance.reload_oss()
+
         # 更新 UI 文本
         self.app_ui_instance.update_ui_texts()
 
@@ -0,0 +1,96 @@
+import json
+import os
+
+STARTUP_SNAPSHOT_FILE = "startup_snapshot.json"
+STARTUP_SNAPSHOT_SHEET = "startup_snapshot.png"
+SNAPSHOT_VERSION = 1
+SHEET_COLUMNS = 8
+SHEET_CELL = 100  # 与缩略图最大尺寸一致
+SNAPSHOT_MAX_ITEMS = 48  # 只保存首屏附近的条目，本地 Tab 一次加载的窗口远大于首屏
+
+
+class StartupSnapshot:
+    """
+    本地 Tab 第一页的快照：条目列表（JSON）和拼成一张 PNG 的缩略图。
+    启动时 Tk 直接读取 PNG，不需要 PIL、SQLite 和缩略图存储，窗口出现时就能显示上次的第一页；
+    缩略图同时按 cache_key 放进内存缓存，真实数据到达后未变化的条目不会闪回占位图。
+    """
+
+    @staticmethod
+    def _normalize(folder):
+        return os.path.normpath(os.path.abspath(folder))
+
+    @staticmethod
+    def save(folder, criteria, entries, path=STARTUP_SNAPSHOT_FILE, sheet_path=STARTUP_SNAPSHOT_SHEET):
+        """
+        保存快照（退出时调用）。
+        :param entries: 第一页的 [(图片路径, mtime, PIL 缩略图或 None)]。
+        """
+        from PIL import Image
+
+        items = []
+        images = [(index, image) for index, (_, _, image) in enumerate(entries) if image is not None]
+        rows = -(-len(images) // SHEET_COLUMNS)
+        sheet = Image.new("RGBA", (SHEET_COLUMNS * SHEET_CELL, max(rows, 1) * SHEET_CELL), (0, 0, 0, 0))
+        boxes = {}
+        for slot, (index, image) in enumerate(images):
+            x, y = (slot % SHEET_COLUMNS) * SHEET_CELL, (slot // SHEET_COLUMNS) * SHEET_CELL
+            sheet.paste(image.convert("RGBA"), (x, y))
+            boxes[index] = [x, y, min(image.width, SHEET_CELL), min(image.height, SHEET_CELL)]
+        for index, (image_path, mtime, _) in enumerate(entries):
+            items.append({"path": image_path, "mtime": mtime, "box": boxes.get(index)})
+
+        sheet.save(sheet_path + ".tmp", "PNG", compress_level=1)
+        os.replace(sheet_path + ".tmp", sheet_path)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump({
+                "version": SNAPSHOT_VERSION,
+                "folder": StartupSnapshot._normalize(folder),
+                "criteria": criteria,
+                "items": items,
+            }, file, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def load(folder, criteria, path=STARTUP_SNAPSHOT_FILE):
+        """
+        读取与当前文件夹和筛选条件一致的快照。
+        :return: [{"path", "mtime", "box"}]，没有或不匹配时返回 None。
+        """
+        if not folder or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Error loading startup snapshot: {e}")
+            return None
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("folder") != StartupSnapshot._normalize(folder) \
+                or snapshot.get("criteria") != criteria:
+            return None
+        return snapshot["items"]
+
+    @staticmethod
+    def load_photos(master, items, sheet_path=STARTUP_SNAPSHOT_SHEET):
+        """
+        从 PNG 中切出每个条目的 PhotoImage（必须在主线程调用，只使用 Tk 自带的 PNG 支持）。
+        :return: 与 items 对应的 PhotoImage 列表，没有缩略图的条目为 None。
+        """
+        from tkinter import PhotoImage, TclError
+
+        try:
+            sheet = PhotoImage(master=master, file=sheet_path)
+        except TclError as e:
+            print(f"Error loading startup snapshot thumbnails: {e}")
+            return [None] * len(items)
+        photos = []
+        for item in items:
+            box = item.get("box")
+            if not box:
+                photos.append(None)
+                continue
+            x, y, width, height = box
+            photo = PhotoImage(master=master, width=width, height=height)
+            photo.tk.call(photo, "copy", sheet, "-from", x, y, x + width, y + height)
+            photos.append(photo)
+        return photos
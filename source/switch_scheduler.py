@@ -0,0 +1,242 @@
+import collections
+import datetime
+import math
+import threading
+import time
+
+from instrumentation import Instrumentation
+
+MAX_WAIT = 5.0  # 秒，分段等待以便及时发现休眠唤醒和系统时间调整
+CLOCK_JUMP_THRESHOLD = 2.0  # 秒，墙上时间比单调时钟多走超过该值视为休眠或时间跳变
+MAX_MISSED_TICKS = 1000
+MISSED_POLICIES = ("skip", "catch_up")  # skip：错过的多次只补一次；catch_up：逐次补执行
+TICK_HISTORY = 200
+
+
+class IntervalSchedule:
+    """固定间隔，截止时间以单调时钟为网格，不受每次切换耗时影响"""
+    clock = "monotonic"
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+        self.anchor = None
+
+    def next_after(self, t):
+        if self.anchor is None:
+            self.anchor = t
+        index = math.floor((t - self.anchor) / self.seconds) + 1
+        while self.anchor + index * self.seconds <= t:  # 浮点误差可能使结果落在 t 上
+            index += 1
+        return self.anchor + index * self.seconds
+
+
+class DailySchedule:
+    """每天的固定时刻，如 ["08:00", "12:30", "20:00"]，按本地时间计算"""
+    clock = "wall"
+
+    def __init__(self, times):
+        parsed = set()
+        for value in times:
+            hour, minute = (int(part) for part in str(value).split(":"))
+            if not (0 <= hour < 24 and 0 <= minute < 60):
+                raise ValueError(f"Invalid time of day: {value}")
+            parsed.add(datetime.time(hour, minute))
+        if not parsed:
+            raise ValueError("No time of day given")
+        self.times = sorted(parsed)
+
+    def next_after(self, t):
+        current = datetime.datetime.fromtimestamp(t)
+        for day_offset in range(2):
+            day = current.date() + datetime.timedelta(days=day_offset)
+            for time_of_day in self.times:
+                candidate = datetime.datetime.combine(day, time_of_day).timestamp()
+                if candidate > t:
+                    return candidate
+        raise AssertionError("unreachable")
+
+
+class CronSchedule:
+    """
+    五段式 cron 表达式：分 时 日 月 周（0 或 7 为周日），
+    支持 *、a-b、逗号列表和 /步长，日和周同时限定时满足其一即可（与 cron 一致）。
+    """
+    clock = "wall"
+    FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression}")
+        self.expression = expression
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}
+        self.days_restricted = fields[2] != "*"
+        self.weekdays_restricted = fields[4] != "*"
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(","):
+            value_range, _, step = part.partition("/")
+            step = int(step) if step else 1
+            if value_range == "*":
+                start, end = low, high
+            elif "-" in value_range:
+                start, end = (int(value) for value in value_range.split("-"))
+            else:
+                start = int(value_range)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end or step <= 0:
+                raise ValueError(f"Invalid cron field: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.isoweekday() % 7) in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, t):
+        moment = datetime.datetime.fromtimestamp(t).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = moment + datetime.timedelta(days=366 * 5)
+        # 不匹配时按月、日、小时整体跳过，而不是逐分钟尝试
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+
+def create_schedule(config, interval):
+    """
+    按配置创建切换计划：auto_switch_cron 优先，其次 auto_switch_times，否则按 interval 秒固定间隔。
+    """
+    if config.get("auto_switch_cron"):
+        return CronSchedule(config["auto_switch_cron"])
+    if config.get("auto_switch_times"):
+        return DailySchedule(config["auto_switch_times"])
+    return IntervalSchedule(interval)
+
+
+class SwitchScheduler:
+    """
+    基于截止时间的切换调度器，在独立线程中执行回调。
+    下一次的截止时间由计划直接算出，与回调耗时无关，因此不会累积漂移；
+    分段等待时比较墙上时间和单调时钟，发现休眠唤醒（或系统时间跳变）后按 missed_policy 补执行或跳过。
+    每次触发记录实际延迟（jitter）。
+    """
+
+    def __init__(self, schedule, callback, missed_policy="skip", name="switch-scheduler", on_start=None):
+        """
+        :param schedule: IntervalSchedule、DailySchedule 或 CronSchedule。
+        :param callback: 到期时在调度线程中调用的函数。
+        :param missed_policy: skip 或 catch_up。
+        :param on_start: 调度线程启动后、开始计时前调用的函数，用于把耗时的准备工作移出主线程。
+        """
+        if missed_policy not in MISSED_POLICIES:
+            raise ValueError(f"Unknown missed policy: {missed_policy}")
+        self.schedule = schedule
+        self.callback = callback
+        self.missed_policy = missed_policy
+        self.name = name
+        self.on_start = on_start
+        self.ticks = collections.deque(maxlen=TICK_HISTORY)  # (计划时间, 延迟秒数, 错过次数, 回调耗时秒数)
+        self._suspended = 0.0  # 单调时钟未计入的休眠时长
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _now(self):
+        if self.schedule.clock == "wall":
+            return time.time()
+        return time.monotonic() + self._suspended
+
+    def start(self):
+        """启动调度线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止调度线程，正在执行的回调会执行完"""
+        self._stop_event.set()
+
+    def _detect_jump(self, last_wall, last_monotonic):
+        # Linux 的单调时钟在休眠期间停止，墙上时间照常前进
+        wall, monotonic = time.time(), time.monotonic()
+        jump = (wall - last_wall) - (monotonic - last_monotonic)
+        if jump > CLOCK_JUMP_THRESHOLD:
+            self._suspended += jump
+            print(f"{self.name}: detected {jump:.1f} s suspend or clock jump")
+        return wall, monotonic
+
+    def _run(self):
+        if self.on_start is not None:
+            try:
+                self.on_start()
+            except Exception as e:
+                print(f"Error in {self.name} start: {e}")
+        last_wall, last_monotonic = time.time(), time.monotonic()
+        next_run = self.schedule.next_after(self._now())
+        while not self._stop_event.is_set():
+            last_wall, last_monotonic = self._detect_jump(last_wall, last_monotonic)
+            now = self._now()
+            if now < next_run:
+                self._stop_event.wait(min(next_run - now, MAX_WAIT))
+                continue
+
+            due = next_run
+            missed = 0
+            next_run = self.schedule.next_after(due)
+            while next_run <= now and missed < MAX_MISSED_TICKS:
+                missed += 1
+                next_run = self.schedule.next_after(next_run)
+            if next_run <= now:
+                next_run = self.schedule.next_after(now)
+
+            jitter = now - due
+            runs = 1 + missed if self.missed_policy == "catch_up" else 1
+            start = time.perf_counter()
+            for _ in range(runs):
+                if self._stop_event.is_set():
+                    break
+                try:
+                    self.callback()
+                except Exception as e:
+                    print(f"Error in {self.name} callback: {e}")
+            duration = time.perf_counter() - start
+            self.ticks.append((due, jitter, missed, duration))
+            # 延迟和错过次数计入 Instrumentation，开启追踪时可在状态栏或 trace 中查看
+            instrumentation = Instrumentation.shared()
+            instrumentation.record(
+                f"{self.name}.tick", "scheduler", start, duration, {"jitter_ms": round(jitter * 1000, 1), "missed": missed}
+            )
+            if missed:
+                instrumentation.count(f"{self.name}.missed", missed)
+
+    def stats(self):
+        """返回触发次数、累计错过次数和延迟（毫秒）的平均值与最大值"""
+        ticks = list(self.ticks)
+        if not ticks:
+            return {"ticks": 0, "missed": 0, "avg_jitter_ms": 0.0, "max_jitter_ms": 0.0}
+        jitters = [jitter for _, jitter, _, _ in ticks]
+        return {
+            "ticks": len(ticks),
+            "missed": sum(missed for _, _, missed, _ in ticks),
+            "avg_jitter_ms": sum(jitters) * 1000 / len(jitters),
+            "max_jitter_ms": max(jitters) * 1000,
+        }
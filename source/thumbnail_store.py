@@ -0,0 +1,328 @@
+import contextlib
+import io
+import mmap
+import os
+import sqlite3
+import threading
+import time
+
+from PIL import Image
+
+THUMBNAIL_DIR = "thumbnails"
+PACK_FILE = "thumbnails.pack"
+INDEX_FILE = "thumbnails.idx"
+LOCK_FILE = "thumbnails.lock"
+JPEG_QUALITY = 90
+# 死数据超过该比例（且超过 COMPACT_MIN_BYTES）时才值得压缩
+COMPACT_DEAD_RATIO = 0.5
+COMPACT_MIN_BYTES = 4 * 1024 * 1024
+
+
+class _FileLock:
+    """跨进程的排他文件锁（界面和 cli warm 可能同时写同一个存储）"""
+
+    def __init__(self, path):
+        self._file = open(path, "a+b")
+
+    def acquire(self):
+        if os.name == "nt":
+            import msvcrt
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    return
+                except OSError:  # LK_LOCK 重试约 10 秒后放弃，继续等待
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+
+    def release(self):
+        if os.name == "nt":
+            import msvcrt
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+
+class ThumbnailStore:
+    """
+    打包的缩略图存储。
+    所有缩略图以 JPEG（带透明通道时为 PNG）编码后追加写入同一个 blob 文件，
+    SQLite 索引记录每个 key 的偏移和长度，读取时通过 mmap 直接切片。
+    覆盖或删除只修改索引，旧数据由 compact 统一回收。
+    追加和压缩持有跨进程文件锁，其他进程压缩后代数变化，读写前会切换到新的 blob 文件。
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, directory=THUMBNAIL_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._file_lock = _FileLock(os.path.join(directory, LOCK_FILE))
+        self._lock_depth = 0
+        self._conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, offset INTEGER NOT NULL, length INTEGER NOT NULL,"
+            " last_access REAL NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(entries)")]
+        if "last_access" not in columns:
+            self._conn.execute("ALTER TABLE entries ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        self.generation = row[0] if row else 0
+        self.pack_path = self._pack_path(self.generation)
+        self._pack = open(self.pack_path, "a+b")
+        self._map = None
+        self._accessed = {}  # 读取时间先记在内存里，淘汰前再批量写入索引
+
+    def _pack_path(self, generation):
+        name = PACK_FILE if generation == 0 else PACK_FILE.replace(".pack", f".{generation}.pack")
+        return os.path.join(self.directory, name)
+
+    @classmethod
+    def shared(cls):
+        """获取进程内共享的存储实例"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """持有进程内锁和跨进程文件锁，可重入；进入时同步其他进程压缩后的代数"""
+        with self._lock:
+            if self._lock_depth == 0:
+                self._file_lock.acquire()
+            self._lock_depth += 1
+            try:
+                if self._lock_depth == 1:
+                    row = self._conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+                    self._switch_generation(row[0] if row else 0)
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    self._file_lock.release()
+
+    def _switch_generation(self, generation):
+        # 另一个进程压缩后，偏移指向新一代 blob 文件
+        if generation == self.generation:
+            return
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._pack.close()
+        self.generation, self.pack_path = generation, self._pack_path(generation)
+        self._pack = open(self.pack_path, "a+b")
+
+    def _read_bytes(self, offset, length):
+        # mmap 长度固定，追加写入后需要重新映射
+        if self._map is None or offset + length > len(self._map):
+            if self._map is not None:
+                self._map.close()
+            self._pack.flush()
+            self._map = mmap.mmap(self._pack.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset:offset + length]
+
+    def contains(self, key):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def get(self, key):
+        """读取缩略图，返回 PIL Image，不存在时返回 None"""
+        with self._lock:
+            # 偏移和代数在同一条语句中读取，保证两者一致
+            row = self._conn.execute(
+                "SELECT offset, length, (SELECT value FROM meta WHERE name = 'generation') FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            offset, length, generation = row
+            self._switch_generation(generation or 0)
+            data = self._read_bytes(offset, length)
+            self._accessed[key] = time.time()
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                img.load()
+                return img
+        except Exception as e:
+            print(f"Error reading thumbnail {key}: {e}")
+            self.delete(key)
+            return None
+
+    @staticmethod
+    def encode(image):
+        """把缩略图编码为存储格式（JPEG，带透明通道时为 PNG），可在其他进程中调用"""
+        buffer = io.BytesIO()
+        if image.mode in ("RGBA", "LA", "P"):
+            image.save(buffer, "PNG")
+        else:
+            image.convert("RGB").save(buffer, "JPEG", quality=JPEG_QUALITY)
+        return buffer.getvalue()
+
+    def put(self, key, image):
+        """编码并追加写入缩略图"""
+        self.put_bytes(key, self.encode(image))
+
+    def put_bytes(self, key, data):
+        """直接追加写入已编码的图片数据"""
+        with self._exclusive():
+            self._pack.seek(0, os.SEEK_END)
+            offset = self._pack.tell()
+            self._pack.write(data)
+            self._pack.flush()
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, offset, length, last_access) VALUES (?, ?, ?, ?)",
+                    (key, offset, len(data), time.time()),
+                )
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def flush_access_times(self):
+        """把内存中的读取时间写入索引"""
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE entries SET last_access = ? WHERE key = ?",
+                    [(timestamp, key) for key, timestamp in accessed.items()],
+                )
+
+    def evict_lru(self, limit_bytes, protected_keys=()):
+        """
+        按最近最少使用淘汰条目，直到有效数据不超过 limit_bytes，然后按需压缩。
+        :param limit_bytes: 有效数据的字节上限。
+        :param protected_keys: 不允许淘汰的 key。
+        :return: (淘汰数量, 释放字节数)。
+        """
+        protected_keys = set(protected_keys)
+        self.flush_access_times()
+        with self._lock:
+            _, live_bytes, _ = self.stats()
+            evicted = []
+            freed = 0
+            rows = self._conn.execute("SELECT key, length FROM entries ORDER BY last_access")
+            for key, length in rows:
+                if live_bytes - freed <= limit_bytes:
+                    break
+                if key in protected_keys:
+                    continue
+                evicted.append(key)
+                freed += length
+            with self._conn:
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in evicted])
+            evicted_keys = set(evicted)
+            self._accessed = {key: t for key, t in self._accessed.items() if key not in evicted_keys}
+        if evicted:
+            self.compact_if_needed()
+        return len(evicted), freed
+
+    def stats(self):
+        """返回 (条目数, 有效字节数, blob 文件总字节数)"""
+        with self._lock:
+            count, live_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM entries").fetchone()
+            self._pack.seek(0, os.SEEK_END)
+            return count, live_bytes, self._pack.tell()
+
+    def compact(self):
+        """
+        将有效数据重写到新一代 blob 文件，回收被覆盖和删除的空间。
+        新偏移和代数在同一个事务中提交，中途崩溃时旧文件和旧索引仍然一致。
+        """
+        with self._exclusive():
+            new_generation = self.generation + 1
+            new_path = self._pack_path(new_generation)
+            rows = self._conn.execute("SELECT key, offset, length FROM entries ORDER BY offset").fetchall()
+            new_offsets = []
+            with open(new_path, "wb") as new_pack:
+                for key, offset, length in rows:
+                    new_offsets.append((new_pack.tell(), key))
+                    new_pack.write(self._read_bytes(offset, length))
+                new_pack.flush()
+                os.fsync(new_pack.fileno())
+
+            with self._conn:
+                self._conn.executemany("UPDATE entries SET offset = ? WHERE key = ?", new_offsets)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('generation', ?)", (new_generation,)
+                )
+
+            # Windows 下被映射或打开的文件无法删除，先全部关闭
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._pack.close()
+            old_path = self.pack_path
+            self.generation, self.pack_path = new_generation, new_path
+            self._pack = open(self.pack_path, "a+b")
+            try:
+                os.remove(old_path)
+            except OSError as e:
+                print(f"Error removing old thumbnail pack {old_path}: {e}")
+
+    def compact_if_needed(self):
+        """死数据占比过高时压缩，返回是否执行了压缩"""
+        _, live_bytes, total_bytes = self.stats()
+        dead_bytes = total_bytes - live_bytes
+        if dead_bytes > COMPACT_MIN_BYTES and dead_bytes > total_bytes * COMPACT_DEAD_RATIO:
+            self.compact()
+            return True
+        return False
+
+    def migrate_png_files(self):
+        """
+        导入旧版本按文件缓存的 PNG 缩略图并删除原文件。
+        本地缩略图文件名为 {key}_thumbnail.png，key 与新存储一致，直接导入；
+        OSS 缩略图 {key}.png 的 key 不含 ETag，新版本永远不会命中，直接删除。
+        :return: 导入的数量。
+        """
+        imported = 0
+        with os.scandir(self.directory) as entries:
+            png_files = [entry.path for entry in entries if entry.name.endswith(".png") and entry.is_file()]
+        for path in png_files:
+            key = os.path.basename(path)[:-len(".png")]
+            try:
+                if not key.endswith("_thumbnail"):
+                    os.remove(path)
+                    continue
+                key = key[:-len("_thumbnail")]
+                if not self.contains(key):
+                    with open(path, "rb") as file:
+                        self.put_bytes(key, file.read())
+                    imported += 1
+                os.remove(path)
+            except OSError as e:
+                print(f"Error migrating thumbnail {path}: {e}")
+        return imported
+
+    def _remove_stale_packs(self):
+        # 压缩过程中崩溃可能留下非当前代的 blob 文件；持锁检查，避免删掉其他进程正在写的新一代文件
+        with self._exclusive(), os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("thumbnails") and entry.name.endswith(".pack") and entry.path != self.pack_path:
+                    os.remove(entry.path)
+
+    def maintain(self):
+        """启动时的后台维护：迁移旧缩略图并按需压缩"""
+        try:
+            self._remove_stale_packs()
+            imported = self.migrate_png_files()
+            if imported:
+                print(f"Migrated {imported} thumbnails into {self.pack_path}")
+            if self.compact_if_needed():
+                print(f"Compacted {self.pack_path}")
+        except Exception as e:
+            print(f"Error maintaining thumbnail store: {e}")
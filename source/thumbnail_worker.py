@@ -0,0 +1,68 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ThumbnailWorker:
+    """
+    后台缩略图线程池。
+    解码和缩放在工作线程完成，结果通过 UIDispatcher 回到主线程；
+    每次提交新一页都会取消上一页尚未完成的任务。
+    """
+
+    def __init__(self, dispatcher, loader, max_workers=None):
+        """
+        :param dispatcher: UIDispatcher 实例，用于把结果交回主线程。
+        :param loader: 在工作线程中执行的加载函数，参数为图片路径，返回 PIL Image 或 None。
+        :param max_workers: 线程数，默认按 CPU 数量决定。
+        """
+        self.dispatcher = dispatcher
+        self.loader = loader
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(4, os.cpu_count() or 1),
+            thread_name_prefix="thumbnail",
+        )
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._futures = []
+
+    def submit(self, paths, on_ready):
+        """
+        取消上一批任务并提交新的一批。
+        :param paths: 需要生成缩略图的图片路径列表。
+        :param on_ready: 主线程回调 on_ready(path, image)。
+        """
+        with self._lock:
+            self._cancel_locked()
+            generation = self._generation
+            self._futures = [
+                self._executor.submit(self._run, generation, path, on_ready) for path in paths
+            ]
+
+    def cancel(self):
+        """取消所有尚未完成的任务"""
+        with self._lock:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        self._generation += 1
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+
+    def _run(self, generation, path, on_ready):
+        if generation != self._generation:
+            return
+        image = self.loader(path)
+        if image is not None and generation == self._generation:
+            self.dispatcher.call_soon(self._deliver, generation, path, image, on_ready)
+
+    def _deliver(self, generation, path, image, on_ready):
+        # 结果回到主线程时页面可能已切换，过期结果直接丢弃
+        if generation == self._generation:
+            on_ready(path, image)
+
+    def shutdown(self):
+        """取消任务并关闭线程池"""
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,15 +1,32 @@
 ### ui_components.py
-from tkinter import Frame, Label, Button, Canvas, filedialog, IntVar, StringVar, ttk
+from tkinter import Frame, Label, Button, Canvas, PhotoImage, Scrollbar, filedialog, IntVar, StringVar, ttk
 from language_manager import LanguageManager
 from wallpaper_manager import WallpaperManager
+from wallpaper_renderer import WallpaperRenderer
 from config_manager import ConfigManager
+from image_manager import ImageManager, THUMBNAIL_SIZE
+from ui_dispatcher import UIDispatcher
+from thumbnail_worker import ThumbnailWorker
+from thumbnail_store import ThumbnailStore
+from cache_manager import CacheManager
+from photo_cache import PhotoImageCache
+from folder_watcher import FolderWatcher
+from image_metadata import MetadataIndex
+from instrumentation import Instrumentation, DEFAULT_TRACE_FILE
+from startup_snapshot import StartupSnapshot, SNAPSHOT_MAX_ITEMS
+import threading
 import os
-from cloud_services.aliyun_oss import AliyunOSS
 from cloud_services.oss_config import OSSConfig
 from settings_ui import SettingsUI  # 导入拆分后的设置界面逻辑
 from auto_switcher import AutoSwitcher
-from UI.oss_ui import OSSUIHandler
 from UI.local_image_manager import LocalImageManager
+from UI.image_grid import ImageGrid
+from UI.layout_scheduler import LayoutScheduler
+
+# 窗口没有映射（如最小化启动）时，最多等待这么久再执行启动后的工作
+STARTUP_FALLBACK_MS = 1000
+# 后台元数据计算完成后，合并这段时间内的更新再刷新本地图片页
+METADATA_REFRESH_MS = 500
 
 class AppUI:
     def __init__(self, root, config, current_language):
@@ -28,37 +45,97 @@ class AppUI:
         self.top_buttons = []  # 初始化 top_buttons
         self.pagination_buttons = []  # 初始化 pagination_buttons
         self.page_label = None  # 初始化 page_label
-        self.scrollable_frame = None  # 初始化 scrollable_frame
+        self.local_grid = None  # 本地壁纸网格
+        self.oss_grid = None  # OSS 壁纸网格
+        self.oss_loaded = False  # OSS Tab 首次选中时才加载
         self.auto_switch_task = None  # 初始化自动切换任务变量
+        # 热点路径计时，开启时在状态栏上方显示读数（Ctrl+Shift+I 开关，Ctrl+Shift+T 导出 Chrome trace）
+        self.instrumentation = Instrumentation.shared()
+        self.instrumentation_var = StringVar(root, value="")
+        self.instrumentation_label = None
+        # 已解码缩略图的内存缓存，本地和 OSS 两个 Tab 共用
+        self.photo_cache = PhotoImageCache(config.get("photo_cache_size", 512), instrumentation=self.instrumentation)
+        # 后台缩略图线程池，结果通过 dispatcher 回到主线程
+        self.dispatcher = UIDispatcher(root)
+        self.thumbnail_worker = ThumbnailWorker(self.dispatcher, ImageManager.load_thumbnail_image)
+        self.placeholder_image = PhotoImage(master=root, width=100, height=100)
+        self.placeholder_image.put("#e0e0e0", to=(0, 0, 100, 100))
+        # 缓存容量管理，保护当前壁纸和即将切换的壁纸
+        self.cache_manager = CacheManager(
+            config=self.config,
+            dispatcher=self.dispatcher,
+            status_var=self.status_var,
+            protected_paths=self._protected_cache_paths,
+        )
         self.auto_switcher = AutoSwitcher(
             root=self.root,
             config=self.config,
             folder_path_var=self.folder_path,
-            status_var=self.status_var
+            status_var=self.status_var,
+            dispatcher=self.dispatcher,
         )
-        auto_switch_enabled = self.config.get("auto_switch_enabled", 0)
-        auto_switch_interval = self.config.get("auto_switch_interval", 5)
-
-        if auto_switch_enabled and auto_switch_interval >= 5:
-            self.auto_switcher.start_auto_switch(auto_switch_interval)
+        # OSS 客户端和 OSS Tab 在第一次选中该 Tab 时才创建（oss2 导入就要数百毫秒）
         self.oss_config = OSSConfig.load_config()  # 加载 OSS 配置
         self.oss = None
         self.oss_ui_handler = None
-        if self.oss_config["oss_enabled"]:
-            self.oss = AliyunOSS(
-                self.oss_config["oss_access_key_id"],
-                self.oss_config["oss_access_key_secret"],
-                self.oss_config["oss_endpoint"],
-                self.oss_config["oss_bucket_name"],
-            )
-            # 初始化 OSSUIHandler
-            self.oss_ui_handler = OSSUIHandler(root, self.oss, self.status_var, current_language, self)
-
-        # # 如果 OSS 配置不完整，提示但不影响程序启动
-        # if not self.oss.enabled:
-        #     print("OSS is not configured or disabled. Skipping OSS features.")
-        self.local_image_manager = LocalImageManager(current_language,images_per_page=24)
+        self.oss_message_label = None
+        self.folder_watcher = None
+        self._metadata_refresh_id = None
+        self.local_image_manager = LocalImageManager(
+            current_language, criteria=self._local_criteria()
+        )
         self.setup_ui()
+        # 窗口先显示出来（有快照时带着上次的第一页），映射之后再加载真实数据、启动后台任务
+        self._startup_pending = True
+        self.root.bind("<Map>", self._on_map, add="+")
+        self.root.after(STARTUP_FALLBACK_MS, self._finish_startup)
+
+    def _on_map(self, event):
+        if event.widget is self.root and self._startup_pending:
+            # 先让窗口完成首次绘制
+            self.root.after_idle(lambda: self.root.after(0, self._finish_startup))
+
+    def _finish_startup(self):
+        """窗口显示后执行的启动工作：第一页的真实数据、后台维护任务、自动切换和文件夹监视"""
+        if not self._startup_pending:
+            return
+        self._startup_pending = False
+        with self.instrumentation.span("startup.finish", "startup"):
+            self.display_images()
+            # 后台导入旧版 PNG 缩略图并按需压缩缩略图存储
+            threading.Thread(target=ThumbnailStore.shared().maintain, daemon=True).start()
+            self.cache_manager.start()
+            if self.local_image_manager.criteria:
+                # 筛选结果随后台元数据计算逐步增加
+                ImageManager.add_metadata_listener(
+                    lambda paths: self.dispatcher.call_soon(self._on_local_metadata_updated, paths)
+                )
+
+            auto_switch_enabled = self.config.get("auto_switch_enabled", 0)
+            auto_switch_interval = self.config.get("auto_switch_interval", 5)
+            if auto_switch_enabled and auto_switch_interval >= 5:
+                self.auto_switcher.start_auto_switch(auto_switch_interval)
+
+            # 监视壁纸文件夹，新增或删除的文件增量写入索引并刷新本地 Tab
+            if self.config.get("watch_folder", True):
+                self.folder_watcher = FolderWatcher(
+                    on_change=lambda folder, added, removed: self.dispatcher.call_soon(
+                        self._on_local_folder_changed, folder, added, removed
+                    )
+                )
+                self.folder_watcher.watch(self.folder_path.get())
+
+    def _local_criteria(self):
+        """本地 Tab 的元数据筛选和排序条件（配置 local_filter），无效时忽略"""
+        criteria = self.config.get("local_filter")
+        if not criteria:
+            return None
+        try:
+            MetadataIndex.validate(criteria)
+        except ValueError as e:
+            print(f"Invalid local_filter {criteria}: {e}")
+            return None
+        return criteria
 
     def setup_top_frame(self):
         """设置顶部按钮栏"""
@@ -88,23 +165,66 @@ class AppUI:
     def setup_status_bar(self):
         """设置底部状态栏"""
         Label(self.root, textvariable=self.status_var, relief="sunken", anchor="w").pack(side="bottom", fill="x")
+        self.root.bind("<Control-I>", self.toggle_instrumentation)  # Ctrl+Shift+I
+        self.root.bind("<Control-T>", self.export_trace)  # Ctrl+Shift+T
+        if self.instrumentation.enabled:
+            self._show_instrumentation()
+
+    def _show_instrumentation(self):
+        """在状态栏上方显示计时读数，每秒刷新"""
+        if self.instrumentation_label is None:
+            self.instrumentation_label = Label(
+                self.root, textvariable=self.instrumentation_var, anchor="w", fg="#555555", font=("Consolas", 8)
+            )
+            self.instrumentation_label.pack(side="bottom", fill="x")
+            self._refresh_instrumentation()
+
+    def _refresh_instrumentation(self):
+        if not self.instrumentation.enabled:
+            self.instrumentation_label.pack_forget()
+            self.instrumentation_label = None
+            return
+        self.instrumentation_var.set(self.instrumentation.summary())
+        self.root.after(1000, self._refresh_instrumentation)
+
+    def toggle_instrumentation(self, event=None):
+        """开关热点路径计时和读数"""
+        self.instrumentation.set_enabled(not self.instrumentation.enabled)
+        if self.instrumentation.enabled:
+            self._show_instrumentation()
+
+    def export_trace(self, event=None):
+        """把记录的 span 和计数器导出为 Chrome trace JSON"""
+        path = os.path.abspath(self.config.get("instrumentation_trace_file", DEFAULT_TRACE_FILE))
+        try:
+            events = self.instrumentation.export_chrome_trace(path)
+        except OSError as e:
+            print(f"Error writing trace {path}: {e}")
+            self.status_var.set(LanguageManager.get_text(self.current_language.get(), "trace_export_failed", error=e))
+            return
+        self.status_var.set(
+            LanguageManager.get_text(self.current_language.get(), "trace_exported", path=path, events=events)
+        )
 
     def setup_oss_tab(self):
         """设置 OSS 壁纸 Tab 的内容"""
-        # 初始化画布
+        # 添加分页按钮，与本地壁纸布局一致
+        pagination_frame = Frame(self.oss_tab)
+        pagination_frame.pack(side="bottom", fill="x", pady=10)
+
+        # 初始化画布和虚拟化网格，窗口调整时网格自行重新排列，不重新加载数据
+        oss_scrollbar = Scrollbar(self.oss_tab, orient="vertical")
+        oss_scrollbar.pack(side="right", fill="y", pady=5)
         self.oss_canvas = Canvas(self.oss_tab)
         self.oss_canvas.pack(fill="both", expand=True, padx=10, pady=5)
+        self.oss_grid = ImageGrid(
+            self.oss_canvas, self.placeholder_image, oss_scrollbar, on_visible=self.oss_ui_handler.on_visible_items,
+            instrumentation=self.instrumentation, photo_cache=self.photo_cache
+        )
+        self.oss_layout = LayoutScheduler(
+            self.oss_canvas, self.oss_grid, name="oss", instrumentation=self.instrumentation
+        )
 
-        self.oss_scrollable_frame = Frame(self.oss_canvas)
-        self.oss_canvas.create_window((0, 0), window=self.oss_scrollable_frame, anchor="nw")
-
-        # 绑定窗口调整事件
-        self.oss_canvas.bind("<Configure>", lambda event: self.oss_ui_handler.display_oss_images())
-
-        self.oss_ui_handler.oss_scrollable_frame = self.oss_scrollable_frame
-        # 添加分页按钮，与本地壁纸布局一致
-        pagination_frame = Frame(self.oss_tab)
-        pagination_frame.pack(fill="x", pady=10)
         self.oss_pagination_ui, self.oss_page_label = self.oss_ui_handler.get_pagination_ui(
             pagination_frame, update_callback=self.oss_ui_handler.display_oss_images
         )
@@ -113,18 +233,24 @@ class AppUI:
         """设置本地壁纸 Tab 的内容"""
         self.local_image_manager.set_folder(self.folder_path.get())
 
-        # 初始化画布
+        # 添加分页按钮
+        pagination_frame = Frame(self.local_tab)
+        pagination_frame.pack(side="bottom", fill="x", pady=10)
+
+        # 初始化画布和虚拟化网格，窗口调整时网格自行重新排列，不重新加载数据
+        local_scrollbar = Scrollbar(self.local_tab, orient="vertical")
+        local_scrollbar.pack(side="right", fill="y", pady=5)
         self.local_canvas = Canvas(self.local_tab)
         self.local_canvas.pack(fill="both", expand=True, padx=10, pady=5)
-        self.local_scrollable_frame = Frame(self.local_canvas)
-        self.local_canvas.create_window((0, 0), window=self.local_scrollable_frame, anchor="nw")
-
-        # 绑定窗口调整事件
-        self.local_canvas.bind("<Configure>", lambda event: self.display_local_images())
+        self.local_grid = ImageGrid(
+            self.local_canvas, self.placeholder_image, local_scrollbar, on_visible=self._on_local_visible,
+            instrumentation=self.instrumentation, photo_cache=self.photo_cache
+        )
+        # 合并窗口拖动时的大量 <Configure> 事件，列数不变时不重新排列
+        self.local_layout = LayoutScheduler(
+            self.local_canvas, self.local_grid, name="local", instrumentation=self.instrumentation
+        )
 
-        # 添加分页按钮
-        pagination_frame = Frame(self.local_tab)
-        pagination_frame.pack(fill="x", pady=10)
         self.pagination_ui, self.local_page_label = self.local_image_manager.get_pagination_ui(
             pagination_frame, update_callback=self.display_local_images
         )
@@ -142,9 +268,63 @@ class AppUI:
         self.oss_tab = Frame(self.notebook)
         self.notebook.add(self.oss_tab, text=LanguageManager.get_text(self.current_language.get(), "oss_wallpapers"))
 
-        # 分别初始化两个 Tab 的内容
+        # 本地 Tab 立即初始化，OSS Tab 的内容在第一次选中时创建
         self.setup_local_tab()
-        self.setup_oss_tab()
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+
+    def _on_tab_changed(self, event=None):
+        """OSS Tab 第一次被选中时创建 OSS 客户端和界面，并加载 OSS 壁纸"""
+        if self.notebook.index(self.notebook.select()) == 1 and not self.oss_loaded:
+            self.oss_loaded = True
+            if self._setup_oss():
+                self.oss_ui_handler.display_oss_images()
+
+    def reload_oss(self):
+        """
+        设置中修改了 OSS 配置后调用：丢弃已创建的 OSS 客户端和 Tab 内容（包括“未配置”提示），
+        OSS Tab 当前选中时立即按新配置重新创建，否则在下次选中时创建。
+        """
+        if self.oss_ui_handler:
+            self.oss_ui_handler.shutdown()
+        if self.oss_grid is not None:
+            # 网格的滚轮绑定注册在 all 上，不会随画布一起销毁
+            self.oss_layout.cancel()
+            self.oss_grid.destroy()
+        for child in self.oss_tab.winfo_children():
+            child.destroy()
+        self.oss = None
+        self.oss_ui_handler = None
+        self.oss_message_label = None
+        self.oss_grid = None
+        self.oss_layout = None
+        self.oss_loaded = False
+        self._on_tab_changed()
+
+    def _setup_oss(self):
+        """
+        延迟加载 oss2 并创建 OSS 客户端和 OSS Tab 的内容。
+        :return: OSS 是否可用；未启用时在 Tab 中显示提示。
+        """
+        self.oss_config = OSSConfig.load_config()  # 设置中可能刚修改过
+        if not self.oss_config["oss_enabled"]:
+            self.oss_message_label = Label(
+                self.oss_tab, text=LanguageManager.get_text(self.current_language.get(), "oss_not_configured")
+            )
+            self.oss_message_label.pack(pady=20)
+            return False
+        with self.instrumentation.span("startup.oss", "startup"):
+            from cloud_services.aliyun_oss import AliyunOSS
+            from UI.oss_ui import OSSUIHandler
+
+            self.oss = AliyunOSS(
+                self.oss_config["oss_access_key_id"],
+                self.oss_config["oss_access_key_secret"],
+                self.oss_config["oss_endpoint"],
+                self.oss_config["oss_bucket_name"],
+            )
+            self.oss_ui_handler = OSSUIHandler(self.root, self.oss, self.status_var, self.current_language, self)
+            self.setup_oss_tab()
+        return True
 
     def setup_ui(self):
         """设置主界面布局"""
@@ -152,60 +332,110 @@ class AppUI:
         self.setup_tabs()  # 新增方法
         self.setup_pagination()
         self.setup_status_bar()
-        self.display_images()  # 默认显示本地壁纸
-
-    def show_images(self, images, scrollable_frame, canvas, on_click):
-        """通用图片布局方法"""
-        if scrollable_frame is None:
-            raise ValueError("scrollable_frame is None. Ensure it is properly initialized before calling show_images.")
+        if self.config.get("startup_snapshot", True):
+            self._show_startup_snapshot()  # 真实数据在 _finish_startup 中加载
+
+    def _show_startup_snapshot(self):
+        """显示上次退出时保存的第一页快照，缩略图同时放入内存缓存，真实数据到达后直接复用"""
+        with self.instrumentation.span("startup.snapshot", "startup") as span:
+            items = StartupSnapshot.load(self.folder_path.get(), self.local_image_manager.criteria)
+            if not items:
+                return
+            image_data = []
+            for item, photo in zip(items, StartupSnapshot.load_photos(self.root, items)):
+                cache_key = (item["path"], item["mtime"], THUMBNAIL_SIZE)
+                if photo is not None:
+                    self.photo_cache.put(cache_key, photo)
+                image_data.append({
+                    "thumbnail": photo,
+                    "text": os.path.basename(item["path"]),
+                    "path": item["path"],
+                    "cache_key": cache_key,
+                })
+            span.set(items=len(image_data))
+            self.show_images(image_data, self.local_grid, on_click=lambda info: self.set_wallpaper(info["path"]))
+
+    def _save_startup_snapshot(self):
+        """退出时保存本地 Tab 开头若干张图片（首屏）的快照，只使用已缓存的缩略图"""
+        folder = self.local_image_manager.folder_path
+        if not self.config.get("startup_snapshot", True) or not folder or not os.path.isdir(folder):
+            return
+        criteria = self.local_image_manager.criteria
+        try:
+            entries = ImageManager.get_image_entries_page(folder, 0, SNAPSHOT_MAX_ITEMS, criteria)
+            StartupSnapshot.save(folder, criteria, [
+                (path, mtime, ImageManager.get_cached_thumbnail(path)) for path, mtime in entries
+            ])
+        except Exception as e:
+            print(f"Error saving startup snapshot: {e}")
+
+    def show_images(self, images, grid, on_click):
+        """
+        通用图片布局方法。
+        网格复用已有格子，缩略图尚未就绪的条目先显示占位图。
+        """
+        if grid is None:
+            raise ValueError("grid is None. Ensure it is properly initialized before calling show_images.")
+        grid.set_items(images, on_click)
 
-        # 清空当前布局
-        for widget in scrollable_frame.winfo_children():
-            widget.destroy()
+    def display_local_images(self):
+        """显示本地壁纸"""
+        with self.instrumentation.span("local.page", "ui", page=self.local_image_manager.current_page):
+            image_data = self.local_image_manager.get_image_data()
 
-        # 计算列数
-        canvas_width = canvas.winfo_width()
-        if canvas_width <= 0:  # 默认列数
-            columns = 5
-        else:
-            columns = max(canvas_width // 120, 1)  # 每张图片约 120px
-
-        # 布局图片
-        for index, image_info in enumerate(images):
-            thumbnail = image_info.get("thumbnail")
-            if not thumbnail:
-                continue
-
-            img_label = Label(
-                scrollable_frame,
-                image=thumbnail,
-                text=image_info.get("text", ""),
-                compound="top",
-                bg="white"
+            self.show_images(
+                images=image_data,
+                grid=self.local_grid,
+                on_click=lambda info: self.set_wallpaper(info["path"])
             )
-            img_label.photo = thumbnail  # 防止垃圾回收
-            img_label.grid(row=index // columns, column=index % columns, padx=10, pady=10)
-            img_label.bind("<Button-1>", lambda event, info=image_info: on_click(info))
-            # 如果壁纸已缓存，调用 _add_cached_mark 动态添加标记
-            if image_info.get("is_cached", False):
-                print(f"Adding cached mark for: {image_info['text']}")
-                self.oss_ui_handler._add_cached_mark(image_info["text"])
 
-    def display_local_images(self):
-        """显示本地壁纸"""
-        image_data = self.local_image_manager.get_image_data()
-
-        # 调用 show_images，确保 scrollable_frame 传入正确的值
-        self.show_images(
-            images=image_data,
-            scrollable_frame=self.local_scrollable_frame,
-            canvas=self.local_canvas,
-            on_click=lambda info: self.set_wallpaper(info["path"])
+    def _on_local_visible(self, items):
+        """可见条目变化时，后台生成内存缓存未命中的缩略图；新的请求会取消之前未完成的任务"""
+        self.thumbnail_worker.submit(
+            [info["path"] for info in items if info["thumbnail"] is None], self._on_local_thumbnail_ready
+        )
+
+    def _on_local_thumbnail_ready(self, image_path, image):
+        """缩略图生成完成后替换对应格子的占位图（主线程）"""
+        info = self.local_grid.get_item(image_path)
+        if info is None:
+            return
+        with self.instrumentation.span("thumbnail.photo_image", "ui"):
+            thumbnail = ImageManager.to_photo_image(image)
+        self.photo_cache.put(info["cache_key"], thumbnail)
+        self.local_grid.set_thumbnail(image_path, thumbnail)
+
+    def _on_local_folder_changed(self, folder, added, removed):
+        """监视到文件夹变化后刷新当前页（主线程），保持滚动位置；一批变化只刷新一次"""
+        if os.path.normpath(os.path.abspath(self.local_image_manager.folder_path or ".")) != folder:
+            return
+        if self.local_image_manager.clamp_page():
+            self.local_image_manager.update_page_label()
+            self.display_local_images()
+            return
+        self.local_grid.set_items(
+            self.local_image_manager.get_image_data(), lambda info: self.set_wallpaper(info["path"]), keep_scroll=True
+        )
+
+    def _on_local_metadata_updated(self, paths):
+        """新计算的元数据可能让更多图片满足筛选条件，刷新当前页（主线程）"""
+        folder = os.path.normpath(os.path.abspath(self.local_image_manager.folder_path or "."))
+        if not any(os.path.dirname(path) == folder for path in paths):
+            return
+        if self._metadata_refresh_id is None:
+            # 元数据按批陆续完成，同一时间窗口内只刷新一次
+            self._metadata_refresh_id = self.root.after(METADATA_REFRESH_MS, self._refresh_local_filter)
+
+    def _refresh_local_filter(self):
+        self._metadata_refresh_id = None
+        self.local_grid.set_items(
+            self.local_image_manager.get_image_data(), lambda info: self.set_wallpaper(info["path"]), keep_scroll=True
         )
 
     def display_oss_images(self):
         """显示 OSS 壁纸"""
-        self.oss_ui_handler.display_oss_images()
+        if self.oss_ui_handler:
+            self.oss_ui_handler.display_oss_images()
 
     def display_images(self):
         """根据激活的 Tab 显示壁纸"""
@@ -213,12 +443,34 @@ class AppUI:
         if current_tab == 0:  # 本地壁纸 Tab
             self.display_local_images()
         elif current_tab == 1:  # OSS 壁纸 Tab
-            self.oss_ui_handler.display_oss_images()
+            self.display_oss_images()
 
     def set_wallpaper(self, image_path, event=None):
-        """设置下载的壁纸为桌面壁纸"""
-        success, error = WallpaperManager.set_wallpaper(image_path)
+        """设置壁纸：使用按屏幕尺寸渲染的变体，尚未渲染时先在后台渲染"""
+        renderer = WallpaperRenderer.shared()
+        target = WallpaperRenderer.screen_target(self.root, self.config)
+        rendered = renderer.lookup(image_path, target)
+        if rendered is not None:
+            self._apply_wallpaper(image_path, rendered.path)
+            return
+        future = renderer.submit(image_path, target)
+        future.add_done_callback(lambda f: self.dispatcher.call_soon(self._on_wallpaper_rendered, image_path, f))
+
+    def _on_wallpaper_rendered(self, image_path, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # 渲染失败时仍交给系统处理原图，保持原有行为
+            print(f"Error rendering wallpaper {image_path}: {error}")
+            self._apply_wallpaper(image_path, image_path)
+            return
+        self._apply_wallpaper(image_path, future.result().path)
+
+    def _apply_wallpaper(self, image_path, wallpaper_path):
+        success, error = WallpaperManager.set_wallpaper(wallpaper_path)
         if success:
+            ConfigManager.record_state(self.config, current_wallpaper=image_path)
             self.status_var.set(LanguageManager.get_text(self.current_language.get(), "wallpaper_set_to",
                                                          wallpaper=os.path.basename(image_path)))
         else:
@@ -229,10 +481,35 @@ class AppUI:
         if folder:
             self.folder_path.set(folder)
             self.config["last_folder"] = folder
-            ConfigManager.save_config(self.config)
+            ConfigManager.schedule_save(self.config)
             self.current_page.set(0)
+            self.local_image_manager.set_folder(folder)
+            self.local_image_manager.update_page_label()
+            if self.folder_watcher:
+                self.folder_watcher.watch(folder)
             self.display_images()
 
+    def _protected_cache_paths(self):
+        """缓存淘汰时需要保留的图片：当前壁纸和接下来的自动切换队列"""
+        return [self.config.get("current_wallpaper")] + self.auto_switcher.get_upcoming_images(5)
+
+    def shutdown(self):
+        """退出前停止后台任务"""
+        self._save_startup_snapshot()
+        self.cache_manager.stop()
+        if self.folder_watcher:
+            self.folder_watcher.stop()
+        self.thumbnail_worker.shutdown()
+        self.auto_switcher.shutdown()
+        WallpaperRenderer.shared().shutdown()
+        MetadataIndex.shared().shutdown()
+        if self.oss_ui_handler:
+            self.oss_ui_handler.shutdown()
+        self.dispatcher.stop()
+        if self.instrumentation.enabled and self.config.get("instrumentation_trace_file"):
+            self.export_trace()
+        ConfigManager.flush(self.config)
+
     def open_settings(self):
         settings_ui = SettingsUI(self.root, self.config, self.current_language, self)
         settings_ui.open_settings_window()
@@ -248,8 +525,12 @@ class AppUI:
 
         # 更新分页按钮
         self.local_image_manager.update_ui_texts(self.current_language)
-        self.oss_ui_handler.update_ui_texts(self.current_language)
-
+        if self.oss_ui_handler:
+            self.oss_ui_handler.update_ui_texts(self.current_language)
+        if self.oss_message_label is not None:
+            self.oss_message_label.config(
+                text=LanguageManager.get_text(self.current_language.get(), "oss_not_configured")
+            )
 
         # 更新 Tab 标签
         self.notebook.tab(0, text=LanguageManager.get_text(self.current_language.get(), "local_wallpapers"))
@@ -257,4 +538,4 @@ class AppUI:
 
     def on_canvas_resize(self, event):
         """窗口大小变化时更新布局"""
-        self.display_local_images()
+        self.local_grid.relayout()
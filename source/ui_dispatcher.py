@@ -0,0 +1,45 @@
+import queue
+import time
+
+
+class UIDispatcher:
+    """
+    将后台线程产生的回调转交给 Tk 主线程执行。
+    后台线程调用 call_soon 入队，主线程通过 root.after 定期取出执行，
+    每帧只占用有限的时间预算，避免阻塞界面输入。
+    """
+
+    def __init__(self, root, interval_ms=16, budget_ms=8):
+        """
+        :param root: Tkinter 根窗口对象。
+        :param interval_ms: 轮询间隔（毫秒），默认约一帧。
+        :param budget_ms: 每次轮询最多执行回调的时间（毫秒）。
+        """
+        self.root = root
+        self.interval_ms = interval_ms
+        self.budget = budget_ms / 1000
+        self._queue = queue.Queue()
+        self._task = self.root.after(self.interval_ms, self._drain)
+
+    def call_soon(self, callback, *args):
+        """线程安全：安排 callback(*args) 在主线程执行"""
+        self._queue.put((callback, args))
+
+    def _drain(self):
+        deadline = time.perf_counter() + self.budget
+        while time.perf_counter() < deadline:
+            try:
+                callback, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error in UI callback {callback}: {e}")
+        self._task = self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        """停止轮询"""
+        if self._task:
+            self.root.after_cancel(self._task)
+            self._task = None
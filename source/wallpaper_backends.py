@@ -0,0 +1,149 @@
+import ctypes
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+COMMAND_TIMEOUT = 10  # 秒
+
+
+class WallpaperBackend:
+    """设置桌面壁纸的后端接口，失败时抛出异常"""
+    name = "base"
+
+    def set_wallpaper(self, image_path):
+        raise NotImplementedError
+
+
+class WindowsSPIBackend(WallpaperBackend):
+    """通过 SystemParametersInfoW 设置 Windows 壁纸"""
+    name = "windows"
+    SPI_SETDESKWALLPAPER = 20
+    SPIF_UPDATEINIFILE = 0x01
+    SPIF_SENDCHANGE = 0x02
+
+    def set_wallpaper(self, image_path):
+        if not ctypes.windll.user32.SystemParametersInfoW(
+            self.SPI_SETDESKWALLPAPER, 0, image_path, self.SPIF_UPDATEINIFILE | self.SPIF_SENDCHANGE
+        ):
+            raise ctypes.WinError()
+
+
+class LinuxBackend(WallpaperBackend):
+    """
+    Linux 桌面壁纸：GNOME 系桌面使用 gsettings，其他 X11 桌面依次尝试 feh、xwallpaper。
+    """
+    name = "linux"
+    GNOME_DESKTOPS = ("GNOME", "UNITY", "CINNAMON", "BUDGIE", "PANTHEON")
+
+    def __init__(self):
+        self.tool = self.detect_tool()
+
+    @classmethod
+    def detect_tool(cls):
+        """返回可用的工具名，都不可用时返回 None"""
+        desktop = os.environ.get("XDG_CURRENT_DESKTOP", "").upper()
+        if shutil.which("gsettings") and any(name in desktop for name in cls.GNOME_DESKTOPS):
+            return "gsettings"
+        for tool in ("feh", "xwallpaper"):
+            if shutil.which(tool):
+                return tool
+        return None
+
+    def commands(self, image_path):
+        """返回设置壁纸需要执行的命令列表"""
+        if self.tool == "gsettings":
+            uri = Path(image_path).resolve().as_uri()
+            schema = "org.gnome.desktop.background"
+            # picture-uri-dark 只在 GNOME 42 及以上存在，失败时忽略
+            return [
+                ["gsettings", "set", schema, "picture-uri", uri],
+                ["gsettings", "set", schema, "picture-uri-dark", uri],
+            ]
+        if self.tool == "feh":
+            return [["feh", "--no-fehbg", "--bg-fill", image_path]]
+        if self.tool == "xwallpaper":
+            return [["xwallpaper", "--zoom", image_path]]
+        raise RuntimeError("No wallpaper tool found (install gsettings, feh or xwallpaper)")
+
+    def set_wallpaper(self, image_path):
+        for index, command in enumerate(self.commands(image_path)):
+            result = subprocess.run(command, capture_output=True, text=True, timeout=COMMAND_TIMEOUT)
+            if result.returncode != 0 and index == 0:
+                raise RuntimeError(f"{' '.join(command[:2])} failed: {result.stderr.strip()}")
+
+
+class RecordingBackend(WallpaperBackend):
+    """
+    不修改桌面、只记录调用的后端，用于在无桌面的 Linux 机器上压测切换流程。
+    每次调用记录 (时间戳, 路径, 耗时秒数)，可选模拟系统设置壁纸的延迟。
+    """
+    name = "recording"
+
+    def __init__(self, delay_ms=0, verbose=False):
+        """
+        :param delay_ms: 每次调用模拟的耗时（毫秒）。
+        :param verbose: 是否打印每次调用（默认只记录到 calls，耗时另由 wallpaper.set span 记录）。
+        """
+        self.delay_ms = delay_ms
+        self.verbose = verbose
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def set_wallpaper(self, image_path):
+        start = time.perf_counter()
+        if not os.path.isfile(image_path):
+            raise FileNotFoundError(image_path)
+        if self.delay_ms:
+            time.sleep(self.delay_ms / 1000)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.calls.append((time.time(), image_path, elapsed))
+        if self.verbose:
+            print(f"[recording] set_wallpaper {image_path} ({elapsed * 1000:.2f} ms)")
+
+    def summary(self):
+        """返回调用次数和平均、最大耗时（毫秒）"""
+        with self._lock:
+            durations = [elapsed for _, _, elapsed in self.calls]
+        if not durations:
+            return {"calls": 0, "avg_ms": 0.0, "max_ms": 0.0}
+        return {
+            "calls": len(durations),
+            "avg_ms": sum(durations) * 1000 / len(durations),
+            "max_ms": max(durations) * 1000,
+        }
+
+
+BACKENDS = {
+    WindowsSPIBackend.name: WindowsSPIBackend,
+    LinuxBackend.name: LinuxBackend,
+    RecordingBackend.name: RecordingBackend,
+}
+
+
+def default_backend_name():
+    """按平台选择默认后端"""
+    if sys.platform == "win32":
+        return WindowsSPIBackend.name
+    if sys.platform.startswith("linux"):
+        return LinuxBackend.name
+    return RecordingBackend.name
+
+
+def create_backend(name="auto", **options):
+    """
+    按名称创建后端。
+    :param name: windows、linux、recording 或 auto。
+    :param options: 传给后端构造函数的参数（目前只有 recording 使用）。
+    """
+    if name in (None, "", "auto"):
+        name = default_backend_name()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown wallpaper backend: {name}")
+    if name == RecordingBackend.name:
+        return RecordingBackend(**options)
+    return BACKENDS[name]()
@@ -1,13 +1,41 @@
 ### wallpaper_manager.py
-import ctypes
+import os
+
+from instrumentation import Instrumentation
+from wallpaper_backends import create_backend
+
+BACKEND_ENV = "WALLPAPER_BACKEND"
+
 
 class WallpaperManager:
-    SPI_SETDESKWALLPAPER = 20
+    # 启动时由 configure 选择，未配置时按平台自动选择
+    backend = None
+
+    @staticmethod
+    def configure(config):
+        """
+        启动时选择壁纸后端。
+        环境变量 WALLPAPER_BACKEND 优先于配置项 wallpaper_backend（windows、linux、recording、auto）；
+        recording 后端可用 wallpaper_backend_delay_ms 模拟系统耗时。
+        """
+        name = os.environ.get(BACKEND_ENV) or config.get("wallpaper_backend", "auto")
+        options = {}
+        if name == "recording":
+            options["delay_ms"] = config.get("wallpaper_backend_delay_ms", 0)
+        try:
+            WallpaperManager.backend = create_backend(name, **options)
+        except ValueError as e:
+            print(f"Error selecting wallpaper backend: {e}")
+            WallpaperManager.backend = create_backend("auto")
+        return WallpaperManager.backend
 
     @staticmethod
     def set_wallpaper(image_path):
         try:
-            ctypes.windll.user32.SystemParametersInfoW(WallpaperManager.SPI_SETDESKWALLPAPER, 0, image_path, 3)
+            if WallpaperManager.backend is None:
+                WallpaperManager.backend = create_backend(os.environ.get(BACKEND_ENV))
+            with Instrumentation.shared().span("wallpaper.set", "wallpaper", backend=WallpaperManager.backend.name):
+                WallpaperManager.backend.set_wallpaper(image_path)
             return True, ""
         except Exception as e:
-            return False, str(e)
\ No newline at end of file
+            return False, str(e)
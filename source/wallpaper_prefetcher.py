@@ -0,0 +1,120 @@
+import collections
+import concurrent.futures
+import os
+import threading
+
+DEFAULT_PREFETCH_DEPTH = 3
+METRIC_WINDOW = 100
+# 切换时预取的渲染还没完成，最多等待这么久（在调度线程中等待，不影响界面）
+TAKE_WAIT_SECONDS = 1.0
+
+# take 的结果；from_prefetch 表示文件来自预取队列（命中），否则为已有变体或原文件
+PreparedWallpaper = collections.namedtuple("PreparedWallpaper", ["source", "path", "render_seconds", "from_prefetch"])
+
+
+class WallpaperPrefetcher:
+    """
+    自动切换的预取队列。
+    提前把接下来的 N 张壁纸交给 WallpaperRenderer 在后台解码、校验并渲染成屏幕尺寸的变体，
+    切换时只需取出已准备好的文件交给 WallpaperManager。
+    同时统计准备耗时和切换耗时，便于确认切换本身保持在常数时间。
+    """
+
+    def __init__(self, renderer, depth=DEFAULT_PREFETCH_DEPTH, wait_seconds=TAKE_WAIT_SECONDS):
+        """
+        :param renderer: WallpaperRenderer 实例。
+        :param depth: 预取的壁纸数量。
+        :param wait_seconds: 切换时等待正在进行的渲染的最长时间。
+        """
+        self.renderer = renderer
+        self.depth = depth
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._pending = {}  # (路径, mtime, 渲染目标) -> Future
+        self.hits = 0
+        self.misses = 0
+        self.prepare_times = collections.deque(maxlen=METRIC_WINDOW)
+        self.switch_times = collections.deque(maxlen=METRIC_WINDOW)
+
+    @staticmethod
+    def _key(path, target):
+        path = os.path.abspath(path)
+        return path, os.path.getmtime(path), target
+
+    def schedule(self, paths, target):
+        """
+        更新预取队列：准备 paths 中尚未准备的壁纸，取消不再需要的任务。
+        :param paths: 接下来将要切换的图片路径，按切换顺序排列。
+        :param target: 渲染目标 (宽, 高, 填充方式)，见 WallpaperRenderer.screen_target。
+        """
+        wanted = []
+        for path in paths[:self.depth]:
+            try:
+                wanted.append(self._key(path, target))
+            except OSError:
+                continue
+
+        with self._lock:
+            for key in list(self._pending):
+                if key not in wanted:
+                    self._pending.pop(key).cancel()
+            for key in wanted:
+                if key not in self._pending:
+                    self._pending[key] = self.renderer.submit(key[0], target)
+
+    def take(self, path, target):
+        """
+        取出为 path 准备好的壁纸。
+        渲染仍在进行时最多等待 wait_seconds；超时则不取消，让它在后台完成（变体留在磁盘上供以后使用）。
+        未命中时使用已有的变体或原文件，不在切换时解码，与没有预取时的行为一致。
+        :return: PreparedWallpaper，未命中时 from_prefetch 为 False、render_seconds 为 None。
+        :raises Exception: 预取时发现图片损坏或无法解码。
+        """
+        try:
+            key = self._key(path, target)
+        except OSError:
+            key = None
+        with self._lock:
+            future = self._pending.pop(key, None)
+        if future is not None and not future.cancelled():
+            try:
+                rendered = future.result(timeout=self.wait_seconds)
+            except concurrent.futures.TimeoutError:
+                rendered = None
+            except concurrent.futures.CancelledError:
+                rendered = None
+            if rendered is not None and os.path.exists(rendered.path):
+                self.hits += 1
+                self.prepare_times.append(rendered.render_seconds)
+                return PreparedWallpaper(rendered.source, rendered.path, rendered.render_seconds, True)
+
+        self.misses += 1
+        rendered = self.renderer.lookup(path, target)
+        path = os.path.abspath(path)
+        return PreparedWallpaper(path, rendered.path if rendered else path, None, False)
+
+    def record_switch(self, seconds):
+        """记录一次 set_wallpaper 的耗时"""
+        self.switch_times.append(seconds)
+
+    def stats(self):
+        """返回命中情况和准备、切换耗时（毫秒）的平均值与最大值"""
+        def summary(values):
+            values = list(values)
+            if not values:
+                return {"avg_ms": 0.0, "max_ms": 0.0}
+            return {"avg_ms": sum(values) * 1000 / len(values), "max_ms": max(values) * 1000}
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "prepare": summary(self.prepare_times),
+            "switch": summary(self.switch_times),
+        }
+
+    def cancel(self):
+        """取消所有尚未开始的准备任务"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.cancel()
@@ -0,0 +1,199 @@
+import collections
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import ExifTags, Image, ImageOps
+
+from instrumentation import Instrumentation
+
+RENDERED_DIR = "rendered_wallpapers"
+LEGACY_PREPARED_DIR = "prepared_wallpapers"  # 旧版预取器的格式转换目录，已由屏幕尺寸变体取代
+FIT_MODES = ("fill", "fit")  # fill：等比放大后裁掉多余部分；fit：完整显示并用黑边补齐
+DEFAULT_FIT_MODE = "fill"
+JPEG_QUALITY = 95
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)  # 这些 EXIF 方向需要旋转 90°，存储的宽高与显示时相反
+
+RenderedWallpaper = collections.namedtuple("RenderedWallpaper", ["source", "path", "render_seconds"])
+
+
+class WallpaperRenderer:
+    """
+    按屏幕分辨率预先缩放的壁纸变体缓存。
+    每张图片按屏幕尺寸和填充方式渲染成一张基线 JPEG，设置壁纸时系统无需再缩放大图；
+    文件名包含源文件路径、mtime、屏幕尺寸和填充方式，任何一项变化都会重新渲染，
+    同一源文件的旧变体在渲染新变体时删除。
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, directory=RENDERED_DIR):
+        self.directory = directory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+
+    @classmethod
+    def shared(cls):
+        """获取进程内共享的渲染器实例"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def enable_dpi_awareness():
+        """
+        声明进程支持高 DPI，必须在创建 Tk 根窗口之前调用。
+        Windows 缩放 150% 时，未声明的进程拿到的是缩放后的逻辑分辨率（如 2560x1440 屏幕得到 1707x960），
+        渲染出的变体会被系统再放大而变糊。其他平台无需处理。
+        """
+        if sys.platform != "win32":
+            return
+        import ctypes
+        try:
+            ctypes.windll.shcore.SetProcessDpiAwareness(2)  # Windows 8.1+：按显示器感知 DPI
+        except (AttributeError, OSError):
+            try:
+                ctypes.windll.user32.SetProcessDPIAware()  # Windows Vista/7
+            except (AttributeError, OSError) as e:
+                print(f"Error enabling DPI awareness: {e}")
+
+    @staticmethod
+    def screen_target(root, config):
+        """
+        返回当前屏幕的渲染目标 (宽, 高, 填充方式)，必须在主线程调用。
+        Windows 上需要先调用 enable_dpi_awareness，否则得到的是缩放后的逻辑分辨率。
+        :param root: Tkinter 根窗口对象。
+        :param config: 配置字典，读取 wallpaper_fit_mode。
+        """
+        mode = config.get("wallpaper_fit_mode", DEFAULT_FIT_MODE)
+        if mode not in FIT_MODES:
+            mode = DEFAULT_FIT_MODE
+        return root.winfo_screenwidth(), root.winfo_screenheight(), mode
+
+    @staticmethod
+    def _source_prefix(path):
+        return hashlib.md5(os.path.abspath(path).encode()).hexdigest()
+
+    def variant_path(self, path, target):
+        """返回 path 在 target 下的变体文件路径"""
+        width, height, mode = target
+        mtime = os.path.getmtime(path)
+        version = hashlib.md5(f"{mtime}-{width}x{height}-{mode}".encode()).hexdigest()[:12]
+        return os.path.abspath(os.path.join(self.directory, f"{self._source_prefix(path)}_{version}.jpg"))
+
+    def lookup(self, path, target):
+        """
+        查找已渲染的变体，不存在时返回 None。
+        :return: RenderedWallpaper，render_seconds 为 0。
+        """
+        try:
+            variant = self.variant_path(path, target)
+            os.utime(variant)  # 刷新 mtime，供缓存按最近使用淘汰
+        except OSError:
+            return None
+        return RenderedWallpaper(os.path.abspath(path), variant, 0.0)
+
+    def render(self, path, target):
+        """
+        渲染（或复用）path 在 target 下的变体，可在任意线程调用。
+        :return: RenderedWallpaper。
+        :raises Exception: 图片损坏或无法解码。
+        """
+        cached = self.lookup(path, target)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        width, height, mode = target
+        variant = self.variant_path(path, target)
+        with Image.open(path) as img:
+            # JPEG 可在解码时直接按 1/2、1/4、1/8 缩小，大照片只需解码一小部分像素；
+            # 需要旋转 90° 的照片按旋转前的宽高请求，否则短边可能被缩得比屏幕还小
+            if img.getexif().get(ExifTags.Base.Orientation, 1) in ROTATED_ORIENTATIONS:
+                img.draft("RGB", (height, width))
+            else:
+                img.draft("RGB", (width, height))
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            if mode == "fit":
+                img = ImageOps.pad(img, (width, height), method=Image.LANCZOS, color="black")
+            else:
+                img = ImageOps.fit(img, (width, height), method=Image.LANCZOS)
+
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = variant + ".tmp"
+            img.save(tmp_path, "JPEG", quality=JPEG_QUALITY, progressive=False, optimize=False)
+            os.replace(tmp_path, variant)
+
+        self._remove_other_variants(path, variant)
+        Instrumentation.shared().record("wallpaper.render", "wallpaper", start, time.perf_counter() - start, {"path": path})
+        return RenderedWallpaper(os.path.abspath(path), variant, time.perf_counter() - start)
+
+    def submit(self, path, target):
+        """在后台线程渲染，返回结果为 RenderedWallpaper 的 Future"""
+        return self._executor.submit(self.render, path, target)
+
+    def _remove_other_variants(self, path, keep):
+        # 源文件 mtime 或屏幕尺寸变化后，旧变体不再有用
+        prefix = self._source_prefix(path) + "_"
+        with os.scandir(self.directory) as entries:
+            stale = [entry.path for entry in entries
+                     if entry.name.startswith(prefix) and os.path.abspath(entry.path) != keep]
+        for stale_path in stale:
+            try:
+                os.remove(stale_path)
+            except OSError as e:
+                print(f"Error removing rendered wallpaper {stale_path}: {e}")
+
+    @staticmethod
+    def remove_legacy_files(directory=LEGACY_PREPARED_DIR):
+        """删除旧版预取器留下的转换目录（其中的文件已不会再被使用或淘汰）"""
+        if not os.path.isdir(directory):
+            return
+        try:
+            shutil.rmtree(directory)
+        except OSError as e:
+            print(f"Error removing legacy wallpaper directory {directory}: {e}")
+
+    def prune(self, limit_bytes, protected_paths=()):
+        """
+        按 mtime 淘汰变体，直到总大小不超过 limit_bytes。
+        :param protected_paths: 源图片路径，它们的变体不会被淘汰。
+        :return: (淘汰数量, 释放字节数, 剩余字节数)。
+        """
+        if not os.path.isdir(self.directory):
+            return 0, 0, 0
+        protected_prefixes = {self._source_prefix(path) for path in protected_paths if path}
+
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path, entry.name.split("_")[0]))
+
+        total_bytes = sum(size for _, size, _, _ in files)
+        evicted = 0
+        freed = 0
+        for _, size, path, prefix in sorted(files):
+            if total_bytes - freed <= limit_bytes:
+                break
+            if prefix in protected_prefixes:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Error removing rendered wallpaper {path}: {e}")
+                continue
+            evicted += 1
+            freed += size
+        return evicted, freed, total_bytes - freed
+
+    def shutdown(self):
+        """取消尚未开始的渲染任务"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# 与程序运行时一致：source/ 下的模块互相直接导入，UI 模块通过 source. 前缀导入
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(REPO_ROOT, "source"), REPO_ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
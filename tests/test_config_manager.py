@@ -0,0 +1,88 @@
+import json
+import threading
+
+import pytest
+
+import config_manager
+from config_manager import CONFIG_FILE, STATE_JOURNAL_FILE, ConfigManager
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # ConfigManager 的状态在类上，每个测试相当于一次新的启动
+    monkeypatch.setattr(ConfigManager, "_timer", None)
+    monkeypatch.setattr(ConfigManager, "_pending_config", None)
+    monkeypatch.setattr(ConfigManager, "_journal_lines", 0)
+    yield tmp_path
+    ConfigManager._cancel_timer()
+
+
+def read_config(workdir):
+    return json.loads((workdir / CONFIG_FILE).read_text())
+
+
+def test_failed_save_keeps_the_previous_config(workdir, monkeypatch):
+    ConfigManager.save_config({"last_folder": "/old"})
+
+    def broken_dump(data, file):
+        file.write('{"last_folder": "/ne')
+        raise OSError("disk full")
+
+    monkeypatch.setattr(config_manager.json, "dump", broken_dump)
+    with pytest.raises(OSError):
+        ConfigManager.save_config({"last_folder": "/new"})
+    assert read_config(workdir) == {"last_folder": "/old"}
+
+
+def test_journal_is_replayed_on_load(workdir):
+    config = {"last_folder": "/pictures", "language": "English"}
+    ConfigManager.save_config(config)
+    ConfigManager.record_state(config, current_wallpaper="/pictures/a.jpg")
+    ConfigManager.record_state(config, current_wallpaper="/pictures/b.jpg")
+    with open(STATE_JOURNAL_FILE, "a") as journal:
+        journal.write('{"current_wallpaper": "/pictures/c')  # 崩溃时写了一半的最后一行
+    assert read_config(workdir) == {"last_folder": "/pictures", "language": "English"}
+
+    ConfigManager._journal_lines = 0
+    loaded = ConfigManager.load_config()
+    assert loaded["current_wallpaper"] == "/pictures/b.jpg"
+    assert ConfigManager._journal_lines == 2
+
+    # 完整保存后日志清空
+    ConfigManager.flush(loaded)
+    assert read_config(workdir)["current_wallpaper"] == "/pictures/b.jpg"
+    assert not (workdir / STATE_JOURNAL_FILE).exists()
+
+
+def test_journal_is_compacted_into_the_config(workdir, monkeypatch):
+    monkeypatch.setattr(config_manager, "JOURNAL_COMPACT_LINES", 3)
+    saved = threading.Event()
+    monkeypatch.setattr(ConfigManager, "_save_pending", staticmethod(saved.set))
+    config = {"last_folder": "/pictures"}
+    for index in range(2):
+        ConfigManager.record_state(config, current_wallpaper=f"{index}.jpg")
+    assert ConfigManager._timer is None
+    ConfigManager.record_state(config, current_wallpaper="2.jpg")
+    assert ConfigManager._pending_config is config and ConfigManager._timer is not None
+
+
+def test_scheduled_saves_are_coalesced(workdir, monkeypatch):
+    saves = []
+    original_save = ConfigManager.save_config
+    monkeypatch.setattr(ConfigManager, "save_config", staticmethod(lambda config: saves.append(dict(config))))
+    config = {"last_folder": "/a"}
+    for folder in ("/a", "/b", "/c"):
+        config["last_folder"] = folder
+        ConfigManager.schedule_save(config, delay=0.05)
+    timer = ConfigManager._timer
+    timer.join(5)
+    assert saves == [{"last_folder": "/c"}]
+
+    # 退出时补写尚未到期的修改
+    monkeypatch.setattr(ConfigManager, "save_config", original_save)
+    config["last_folder"] = "/d"
+    ConfigManager.schedule_save(config, delay=60)
+    ConfigManager.flush(config)
+    assert read_config(workdir) == {"last_folder": "/d"}
+    assert ConfigManager._timer is None
@@ -0,0 +1,142 @@
+import email.utils
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import oss2
+import pytest
+
+from cloud_services import aliyun_oss
+from cloud_services.aliyun_oss import AliyunOSS
+from cloud_services.download_engine import DownloadEngine
+from cloud_services.oss_config import PARTIAL_DOWNLOAD_SUFFIX
+
+KEY = "wallpapers/big.jpg"
+PART_SIZE = 128 * 1024  # oss2 的最小分片为 100KB
+DATA = bytes(range(256)) * (PART_SIZE * 5 // 256 + 10)  # 6 个分片，最后一个不满
+
+
+def crc64(data):
+    crc = oss2.utils.Crc64()
+    crc.update(data)
+    return crc.crc
+
+
+class FakeOSSHandler(BaseHTTPRequestHandler):
+    """只实现下载用到的 HEAD 和带 Range 的 GET，路径形式为 /bucket/key"""
+    protocol_version = "HTTP/1.1"
+
+    def _headers(self, status, length, extra=()):
+        server = self.server
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        self.send_header("ETag", '"0123456789ABCDEF"')
+        self.send_header("Last-Modified", email.utils.formatdate(1700000000, usegmt=True))
+        self.send_header("x-oss-request-id", "test")
+        self.send_header("x-oss-hash-crc64ecma", str(server.crc))
+        self.send_header("x-oss-object-type", "Normal")
+        for name, value in extra:
+            self.send_header(name, value)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._headers(200, len(DATA))
+
+    def do_GET(self):
+        server = self.server
+        start, end = 0, len(DATA) - 1
+        requested = self.headers.get("Range")
+        if requested:
+            first, last = requested.split("=")[1].split("-")
+            start, end = int(first), min(int(last), len(DATA) - 1) if last else len(DATA) - 1
+        server.ranges.append(start)
+        if start in server.failing_offsets:
+            body = b"<Error><Code>InternalError</Code></Error>"
+            self.send_response(500)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("x-oss-request-id", "test")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        body = DATA[start:end + 1]
+        if requested:
+            self._headers(206, len(body), [("Content-Range", f"bytes {start}-{end}/{len(DATA)}")])
+        else:
+            self._headers(200, len(body))
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOSSHandler)
+    server.crc = crc64(DATA)
+    server.ranges = []
+    server.failing_offsets = set()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def oss(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 断点信息写在相对路径 downloads/.checkpoints 下
+    monkeypatch.setattr(aliyun_oss, "DOWNLOAD_MULTIGET_THRESHOLD", PART_SIZE)
+    monkeypatch.setattr(aliyun_oss, "DOWNLOAD_PART_SIZE", PART_SIZE)
+    monkeypatch.setattr(aliyun_oss, "DOWNLOAD_THREADS", 1)  # 按顺序请求分片，便于断言
+    oss = AliyunOSS("id", "secret", f"http://127.0.0.1:{server.server_address[1]}", "bucket")
+    yield oss
+    oss.thumbnail_fetcher.close()
+
+
+@pytest.fixture
+def engine(oss):
+    engine = DownloadEngine(oss)
+    yield engine
+    engine.shutdown()
+
+
+def test_download_is_verified_and_renamed(engine, tmp_path):
+    local_path = str(tmp_path / "big.jpg")
+    progress = []
+    future = engine.download(KEY, local_path, on_progress=lambda done, total: progress.append((done, total)))
+    # 同一文件的重复请求复用正在进行的下载
+    assert engine.download(KEY, local_path) is future
+    assert future.result(10) == local_path
+    with open(local_path, "rb") as file:
+        assert file.read() == DATA
+    assert not os.path.exists(local_path + PARTIAL_DOWNLOAD_SUFFIX)
+    assert progress[-1] == (len(DATA), len(DATA))
+
+
+def test_interrupted_download_resumes_from_the_checkpoint(server, engine, tmp_path):
+    local_path = str(tmp_path / "big.jpg")
+    server.failing_offsets = {3 * PART_SIZE}
+    with pytest.raises(oss2.exceptions.ServerError):
+        engine.download(KEY, local_path).result(10)
+    assert not os.path.exists(local_path)
+    assert server.ranges == [0, PART_SIZE, 2 * PART_SIZE, 3 * PART_SIZE]
+
+    # 再次下载只请求剩下的分片
+    server.failing_offsets = set()
+    server.ranges = []
+    assert engine.download(KEY, local_path).result(10) == local_path
+    assert server.ranges == [3 * PART_SIZE, 4 * PART_SIZE, 5 * PART_SIZE]
+    with open(local_path, "rb") as file:
+        assert file.read() == DATA
+
+
+@pytest.mark.parametrize("enable_crc", [True, False])
+def test_crc_mismatch_leaves_no_file_behind(server, oss, engine, tmp_path, enable_crc):
+    # enable_crc 时由 oss2 在下载过程中校验，否则由 _verify_download 在重命名前校验
+    oss.bucket.enable_crc = enable_crc
+    server.crc = crc64(DATA) ^ 1
+    local_path = str(tmp_path / "big.jpg")
+    with pytest.raises(oss2.exceptions.InconsistentError):
+        engine.download(KEY, local_path).result(10)
+    assert not os.path.exists(local_path)
+    assert not os.path.exists(local_path + PARTIAL_DOWNLOAD_SUFFIX)
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from folder_index import FolderIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    return FolderIndex(db_path=str(tmp_path / "folder_index.db"))
+
+
+def make_folder(tmp_path, names):
+    folder = tmp_path / "wallpapers"
+    folder.mkdir(exist_ok=True)
+    for name in names:
+        (folder / name).write_bytes(b"x")
+    return folder
+
+
+def test_refresh_reports_added_and_removed_images(tmp_path, index):
+    folder = make_folder(tmp_path, ["a.jpg", "b.PNG", "readme.txt"])
+    changes = []
+    index.add_listener(lambda key, added, removed: changes.append((key, sorted(added), sorted(removed))))
+
+    added, removed = index.refresh(str(folder))
+    assert sorted(os.path.basename(path) for path in added) == ["a.jpg", "b.PNG"]
+    assert removed == []
+    assert index.count(str(folder)) == 2
+
+    (folder / "a.jpg").unlink()
+    (folder / "c.bmp").write_bytes(b"x")
+    added, removed = index.refresh(str(folder))
+    assert [os.path.basename(path) for path in added] == ["c.bmp"]
+    assert [os.path.basename(path) for path in removed] == ["a.jpg"]
+    assert changes[-1] == (index.key_for(str(folder)), [str(folder / "c.bmp")], [str(folder / "a.jpg")])
+
+
+def test_pages_follow_name_order(tmp_path, index):
+    names = [f"{number:03d}.jpg" for number in range(50)]
+    folder = make_folder(tmp_path, reversed(names))
+    index.refresh(str(folder))
+
+    pages = [index.get_page(str(folder), offset, 8) for offset in range(0, 56, 8)]
+    assert [os.path.basename(path) for page in pages for path in page] == names
+    # 随机跳页与顺序翻页结果一致
+    assert index.get_page(str(folder), 24, 8) == pages[3]
+    assert [os.path.basename(path) for path in index.get_page(str(folder), 45, 10)] == names[45:]
+    assert [os.path.basename(path) for path, _ in index.get_page_entries(str(folder), 3, 2)] == names[3:5]
+
+
+def test_pages_stay_correct_after_deletion(tmp_path, index):
+    names = [f"{number:03d}.jpg" for number in range(30)]
+    folder = make_folder(tmp_path, names)
+    index.refresh(str(folder))
+    index.get_page(str(folder), 10, 10)  # 记住锚点
+
+    (folder / "005.jpg").unlink()
+    index.refresh(str(folder))
+    expected = [name for name in names if name != "005.jpg"][10:20]
+    assert [os.path.basename(path) for path in index.get_page(str(folder), 10, 10)] == expected
+
+
+def test_names_after_cursor(tmp_path, index):
+    folder = make_folder(tmp_path, ["a.jpg", "b.jpg", "c.jpg"])
+    index.refresh(str(folder))
+    key = index.key_for(str(folder))
+    assert index.get_names_after(key, None, 2) == ["a.jpg", "b.jpg"]
+    assert index.get_names_after(key, "b.jpg", 5) == ["c.jpg"]
+    assert index.get_names_after(key, "c.jpg", 1) == []
@@ -0,0 +1,69 @@
+import os
+import threading
+
+import pytest
+
+from image_library import HEAD_BYTES, ImageLibrary
+
+
+@pytest.fixture
+def library(tmp_path):
+    return ImageLibrary(db_path=str(tmp_path / "library.db"))
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return os.path.normpath(str(path))
+
+
+def test_duplicates_share_one_representative(tmp_path, library):
+    head = b"h" * HEAD_BYTES
+    first = write(tmp_path / "root" / "a.jpg", head + b"same")
+    second = write(tmp_path / "root" / "sub" / "b.jpg", head + b"same")
+    # 大小和开头相同、内容不同：需要完整哈希才能区分
+    other = write(tmp_path / "root" / "c.jpg", head + b"diff")
+    library.set_roots([str(tmp_path / "root")])
+
+    added, removed = library.refresh(force=True)
+    assert added == sorted([first, other]) and removed == []
+    assert library.stats() == (3, 2)
+    assert library.get_duplicates(second) == [first]
+    assert library.content_key(first) == library.content_key(second) != library.content_key(other)
+
+    # 删除代表后由剩下的副本接替
+    os.remove(first)
+    added, removed = library.refresh(force=True)
+    assert added == [second] and removed == [first]
+    assert library.stats() == (2, 2)
+
+
+def test_queries_are_not_blocked_by_a_running_scan(tmp_path, library, monkeypatch):
+    path = write(tmp_path / "root" / "a.jpg", b"data")
+    library.set_roots([str(tmp_path / "root")])
+    library.refresh(force=True)
+    key = library.content_key(path)
+
+    walking, release = threading.Event(), threading.Event()
+    original_walk = ImageLibrary._walk
+
+    def slow_walk(pool, roots):
+        walking.set()
+        release.wait(5)
+        return original_walk(pool, roots)
+
+    monkeypatch.setattr(ImageLibrary, "_walk", staticmethod(slow_walk))
+    write(tmp_path / "root" / "b.jpg", b"more")
+    scan = threading.Thread(target=library.refresh, kwargs={"force": True})
+    scan.start()
+    try:
+        assert walking.wait(5)
+        result = []
+        reader = threading.Thread(target=lambda: result.append((library.content_key(path), library.count())))
+        reader.start()
+        reader.join(1)
+        assert result == [(key, 1)]
+    finally:
+        release.set()
+        scan.join(5)
+    assert library.count() == 2
@@ -0,0 +1,37 @@
+import pytest
+
+from image_metadata import MetadataIndex
+
+
+def test_empty_criteria_match_everything_by_name():
+    assert MetadataIndex._build_query(None) == ("1", [], "i.name")
+    assert MetadataIndex._build_query({}) == ("1", [], "i.name")
+
+
+def test_filters_are_combined_with_parameters():
+    where, params, order = MetadataIndex._build_query(
+        {"orientation": "landscape", "min_width": 3840, "max_brightness": 0.4}
+    )
+    assert where == "m.width > m.height AND m.width >= ? AND m.brightness <= ?"
+    assert params == [3840, 0.4]
+    assert order == "i.name"
+
+
+@pytest.mark.parametrize("sort, expected", [
+    ("brightness", "m.brightness ASC, i.name"),
+    ("-pixels", "m.width * m.height DESC, i.name"),
+    ("name", "i.name ASC, i.name"),
+])
+def test_sort_keys(sort, expected):
+    assert MetadataIndex._build_query({"sort": sort})[2] == expected
+
+
+@pytest.mark.parametrize("criteria", [
+    {"orientation": "diagonal"},
+    {"sort": "size"},
+    {"min_size": 10},
+    {"sort": "name; DROP TABLE images"},
+])
+def test_invalid_criteria_are_rejected(criteria):
+    with pytest.raises(ValueError):
+        MetadataIndex.validate(criteria)
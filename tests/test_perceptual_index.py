@@ -0,0 +1,55 @@
+import random
+
+import pytest
+from PIL import Image
+
+from perceptual_index import PerceptualIndex, dhash, is_informative
+
+
+@pytest.fixture
+def index(tmp_path):
+    return PerceptualIndex(db_path=str(tmp_path / "perceptual_index.db"))
+
+
+def noise(seed, size=(64, 48)):
+    rng = random.Random(seed)
+    image = Image.new("L", size)
+    image.putdata([rng.randrange(256) for _ in range(size[0] * size[1])])
+    return image
+
+
+def gradient(size=(64, 48)):
+    image = Image.new("L", size)
+    image.putdata([x * 4 for _ in range(size[1]) for x in range(size[0])])
+    return image
+
+
+def save(image, path):
+    image.save(path)
+    return str(path)
+
+
+def test_resized_copy_is_a_near_duplicate(tmp_path, index):
+    image = noise(1)
+    first = save(image, tmp_path / "a.png")
+    second = save(image.resize((128, 96)), tmp_path / "b.png")
+    other = save(noise(2), tmp_path / "c.png")
+    for path in (first, second, other):
+        with Image.open(path) as img:
+            index.add_image(path, img)
+    assert index.near_duplicates(first) == [second]
+    # 文件更大的版本优先
+    assert index.is_shadowed(first) and not index.is_shadowed(second)
+
+
+def test_flat_and_gradient_images_are_not_duplicates(tmp_path, index):
+    assert dhash(Image.new("L", (64, 48), 128)) == dhash(gradient()) == 0
+    flat = save(Image.new("L", (64, 48), 128), tmp_path / "flat.png")
+    ramp = save(gradient(), tmp_path / "ramp.png")
+    assert not is_informative(0) and not is_informative((1 << 64) - 1)
+    for path in (flat, ramp):
+        with Image.open(path) as img:
+            index.add_image(path, img)
+    assert index.contains(flat) and index.contains(ramp)
+    assert index.near_duplicates(flat) == [] and index.find(0) == []
+    assert not index.is_shadowed(flat)
@@ -0,0 +1,17 @@
+from instrumentation import Instrumentation
+from photo_cache import PhotoImageCache
+
+
+def test_lookups_and_evictions_are_counted():
+    instrumentation = Instrumentation(enabled=True)
+    cache = PhotoImageCache(capacity=2, instrumentation=instrumentation)
+    cache.put("a", "photo-a")
+    cache.put("b", "photo-b")
+    assert cache.get("a") == "photo-a"  # a 变为最近使用
+    cache.put("c", "photo-c")  # 淘汰 b
+    assert cache.get("b") is None
+
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 2}
+    assert instrumentation.stats()["counters"] == {
+        "photo_cache.hit": 1, "photo_cache.miss": 1, "photo_cache.evict": 1
+    }
@@ -0,0 +1,168 @@
+import collections
+import os
+import random
+
+import pytest
+
+from folder_index import FolderIndex
+from playlist import MAX_ACCEPT_PROBES, MAX_WEIGHT, MIN_WEIGHT, Playlist
+
+NAMES = ["a.jpg", "b.jpg", "c.jpg", "d.jpg", "e.jpg"]
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "wallpapers"
+    folder.mkdir()
+    for name in NAMES:
+        (folder / name).write_bytes(b"")
+    (folder / "notes.txt").write_bytes(b"")
+    return folder
+
+
+@pytest.fixture
+def index(tmp_path):
+    return FolderIndex(db_path=str(tmp_path / "folder_index.db"))
+
+
+@pytest.fixture
+def make_playlist(tmp_path, folder, index):
+    playlists = []
+
+    def make(mode, seed=1, **kwargs):
+        playlist = Playlist(str(folder), mode, index=index, db_path=str(tmp_path / "playlist.db"),
+                            rng=random.Random(seed), **kwargs)
+        playlists.append(playlist)
+        return playlist
+
+    yield make
+    for playlist in playlists:
+        playlist.close()
+
+
+def names(paths):
+    return [os.path.basename(path) for path in paths]
+
+
+def test_sequential_plays_in_name_order_and_wraps(make_playlist):
+    playlist = make_playlist("sequential")
+    assert len(playlist) == len(NAMES)
+    assert names(playlist.advance() for _ in range(7)) == NAMES + NAMES[:2]
+
+
+def test_sequential_position_is_persisted(make_playlist):
+    playlist = make_playlist("sequential")
+    playlist.advance()
+    playlist.advance()
+    playlist.close()
+    assert names([make_playlist("sequential").advance()]) == ["c.jpg"]
+
+
+def test_sequential_starts_after_current_wallpaper(make_playlist, folder):
+    playlist = make_playlist("sequential", start_after=str(folder / "c.jpg"))
+    assert names([playlist.advance()]) == ["d.jpg"]
+
+
+def test_sequential_picks_up_added_files(make_playlist, folder):
+    playlist = make_playlist("sequential")
+    assert names(playlist.peek(2)) == ["a.jpg", "b.jpg"]
+    playlist.advance()
+    (folder / "aa.jpg").write_bytes(b"")
+    playlist.sync()
+    # 已预取的 b 之前插入了新文件，按文件名顺序重新抽取
+    assert names(playlist.advance() for _ in range(2)) == ["aa.jpg", "b.jpg"]
+
+
+def test_peek_matches_following_advances(make_playlist):
+    for mode in ("sequential", "shuffle", "weighted"):
+        playlist = make_playlist(mode, seed=7)
+        upcoming = playlist.peek(3)
+        assert [playlist.advance() for _ in range(3)] == upcoming
+
+
+def test_shuffle_plays_every_image_once_per_round(make_playlist):
+    playlist = make_playlist("shuffle")
+    for _ in range(3):
+        round_names = names(playlist.advance() for _ in range(len(NAMES)))
+        assert sorted(round_names) == NAMES
+
+
+def test_shuffle_round_survives_restart(make_playlist):
+    playlist = make_playlist("shuffle")
+    played = names(playlist.advance() for _ in range(2))
+    playlist.close()
+    rest = names(make_playlist("shuffle", seed=2).advance() for _ in range(len(NAMES) - 2))
+    assert sorted(played + rest) == NAMES
+
+
+def test_shuffle_forgets_removed_files(make_playlist, folder):
+    playlist = make_playlist("shuffle")
+    (folder / "c.jpg").unlink()
+    playlist.sync()
+    assert sorted(names(playlist.advance() for _ in range(4))) == ["a.jpg", "b.jpg", "d.jpg", "e.jpg"]
+
+
+def test_weighted_follows_weights_and_avoids_repeats(make_playlist, folder):
+    playlist = make_playlist("weighted", seed=3)
+    for name in NAMES:
+        playlist.set_weight(str(folder / name), MAX_WEIGHT if name == "a.jpg" else MIN_WEIGHT)
+    drawn = names(playlist.advance() for _ in range(2000))
+    assert all(first != second for first, second in zip(drawn, drawn[1:]))
+    counts = collections.Counter(drawn)
+    assert set(counts) == set(NAMES)
+    # 不能连续重复同一张，a 最多约占一半；其余四张权重相同
+    assert counts["a.jpg"] > 800
+    assert all(counts[name] < counts["a.jpg"] / 3 for name in NAMES[1:])
+
+
+def test_set_weight_is_clamped(make_playlist, folder):
+    playlist = make_playlist("weighted")
+    playlist.set_weight(str(folder / "a.jpg"), 100)
+    playlist.set_weight(str(folder / "b.jpg"), 0)
+    assert playlist._weights["a.jpg"] == MAX_WEIGHT
+    assert playlist._weights["b.jpg"] == MIN_WEIGHT
+
+
+def test_accept_filter_skips_rejected_images(make_playlist):
+    playlist = make_playlist("shuffle")
+    checked = []
+
+    def accept(paths):
+        checked.append(len(paths))
+        return {path for path in paths if os.path.basename(path) in ("b.jpg", "d.jpg")}
+
+    playlist.set_accept(accept)
+    assert set(names(playlist.advance() for _ in range(6))) == {"b.jpg", "d.jpg"}
+    assert max(checked) > 1  # 候选按批检查
+
+
+def test_accept_filter_keeps_sequential_order(make_playlist):
+    playlist = make_playlist("sequential")
+    playlist.set_accept(lambda paths: {path for path in paths if os.path.basename(path) != "b.jpg"})
+    assert names(playlist.advance() for _ in range(5)) == ["a.jpg", "c.jpg", "d.jpg", "e.jpg", "a.jpg"]
+
+
+def test_accept_filter_is_ignored_when_nothing_matches(make_playlist):
+    playlist = make_playlist("shuffle")
+    playlist.set_accept(lambda paths: set())
+    assert set(names(playlist.advance() for _ in range(5))) <= set(NAMES)
+
+
+def test_accept_filter_checks_a_bounded_number_of_candidates(tmp_path, index):
+    folder = tmp_path / "large"
+    folder.mkdir()
+    for number in range(MAX_ACCEPT_PROBES * 3):
+        (folder / f"{number:04d}.jpg").write_bytes(b"")
+    checked = []
+
+    def accept(paths):
+        checked.extend(paths)
+        return set()
+
+    for mode in ("sequential", "shuffle"):
+        playlist = Playlist(str(folder), mode, index=index, db_path=str(tmp_path / "playlist.db"), rng=random.Random(1))
+        playlist.set_accept(accept)
+        checked.clear()
+        assert playlist.advance() is not None
+        assert len(checked) == MAX_ACCEPT_PROBES
+        playlist.close()
@@ -0,0 +1,177 @@
+import datetime
+
+import pytest
+
+import switch_scheduler
+from instrumentation import Instrumentation
+from switch_scheduler import CronSchedule, DailySchedule, IntervalSchedule, SwitchScheduler, create_schedule
+
+
+def local(*args):
+    return datetime.datetime(*args).timestamp()
+
+
+def test_create_schedule_prefers_cron_then_times_then_interval():
+    assert isinstance(create_schedule({"auto_switch_cron": "0 * * * *", "auto_switch_times": ["08:00"]}, 60),
+                      CronSchedule)
+    assert isinstance(create_schedule({"auto_switch_times": ["08:00"]}, 60), DailySchedule)
+    schedule = create_schedule({}, 90)
+    assert isinstance(schedule, IntervalSchedule)
+    assert schedule.seconds == 90
+
+
+def test_interval_schedule_stays_on_its_grid():
+    schedule = IntervalSchedule(60)
+    assert schedule.next_after(100.0) == 160.0
+    # 回调耗时不影响下一次的截止时间
+    assert schedule.next_after(160.0) == 220.0
+    assert schedule.next_after(217.5) == 220.0
+    assert schedule.next_after(400.0) == 460.0
+
+
+def test_interval_schedule_rejects_non_positive_interval():
+    with pytest.raises(ValueError):
+        IntervalSchedule(0)
+
+
+def test_daily_schedule_picks_next_time_of_day():
+    schedule = DailySchedule(["20:00", "08:00", "08:00"])
+    assert schedule.times == [datetime.time(8, 0), datetime.time(20, 0)]
+    assert schedule.next_after(local(2024, 3, 5, 9, 0)) == local(2024, 3, 5, 20, 0)
+    assert schedule.next_after(local(2024, 3, 5, 20, 0)) == local(2024, 3, 6, 8, 0)
+    assert schedule.next_after(local(2024, 3, 5, 7, 59, 59)) == local(2024, 3, 5, 8, 0)
+
+
+@pytest.mark.parametrize("times", [["25:00"], ["08:60"], []])
+def test_daily_schedule_rejects_invalid_times(times):
+    with pytest.raises(ValueError):
+        DailySchedule(times)
+
+
+@pytest.mark.parametrize("expression, now, expected", [
+    ("*/15 * * * *", (2024, 3, 5, 10, 7, 30), (2024, 3, 5, 10, 15)),
+    ("30 9 * * 1-5", (2024, 3, 9, 12, 0), (2024, 3, 11, 9, 30)),  # 周六 -> 周一
+    ("0 0 * * 7", (2024, 3, 5, 0, 0), (2024, 3, 10, 0, 0)),  # 7 也表示周日
+    ("0 0 13 * 5", (2024, 3, 5, 0, 0), (2024, 3, 8, 0, 0)),  # 日和周同时限定时满足其一即可
+    ("0 12 1 1 *", (2024, 3, 5, 0, 0), (2025, 1, 1, 12, 0)),
+    ("0 8,20 * * *", (2024, 3, 5, 8, 0), (2024, 3, 5, 20, 0)),
+])
+def test_cron_schedule_next_fire(expression, now, expected):
+    assert CronSchedule(expression).next_after(local(*now)) == local(*expected)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "5-1 * * * *", "*/0 * * * *"])
+def test_cron_schedule_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_cron_schedule_that_never_fires():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(local(2024, 3, 5))
+
+
+class FakeTime:
+    """替代 switch_scheduler 中的 time 模块：墙上时间和单调时钟可分别前进"""
+
+    def __init__(self):
+        self.wall = local(2024, 3, 5, 12, 0)
+        self.mono = 1000.0
+
+    def time(self):
+        return self.wall
+
+    def monotonic(self):
+        return self.mono
+
+    def perf_counter(self):
+        return self.mono
+
+
+class FakeStopEvent:
+    """等待时推进假时钟；suspend_at 次等待期间模拟休眠，第一次触发之后停止"""
+
+    def __init__(self, clock, scheduler, suspend_seconds, suspend_at=1):
+        self.clock = clock
+        self.scheduler = scheduler
+        self.suspend_seconds = suspend_seconds
+        self.suspend_at = suspend_at
+        self.waits = 0
+        self.stopped = False
+
+    def is_set(self):
+        return self.stopped
+
+    def set(self):
+        self.stopped = True
+
+    def clear(self):
+        self.stopped = False
+
+    def wait(self, timeout):
+        self.waits += 1
+        self.clock.wall += timeout
+        self.clock.mono += timeout
+        if self.waits == self.suspend_at:
+            self.clock.wall += self.suspend_seconds  # 休眠期间单调时钟停止
+        if self.scheduler.ticks:
+            self.stopped = True
+
+
+def run_with_suspend(monkeypatch, missed_policy, suspend_seconds):
+    clock = FakeTime()
+    monkeypatch.setattr(switch_scheduler, "time", clock)
+    calls = []
+    scheduler = SwitchScheduler(IntervalSchedule(60), lambda: calls.append(clock.mono), missed_policy=missed_policy)
+    scheduler._stop_event = FakeStopEvent(clock, scheduler, suspend_seconds)
+    scheduler._run()
+    return scheduler, calls
+
+
+def test_suspend_is_detected_and_missed_ticks_are_skipped(monkeypatch):
+    scheduler, calls = run_with_suspend(monkeypatch, "skip", 600)
+    assert scheduler._suspended == pytest.approx(600)
+    assert len(calls) == 1
+    (due, jitter, missed, _), = scheduler.ticks
+    # 截止时间 +60，休眠后的当前时间为 +605，其间 +120 … +600 共 9 次被错过
+    assert missed == 9
+    assert jitter == pytest.approx(545)
+    assert scheduler.stats()["missed"] == 9
+
+
+def test_catch_up_runs_every_missed_tick(monkeypatch):
+    scheduler, calls = run_with_suspend(monkeypatch, "catch_up", 600)
+    assert len(calls) == 10
+
+
+def test_short_pause_is_not_treated_as_suspend(monkeypatch):
+    scheduler, calls = run_with_suspend(monkeypatch, "skip", switch_scheduler.CLOCK_JUMP_THRESHOLD / 2)
+    assert scheduler._suspended == 0
+    assert len(calls) == 1
+    (_, jitter, missed, _), = scheduler.ticks
+    assert missed == 0
+    assert jitter == pytest.approx(0)
+
+
+def test_unknown_missed_policy_is_rejected():
+    with pytest.raises(ValueError):
+        SwitchScheduler(IntervalSchedule(60), lambda: None, missed_policy="later")
+
+
+def test_on_start_runs_before_the_first_tick(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(switch_scheduler, "time", clock)
+    calls = []
+    scheduler = SwitchScheduler(IntervalSchedule(60), lambda: calls.append("tick"), on_start=lambda: calls.append("start"))
+    scheduler._stop_event = FakeStopEvent(clock, scheduler, 0)
+    scheduler._run()
+    assert calls == ["start", "tick"]
+
+
+def test_ticks_are_recorded_in_instrumentation(monkeypatch):
+    instrumentation = Instrumentation(enabled=True)
+    monkeypatch.setattr(Instrumentation, "_shared", instrumentation)
+    run_with_suspend(monkeypatch, "skip", 600)
+    stats = instrumentation.stats()
+    assert stats["spans"]["switch-scheduler.tick"]["count"] == 1
+    assert stats["counters"] == {"switch-scheduler.missed": 9}
@@ -0,0 +1,103 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cloud_services import thumbnail_fetcher
+from cloud_services.thumbnail_fetcher import ThumbnailFetchError, ThumbnailFetcher
+from instrumentation import Instrumentation
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = b"thumbnail" if status == 200 else b""
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # 模拟服务器关闭空闲的 keep-alive 连接：响应里没有 Connection: close，客户端仍会复用
+        self.close_connection = server.drop_connections
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = []
+    server.statuses = []
+    server.drop_connections = False
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(thumbnail_fetcher.time, "sleep", sleeps.append)
+    return sleeps
+
+
+@pytest.fixture
+def instrumentation(monkeypatch):
+    instrumentation = Instrumentation(enabled=True)
+    monkeypatch.setattr(Instrumentation, "_shared", instrumentation)
+    return instrumentation
+
+
+def url(server, name="a.jpg"):
+    return f"http://127.0.0.1:{server.server_address[1]}/{name}?x-oss-process=image/resize,w_100"
+
+
+def test_connections_are_reused(server, sleeps):
+    fetcher = ThumbnailFetcher(timeout=5)
+    assert [fetcher.fetch(url(server, f"{index}.jpg")) for index in range(3)] == [b"thumbnail"] * 3
+    assert fetcher.connections_opened == 1 and fetcher.requests == 3
+    assert server.requests[0] == "/0.jpg?x-oss-process=image/resize,w_100"
+    assert sleeps == []
+    fetcher.close()
+
+
+def test_server_errors_are_retried_with_exponential_backoff(server, sleeps, instrumentation):
+    server.statuses = [503, 429]
+    fetcher = ThumbnailFetcher(timeout=5, retries=3, backoff=0.5)
+    assert fetcher.fetch(url(server)) == b"thumbnail"
+    assert sleeps == [0.5, 1.0]
+    assert len(server.requests) == 3
+    assert instrumentation.stats()["counters"]["oss.retry"] == 2
+
+
+def test_client_errors_are_not_retried(server, sleeps):
+    server.statuses = [404]
+    with pytest.raises(ThumbnailFetchError, match="HTTP 404"):
+        ThumbnailFetcher(timeout=5).fetch(url(server))
+    assert len(server.requests) == 1 and sleeps == []
+
+
+def test_gives_up_after_the_last_retry(server, sleeps):
+    server.statuses = [500] * 10
+    with pytest.raises(ThumbnailFetchError, match="after 3 attempts"):
+        ThumbnailFetcher(timeout=5, retries=2, backoff=0.1).fetch(url(server))
+    assert len(server.requests) == 3
+    assert sleeps == [0.1, 0.2]
+
+
+def test_stale_pooled_connection_is_replaced_without_backoff(server, sleeps, instrumentation):
+    server.drop_connections = True
+    fetcher = ThumbnailFetcher(timeout=5)
+    assert fetcher.fetch(url(server)) == b"thumbnail"
+    # 池中的连接已被服务器关闭：换新连接立即重发，不计为重试
+    assert fetcher.fetch(url(server)) == b"thumbnail"
+    assert fetcher.connections_opened == 2
+    assert sleeps == []
+    counters = instrumentation.stats()["counters"]
+    assert counters["oss.stale_connection"] == 1 and "oss.retry" not in counters
@@ -0,0 +1,79 @@
+import os
+
+from PIL import Image
+
+from thumbnail_store import ThumbnailStore
+
+
+def test_put_and_get_round_trip(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    store.put("opaque", Image.new("RGB", (100, 56), "red"))
+    store.put("transparent", Image.new("RGBA", (40, 40), (0, 0, 255, 128)))
+
+    opaque = store.get("opaque")
+    assert opaque.size == (100, 56) and opaque.format == "JPEG"
+    assert store.get("transparent").mode == "RGBA"
+    assert store.get("missing") is None
+
+
+def test_compact_moves_to_a_new_generation(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    for index in range(10):
+        store.put(f"key{index}", Image.new("RGB", (100, 100), (index * 20, 0, 0)))
+    for index in range(8):
+        store.delete(f"key{index}")
+    old_pack = store.pack_path
+    _, live_bytes, total_bytes = store.stats()
+    assert live_bytes < total_bytes
+
+    store.compact()
+    assert store.generation == 1
+    assert store.pack_path != old_pack and not os.path.exists(old_pack)
+    assert store.stats()[1:] == (live_bytes, live_bytes)
+    assert store.get("key9").getpixel((50, 50))[0] > 150
+    assert store.get("key0") is None
+
+    # 重新打开时沿用记录的代数和偏移
+    reopened = ThumbnailStore(str(tmp_path))
+    assert reopened.pack_path == store.pack_path
+    assert reopened.get("key8").size == (100, 100)
+
+
+def test_stale_packs_from_an_interrupted_compaction_are_removed(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    store.put("key", Image.new("RGB", (10, 10)))
+    leftover = tmp_path / "thumbnails.1.pack"
+    leftover.write_bytes(b"partial")  # 压缩写到一半崩溃，代数尚未提交
+
+    ThumbnailStore(str(tmp_path)).maintain()
+    assert not leftover.exists()
+    assert ThumbnailStore(str(tmp_path)).get("key").size == (10, 10)
+
+
+def test_migration_imports_local_thumbnails_and_drops_oss_ones(tmp_path):
+    Image.new("RGB", (10, 10), "blue").save(tmp_path / "localkey_thumbnail.png")
+    Image.new("RGB", (10, 10), "green").save(tmp_path / "osskey.png")  # 旧版 key 不含 ETag
+    store = ThumbnailStore(str(tmp_path))
+
+    assert store.migrate_png_files() == 1
+    assert store.get("localkey").size == (10, 10)
+    assert not store.contains("osskey")
+    assert not list(tmp_path.glob("*.png"))
+
+
+def test_writer_follows_a_compaction_by_another_writer(tmp_path):
+    gui = ThumbnailStore(str(tmp_path))
+    gui.put("kept", Image.new("RGB", (20, 20), "red"))
+    gui.put("dropped", Image.new("RGB", (20, 20), "blue"))
+    gui.get("kept")  # 建立 mmap
+
+    cli = ThumbnailStore(str(tmp_path))
+    cli.delete("dropped")
+    cli.compact()
+
+    # 另一个实例压缩后，原实例读写都切换到新一代文件
+    assert gui.get("kept").size == (20, 20)
+    gui.put("added", Image.new("RGB", (30, 30), "green"))
+    assert gui.pack_path == cli.pack_path
+    assert cli.get("added").size == (30, 30)
+    assert cli.get("kept").size == (20, 20)
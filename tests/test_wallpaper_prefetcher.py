@@ -0,0 +1,82 @@
+import os
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from wallpaper_prefetcher import WallpaperPrefetcher
+from wallpaper_renderer import RenderedWallpaper
+
+TARGET = (1920, 1080, "fill")
+
+
+class FakeRenderer:
+    """submit 返回的 Future 由测试在需要时完成"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.futures = {}
+
+    def submit(self, path, target):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self.futures[path] = future
+        return future
+
+    def finish(self, path, seconds=0.2):
+        variant = os.path.join(self.directory, "variant-" + os.path.basename(path))
+        with open(variant, "wb") as file:
+            file.write(b"rendered")
+        self.futures[path].set_result(RenderedWallpaper(path, variant, seconds))
+
+    def lookup(self, path, target):
+        return None
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for name in ("a.jpg", "b.jpg"):
+        path = tmp_path / name
+        path.write_bytes(b"")
+        paths.append(os.path.abspath(str(path)))
+    return paths
+
+
+def test_finished_render_is_a_prefetch_hit(tmp_path, images):
+    renderer = FakeRenderer(str(tmp_path))
+    prefetcher = WallpaperPrefetcher(renderer, wait_seconds=0)
+    prefetcher.schedule(images, TARGET)
+    renderer.finish(images[0])
+
+    prepared = prefetcher.take(images[0], TARGET)
+    assert prepared.from_prefetch and prepared.path.endswith("variant-a.jpg")
+    assert prefetcher.stats()["hits"] == 1
+
+
+def test_running_render_is_awaited(tmp_path, images):
+    renderer = FakeRenderer(str(tmp_path))
+    prefetcher = WallpaperPrefetcher(renderer, wait_seconds=5)
+    prefetcher.schedule(images, TARGET)
+    threading.Timer(0.05, renderer.finish, args=(images[0],)).start()
+
+    prepared = prefetcher.take(images[0], TARGET)
+    assert prepared.from_prefetch and prepared.render_seconds == 0.2
+
+
+def test_slow_render_falls_back_without_being_cancelled(tmp_path, images):
+    renderer = FakeRenderer(str(tmp_path))
+    prefetcher = WallpaperPrefetcher(renderer, wait_seconds=0.01)
+    prefetcher.schedule(images, TARGET)
+
+    prepared = prefetcher.take(images[0], TARGET)
+    assert not prepared.from_prefetch and prepared.path == images[0] and prepared.render_seconds is None
+    assert prefetcher.stats()["misses"] == 1
+    # 渲染继续在后台完成，结果留给以后使用
+    assert not renderer.futures[images[0]].cancelled()
+
+
+def test_unscheduled_image_is_a_miss(tmp_path, images):
+    prefetcher = WallpaperPrefetcher(FakeRenderer(str(tmp_path)))
+    prepared = prefetcher.take(images[1], TARGET)
+    assert not prepared.from_prefetch and prepared.path == images[1]